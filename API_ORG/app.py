@@ -36,7 +36,8 @@ from shapely.affinity import rotate, translate
 from shapely.geometry import MultiPolygon, Polygon, box
 from shapely.ops import split, unary_union
 
-from db import get_db_conn, release_db_conn
+from db import db_pool_stats, get_db_conn, release_db_conn
+from session_sweeper import sweep_expired_sessions
 from help_func import format_device_name, format_hazard_records, get_device_label
 
 load_dotenv()
@@ -63,34 +64,8 @@ scheduler = BackgroundScheduler(daemon=True)
 
 
 def run_every_minute():
-    # SAVE NEW SESSION
-    conn = get_db_conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE weatherdata.licensed_user_auth
-                SET online_status = 'offline'
-                WHERE userid in (SELECT user_id FROM weatherdata.user_sessions WHERE expires_at < NOW() OR last_request < NOW() - INTERVAL '10 minutes')
-                """
-            )
-
-            cur.execute(
-                """
-                UPDATE weatherdata.weather_user_activity_log
-                SET logout_time = NOW()
-                WHERE id in (SELECT log_id FROM weatherdata.user_sessions WHERE expires_at < NOW() OR last_request < NOW() - INTERVAL '10 minutes')
-                """
-            )
-
-            cur.execute(
-                """
-                DELETE FROM weatherdata.user_sessions WHERE expires_at < NOW() OR last_request < NOW() - INTERVAL '10 minutes'
-                """
-            )
-            conn.commit()
-    finally:
-        release_db_conn(conn)
+    # Only the advisory-lock leader sweeps; other workers return immediately
+    sweep_expired_sessions()
 
 
 scheduler.add_job(
@@ -267,6 +242,13 @@ def index():
     return jsonify({"msg": "Weather API running....."}), 200
 
 
+@app.route("/service_metrics", methods=["GET"])
+@cross_origin()
+@jwt_required()
+def service_metrics():
+    return jsonify({"status": "success", "data": {"db_pool": db_pool_stats()}}), 200
+
+
 @app.route("/userLogin", methods=["POST"])
 @cross_origin()
 def user_login():
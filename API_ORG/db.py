@@ -1,16 +1,21 @@
 import os
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
 from dotenv import load_dotenv
+from flask import has_request_context, request
+
+from pg_pool import InstrumentedPool
 load_dotenv()  
 
 db_pool = None
 def init_db_pool():
     global db_pool
     if db_pool is None:
-        db_pool = SimpleConnectionPool(
-            1,                
-            10,               
+        db_pool = InstrumentedPool(
+            int(os.environ.get("DB_POOL_MIN", 1)),
+            int(os.environ.get("DB_POOL_MAX", 10)),
+            timeout=float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+            max_waiting=int(os.environ.get("DB_POOL_MAX_WAITING", 50)),
+            statement_timeout_ms=int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 60000)),
             host=os.environ.get("DB_HOST"),
             database=os.environ.get("DB_NAME"),
             user=os.environ.get("DB_USER"),
@@ -22,13 +27,32 @@ def init_db_pool():
 
 def get_db_conn():
     pool = init_db_pool()
-    return pool.getconn()   
+    # Checkouts outside a request (threads, scheduler) are grouped as "background"
+    route = request.endpoint or request.path if has_request_context() else "background"
+    return pool.getconn(route)
 
 def release_db_conn(conn):
+    if conn is None:
+        return
     pool = init_db_pool()
     pool.putconn(conn)
 
 
+def db_pool_stats():
+    return init_db_pool().stats()
+
+
+def get_dedicated_conn():
+    # Long-lived connection outside the pool (LISTEN loops, background workers)
+    return psycopg2.connect(
+        host=os.environ.get("DB_HOST"),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASS"),
+        port=os.environ.get("DB_PORT", 5432)
+    )
+
+
 # def db_connection():
 #     try:
 #         conn = psycopg2.connect(
@@ -0,0 +1,206 @@
+import time
+from threading import Condition
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+from psycopg2.pool import PoolError
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+class InstrumentedPool:
+    """
+    Thread-safe psycopg2 connection pool.
+
+    getconn() waits up to `timeout` seconds for a free connection; at most
+    `max_waiting` callers wait at once, later ones fail immediately. Idle
+    connections are health-checked on checkout. Every connection is opened
+    with `statement_timeout_ms`. Checkout counts, wait time and hold time are
+    kept per route.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=5.0, max_waiting=50,
+                 statement_timeout_ms=None, health_check_after=30.0, **dsn):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_waiting = max_waiting
+        self.health_check_after = health_check_after
+        if statement_timeout_ms:
+            dsn["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+        self._dsn = dsn
+        self._cond = Condition()
+        self._idle = []  # (conn, released_at), most recent last
+        self._in_use = {}  # id(conn) -> (route, checked_out_at)
+        self._opened = 0
+        self._waiting = 0
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "broken": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+        self._routes = {}
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._opened += 1
+
+    def _connect(self):
+        return psycopg2.connect(**self._dsn)
+
+    def _healthy(self, conn, released_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - released_at < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, route="background"):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            if not self._idle and self._opened >= self.maxconn and self._waiting >= self.max_waiting:
+                self._stats["rejected"] += 1
+                raise PoolError("connection pool exhausted")
+            self._waiting += 1
+            try:
+                while not self._idle and self._opened >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"no connection available within {self.timeout}s")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            if self._idle:
+                conn, released_at = self._idle.pop()
+            else:
+                # Reserve the slot, connect outside the lock
+                conn, released_at = None, None
+                self._opened += 1
+
+        if conn is not None and not self._healthy(conn, released_at):
+            self._discard(conn)
+            conn = None
+            with self._cond:
+                self._stats["broken"] += 1
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._cond.notify()
+                raise
+
+        now = time.monotonic()
+        wait_ms = (now - start) * 1000
+        with self._cond:
+            self._in_use[id(conn)] = (route, now)
+            self._stats["checkouts"] += 1
+            self._stats["wait_ms_total"] += wait_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+            stats = self._route_stats(route)
+            stats["checkouts"] += 1
+            stats["wait_ms_total"] += wait_ms
+            stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
+        return conn
+
+    def putconn(self, conn, close=False):
+        with self._cond:
+            checkout = self._in_use.pop(id(conn), None)
+        if checkout is None:
+            raise PoolError("trying to put unkeyed connection")
+
+        if not conn.closed and not close:
+            status = conn.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+        if conn.closed or close:
+            self._discard(conn)
+
+        route, checked_out_at = checkout
+        now = time.monotonic()
+        hold_ms = (now - checked_out_at) * 1000
+        with self._cond:
+            if conn.closed:
+                self._opened -= 1
+            else:
+                self._idle.append((conn, now))
+            stats = self._route_stats(route)
+            stats["hold_ms_total"] += hold_ms
+            stats["hold_ms_max"] = max(stats["hold_ms_max"], hold_ms)
+            self._cond.notify()
+
+    def _route_stats(self, route):
+        return self._routes.setdefault(route, {
+            "checkouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "hold_ms_total": 0.0,
+            "hold_ms_max": 0.0,
+        })
+
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._cond:
+            routes = {}
+            for route, s in self._routes.items():
+                n = s["checkouts"] or 1
+                routes[route] = {
+                    "checkouts": s["checkouts"],
+                    "avg_wait_ms": round(s["wait_ms_total"] / n, 2),
+                    "max_wait_ms": round(s["wait_ms_max"], 2),
+                    "avg_hold_ms": round(s["hold_ms_total"] / n, 2),
+                    "max_hold_ms": round(s["hold_ms_max"], 2),
+                }
+            n = self._stats["checkouts"] or 1
+            return {
+                "max": self.maxconn,
+                "open": self._opened,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._stats["checkouts"],
+                "timeouts": self._stats["timeouts"],
+                "rejected": self._stats["rejected"],
+                "broken": self._stats["broken"],
+                "avg_wait_ms": round(self._stats["wait_ms_total"] / n, 2),
+                "max_wait_ms": round(self._stats["wait_ms_max"], 2),
+                # Long holds point at leaked connections
+                "checked_out": sorted(
+                    ({"route": r, "held_ms": round((now - t) * 1000, 2)} for r, t in self._in_use.values()),
+                    key=lambda c: -c["held_ms"],
+                )[:10],
+                "routes": routes,
+            }
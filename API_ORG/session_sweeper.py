@@ -0,0 +1,79 @@
+from db import get_dedicated_conn
+
+# Every API worker (and every deployment sharing the database) schedules the
+# sweep, but only the worker holding this advisory lock actually runs it. The
+# lock is session-level, so leadership moves to another worker as soon as the
+# leader's connection goes away.
+SWEEPER_LOCK_NAME = "weatherdata.session_sweeper"
+
+SWEEP_EXPIRED_SESSIONS = """
+    WITH expired AS (
+        DELETE FROM weatherdata.user_sessions
+        WHERE expires_at < NOW() OR last_request < NOW() - INTERVAL '10 minutes'
+        RETURNING user_id, log_id
+    ),
+    offline AS (
+        UPDATE weatherdata.licensed_user_auth u
+        SET online_status = 'offline'
+        FROM expired e
+        WHERE u.userid = e.user_id
+        RETURNING u.userid
+    ),
+    logged_out AS (
+        UPDATE weatherdata.weather_user_activity_log l
+        SET logout_time = NOW()
+        FROM expired e
+        WHERE l.id = e.log_id
+        RETURNING l.id
+    )
+    SELECT e.user_id, e.log_id, pg_notify('user_session_changed', e.user_id::text)
+    FROM expired e;
+"""
+
+_leader_conn = None
+
+
+def _acquire_leadership():
+    global _leader_conn
+    if _leader_conn is not None and not _leader_conn.closed:
+        return True
+
+    conn = get_dedicated_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (SWEEPER_LOCK_NAME,))
+            is_leader = cur.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.close()
+        raise
+
+    if not is_leader:
+        conn.close()
+        return False
+
+    _leader_conn = conn
+    return True
+
+
+def sweep_expired_sessions():
+    """Expire idle sessions if this worker is the sweeper leader; returns the expired rows."""
+    global _leader_conn
+    try:
+        if not _acquire_leadership():
+            return []
+        with _leader_conn.cursor() as cur:
+            cur.execute(SWEEP_EXPIRED_SESSIONS)
+            expired = [(user_id, log_id) for user_id, log_id, _ in cur.fetchall()]
+        _leader_conn.commit()
+        return expired
+    except Exception as e:
+        print("Session sweeper error:", e)
+        # Drop the connection (and with it the lock) so a healthy worker can take over
+        if _leader_conn is not None:
+            try:
+                _leader_conn.close()
+            except Exception:
+                pass
+            _leader_conn = None
+        return []
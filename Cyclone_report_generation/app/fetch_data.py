@@ -5,6 +5,7 @@ from collections import defaultdict
 from datetime import date, datetime, timedelta
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import psycopg2
 import pytz
@@ -61,31 +62,30 @@ def fetch_district_barchart_data():
 def fetch_district_count_saverity_wise(circle):
 
     conn = db_connection()
-    sql = f""" SELECT 
-            days,
-            severity_type,
-            SUM(CASE WHEN severity = 'Extreme' THEN 1 ELSE 0 END) AS extreme,
-            SUM(CASE WHEN severity = 'High' THEN 1 ELSE 0 END) AS high,
-            SUM(CASE WHEN severity = 'Moderate' THEN 1 ELSE 0 END) AS moderate,
-            SUM(CASE WHEN severity = 'Low' THEN 1 ELSE 0 END) AS low
-        FROM (
-            SELECT days, 'Temperature_Max' AS severity_type, temp_max_severity AS severity FROM weatherdata.district_wise_7dayfc_severity where indus_circle = '{circle}'
-            UNION ALL
-            SELECT days, 'Temperature_Min', temp_min_severity FROM weatherdata.district_wise_7dayfc_severity where indus_circle = '{circle}'
-            UNION ALL
-            SELECT days, 'Rainfall', rain_severity FROM weatherdata.district_wise_7dayfc_severity where indus_circle = '{circle}'
-            UNION ALL
-            SELECT days, 'Wind', wind_severity FROM weatherdata.district_wise_7dayfc_severity where indus_circle = '{circle}'
-            UNION ALL
-            SELECT days, 'Visibility', visibility_severity FROM weatherdata.district_wise_7dayfc_severity where indus_circle = '{circle}'
-            UNION ALL
-            SELECT days, 'Humidity', humidity_severity FROM weatherdata.district_wise_7dayfc_severity where indus_circle = '{circle}'
-        ) AS severity_data
-        GROUP BY days, severity_type
-        ORDER BY days, severity_type;
+    # Single scan: each forecast row is unpivoted into its six parameters
+    sql = """ SELECT
+            f.days,
+            p.severity_type,
+            COUNT(*) FILTER (WHERE p.severity = 'Extreme') AS extreme,
+            COUNT(*) FILTER (WHERE p.severity = 'High') AS high,
+            COUNT(*) FILTER (WHERE p.severity = 'Moderate') AS moderate,
+            COUNT(*) FILTER (WHERE p.severity = 'Low') AS low
+        FROM weatherdata.district_wise_7dayfc_severity f
+        CROSS JOIN LATERAL (
+            VALUES
+                ('Temperature_Max', f.temp_max_severity),
+                ('Temperature_Min', f.temp_min_severity),
+                ('Rainfall', f.rain_severity),
+                ('Wind', f.wind_severity),
+                ('Visibility', f.visibility_severity),
+                ('Humidity', f.humidity_severity)
+        ) AS p(severity_type, severity)
+        WHERE f.indus_circle = %(circle)s
+        GROUP BY f.days, p.severity_type
+        ORDER BY f.days, p.severity_type;
         """
 
-    df = pd.read_sql_query(sql, conn)
+    df = pd.read_sql_query(sql, conn, params={"circle": circle})
 
     merged = {}  # Temporary dict to merge per day
 
@@ -111,55 +111,31 @@ def fetch_district_count_saverity_wise(circle):
 
 def fetch_district_names_saverity_wise_7days(circle):
     conn = db_connection()
-    sql = f""" 
-           SELECT 
-                days,
-                "date",
-                severity_type,
-                STRING_AGG(CASE WHEN severity = 'Extreme' THEN district END, ', ') AS extreme_districts,
-                STRING_AGG(CASE WHEN severity = 'High' THEN district END, ', ') AS high_districts,
-                STRING_AGG(CASE WHEN severity = 'Moderate' THEN district END, ', ') AS moderate_districts,
-                STRING_AGG(CASE WHEN severity = 'Low' THEN district END, ', ') AS low_districts
-            FROM (
-                SELECT days,"date", district, 'Temperature_Max' AS severity_type, temp_max_severity AS severity 
-                FROM weatherdata.district_wise_7dayfc_severity 
-                WHERE indus_circle = '{circle}'
-                
-                UNION ALL
-                
-                SELECT days,"date", district, 'Temperature_Min', temp_min_severity 
-                FROM weatherdata.district_wise_7dayfc_severity 
-                WHERE indus_circle = '{circle}'
-                
-                UNION ALL
-                
-                SELECT days,"date", district, 'Rainfall', rain_severity 
-                FROM weatherdata.district_wise_7dayfc_severity 
-                WHERE indus_circle = '{circle}'
-                
-                UNION ALL
-                
-                SELECT days,"date", district, 'Wind', wind_severity 
-                FROM weatherdata.district_wise_7dayfc_severity 
-                WHERE indus_circle = '{circle}'
-                
-                UNION ALL
-                
-                SELECT days,"date", district, 'Visibility', visibility_severity 
-                FROM weatherdata.district_wise_7dayfc_severity 
-                WHERE indus_circle = '{circle}'
-                
-                UNION ALL
-                
-                SELECT days,"date", district, 'Humidity', humidity_severity 
-                FROM weatherdata.district_wise_7dayfc_severity 
-                WHERE indus_circle = '{circle}'
-            ) AS severity_data
-            GROUP BY days, severity_type,"date"
-            ORDER BY days, severity_type;
+    sql = """
+           SELECT
+                f.days,
+                f."date",
+                p.severity_type,
+                STRING_AGG(f.district, ', ') FILTER (WHERE p.severity = 'Extreme') AS extreme_districts,
+                STRING_AGG(f.district, ', ') FILTER (WHERE p.severity = 'High') AS high_districts,
+                STRING_AGG(f.district, ', ') FILTER (WHERE p.severity = 'Moderate') AS moderate_districts,
+                STRING_AGG(f.district, ', ') FILTER (WHERE p.severity = 'Low') AS low_districts
+            FROM weatherdata.district_wise_7dayfc_severity f
+            CROSS JOIN LATERAL (
+                VALUES
+                    ('Temperature_Max', f.temp_max_severity),
+                    ('Temperature_Min', f.temp_min_severity),
+                    ('Rainfall', f.rain_severity),
+                    ('Wind', f.wind_severity),
+                    ('Visibility', f.visibility_severity),
+                    ('Humidity', f.humidity_severity)
+            ) AS p(severity_type, severity)
+            WHERE f.indus_circle = %(circle)s
+            GROUP BY f.days, p.severity_type, f."date"
+            ORDER BY f.days, p.severity_type;
         """
 
-    df = pd.read_sql_query(sql, conn)
+    df = pd.read_sql_query(sql, conn, params={"circle": circle})
 
     data_dict = {}
     for _, row in df.iterrows():
@@ -192,6 +168,34 @@ def fetch_district_names_saverity_wise_7days(circle):
     return data_dict
 
 
+def pivot_district_days(df, fields, district_col="district", day_col="days"):
+    """
+    Nest rows into [{"district": d, "<day>": {key: value, ...}, ...}] sorted by
+    district without per-row groupby()/iterrows() overhead.
+    """
+    df = df[df[district_col].notna()]
+    if df.empty:
+        return []
+    df = df.sort_values(district_col, kind="stable")
+
+    cells = (
+        df[list(fields.values())]
+        .set_axis(list(fields.keys()), axis=1)
+        .to_dict("records")
+    )
+    result = []
+    current = None
+    for district, day, cell in zip(
+        df[district_col].tolist(), df[day_col].tolist(), cells
+    ):
+        if district != current:
+            current = district
+            district_data = {"district": district}
+            result.append(district_data)
+        district_data[day] = cell
+    return result
+
+
 def fetch_district_wise_KPI_values_7days(circle):
     conn = db_connection()
     sql = f""" 
@@ -349,7 +353,7 @@ def get_mobile_numbers(circle):
 
 
 ######### Fetch Hazards Data with severirty ##########
-def fet_hazard_affected_districts(circle, hazard_type):
+def get_hazard_affected_districts(circle, hazard_type_list):
     conn = db_connection()
     table_map = {
         "Flood": "hazard_flood",
@@ -357,57 +361,36 @@ def fet_hazard_affected_districts(circle, hazard_type):
         "Snowfall": "hazard_snowfall",
         "Avalanche": "hazard_avalanche",
         "Cloudburst": "hazard_cloudburst",
-        "Lightning": " hazard_lightning",
+        "Lightning": "hazard_lightning",
         "Landslide": "hazard_landslide",
     }
-    table_name = table_map.get(hazard_type, None)
+    hazard_by_table = {table_map[h]: h for h in hazard_type_list if h in table_map}
+    severity_levels = ["Extreme", "High", "Moderate", "Low"]
+    final_obj = {hazard: {sev: [] for sev in severity_levels} for hazard in hazard_type_list}
+    if not hazard_by_table:
+        return final_obj
 
-    sql = f""" 
-           select days, date, indus_circle, district, severity, '{hazard_type}' as hazard from weatherdata.{table_name}
-                where DATE(insert_at) = CURRENT_DATE - 1 and indus_circle = '{circle}' and days = 'Day1';
+    # Day1 districts of every requested hazard in one pass over the fact table
+    sql = """
+           select f.hazard_type,
+                  case f.severity_rank
+                      when 1 then 'Extreme'
+                      when 2 then 'High'
+                      when 3 then 'Moderate'
+                      when 4 then 'Low'
+                  end as severity,
+                  string_agg(distinct k.district, ',' order by k.district) as district
+           from weatherdata.hazard_current_fact f
+           join weatherdata.district_key k on k.district_id = f.district_id
+           where f.indus_circle = %(circle)s and f.day = 1
+           and f.hazard_type = any(%(tables)s) and f.severity_rank <= 4
+           group by f.hazard_type, f.severity_rank;
           """
-    df = pd.read_sql_query(sql, conn)
-
-    if df.empty:
-        return pd.DataFrame({"hazard": [hazard_type]})
-
-    df["hazard"] = hazard_type
-
-    # print(result)
-    return df
-
-
-def get_hazard_affected_districts(circle, hazard_type_list):
-    final_result = []
-
-    for hazard in hazard_type_list:
-        df = fet_hazard_affected_districts(circle, hazard)
+    df = pd.read_sql_query(sql, conn, params={"circle": circle, "tables": list(hazard_by_table)})
 
-        severity_levels = ["Extreme", "High", "Moderate", "Low"]
-        hazard_dict = {hazard: {sev: [] for sev in severity_levels}}
-        if df.empty or set(df.columns) == {"hazard"}:
-            final_result.append(hazard_dict)
-            continue
-
-        for _, row in df.iterrows():
-            sev = row.get("severity")
-
-            if not sev or sev not in severity_levels:
-                continue
-
-            districts = (
-                row["district"].split(",")
-                if isinstance(row["district"], str) and row["district"].strip()
-                else []
-            )
-
-            hazard_dict[hazard][sev] = districts
-
-        final_result.append(hazard_dict)
-
-    final_obj = {}
-    for item in final_result:
-        final_obj.update(item)
+    for _, row in df.iterrows():
+        hazard = hazard_by_table[row["hazard_type"]]
+        final_obj[hazard][row["severity"]] = row["district"].split(",")
     # print(final_obj)
 
     return final_obj
@@ -427,55 +410,22 @@ def get_hazards(circle, hazard_type):
     }
     table_name = table_map.get(hazard_type, None)
 
-    sql = f""" 
+    # Exploded districts come from weatherdata.hazard_current_fact: the facts
+    # (kept by triggers on the hazard tables, see
+    # weather_FlaskAPI_latest/hazard_facts.py) of every source's latest run
+    # (see weather_FlaskAPI_latest/pipeline_runs.py), created by
+    # weather_FlaskAPI_latest/migrate.py
+    sql = """
             WITH days AS (
-                SELECT 'Day1' AS day UNION ALL
-                SELECT 'Day2' UNION ALL
-                SELECT 'Day3' UNION ALL
-                SELECT 'Day4' UNION ALL
-                SELECT 'Day5' UNION ALL
-                SELECT 'Day6' UNION ALL
-                SELECT 'Day7'
-            ),
-
-            exploded AS (
-                SELECT
-                    hs.indus_circle,
-                    hs.days,
-                    hs.date,
-                    TRIM(district_item) AS district,
-                    hs.severity,
-                    CASE hs.severity
-                        WHEN 'Extreme'  THEN 1
-                        WHEN 'High'     THEN 2
-                        WHEN 'Moderate' THEN 3
-                        WHEN 'Low'      THEN 4
-                        ELSE 5
-                    END AS sev_rank
-                FROM weatherdata.{table_name} hs
-                CROSS JOIN LATERAL (
-                    SELECT unnest(string_to_array(hs.district, ',')) AS district_item
-                ) u
-                WHERE DATE(hs.insert_at) = CURRENT_DATE - 1
-                AND hs.indus_circle = '{circle}'
-                AND hs.district IS NOT NULL
-                AND hs.district <> ''
+                SELECT n, 'Day' || n AS day FROM generate_series(1, 7) AS n
             ),
 
             best_per_district AS (
-                SELECT indus_circle, days, district, date, severity
-                FROM (
-                    SELECT
-                        indus_circle,
-                        days,
-                        district,
-                        date,
-                        severity,
-                        sev_rank,
-                        ROW_NUMBER() OVER (PARTITION BY indus_circle, days, district ORDER BY sev_rank) AS rn
-                    FROM exploded
-                ) t
-                WHERE rn = 1
+                SELECT DISTINCT ON (f.district_id, f.day) f.district_id, f.day, f.date, f.severity_rank
+                FROM weatherdata.hazard_current_fact f
+                WHERE f.indus_circle = %(circle)s
+                AND f.hazard_type = %(table)s
+                ORDER BY f.district_id, f.day, f.severity_rank
             )
 
             SELECT
@@ -483,36 +433,37 @@ def get_hazards(circle, hazard_type):
                 a.indus_circle,
                 d.day AS days,
                 b.date,
-                COALESCE(b.severity, 'Other') AS severity
+                CASE b.severity_rank
+                    WHEN 1 THEN 'Extreme'
+                    WHEN 2 THEN 'High'
+                    WHEN 3 THEN 'Moderate'
+                    WHEN 4 THEN 'Low'
+                    ELSE 'Other'
+                END AS severity
             FROM weatherdata.district_geometry a
             CROSS JOIN days d
+            LEFT JOIN weatherdata.district_key k
+                ON k.indus_circle = a.indus_circle AND k.district = a.district
             LEFT JOIN best_per_district b
-                ON b.indus_circle = a.indus_circle
-            AND b.days = d.day
-            AND b.district = a.district
+                ON b.district_id = k.district_id AND b.day = d.n
             WHERE a.district <> 'Data Not Available'
-            AND a.indus_circle = '{circle}'
+            AND a.indus_circle = %(circle)s
             ORDER BY a.district, d.day;
         """
 
-    df = pd.read_sql_query(sql, conn)
-
-    result = []
-    for district, group in df.groupby("district"):
-        district_data = {"district": district}
-
-        for _, row in group.iterrows():
-            district_data[row["days"]] = {
-                "date": row["date"],
-                "severity": (
-                    "No Risk"
-                    if row["severity"] == "Other" or row["severity"] == "Low"
-                    else f"{row['severity']} Risk"
-                ),
-                "for_color": row["severity"],
-                "indus_circle": row["indus_circle"],
-            }
-        result.append(district_data)
+    df = pd.read_sql_query(sql, conn, params={"circle": circle, "table": table_name})
+
+    severity = df["severity"].fillna("Other").astype(str)
+    df["risk"] = np.where(severity.isin(["Other", "Low"]), "No Risk", severity + " Risk")
+    result = pivot_district_days(
+        df,
+        {
+            "date": "date",
+            "severity": "risk",
+            "for_color": "severity",
+            "indus_circle": "indus_circle",
+        },
+    )
 
     # print(result)
     return result
@@ -533,49 +484,30 @@ def get_district_hazards_wise(circle, hazard_type):
     }
     table_name = table_map.get(hazard_type, None)
 
-    sql = f""" 
-           WITH ranked AS (
-                SELECT 
-                    *,
-                    CASE severity
-                        WHEN 'Extreme' THEN 1
-                        WHEN 'High'    THEN 2
-                        WHEN 'Moderate' THEN 3
-                        WHEN 'Low'     THEN 4
-                        ELSE 5
-                    END AS severity_rank
-                FROM weatherdata.{table_name}
-                WHERE DATE(insert_at) = CURRENT_DATE - 1
-                AND indus_circle = '{circle}'
-                AND district IS NOT NULL
-                AND district <> ''  
-            )
-            SELECT DISTINCT ON (days)
-                days, date, district, severity
-            FROM ranked
-            ORDER BY days, severity_rank;
+    # Worst Moderate-or-above severity per day with its districts, from the
+    # hazard's current runs
+    sql = """
             WITH ranked AS (
-                SELECT 
-                    *,
-                    CASE severity
-                        WHEN 'Extreme' THEN 1
-                        WHEN 'High'    THEN 2
-                        WHEN 'Moderate' THEN 3
-                        WHEN 'Low'     THEN 4
-                        ELSE 5
-                    END AS severity_rank
-                FROM weatherdata.{table_name}
-                WHERE DATE(insert_at) = CURRENT_DATE - 1
-                AND indus_circle = '{circle}'
-                AND district IS NOT NULL
-                AND district <> ''  
+                SELECT f.day, f.date, f.severity_rank,
+                    string_agg(DISTINCT k.district, ',' ORDER BY k.district) AS district
+                FROM weatherdata.hazard_current_fact f
+                JOIN weatherdata.district_key k ON k.district_id = f.district_id
+                WHERE f.indus_circle = %(circle)s
+                AND f.hazard_type = %(table)s
+                AND f.severity_rank <= 3
+                GROUP BY f.day, f.date, f.severity_rank
             )
-            SELECT DISTINCT ON (days)
-                days, date, district, severity
-            FROM ranked where severity <> '' and severity is not null and severity <> 'Low'
-            ORDER BY days, severity_rank;"""
+            SELECT DISTINCT ON (day)
+                'Day' || day AS days, date, district,
+                CASE severity_rank
+                    WHEN 1 THEN 'Extreme'
+                    WHEN 2 THEN 'High'
+                    WHEN 3 THEN 'Moderate'
+                END AS severity
+            FROM ranked
+            ORDER BY day, severity_rank;"""
 
-    df = pd.read_sql_query(sql, conn)
+    df = pd.read_sql_query(sql, conn, params={"circle": circle, "table": table_name})
 
     if df.empty:
         return pd.DataFrame({"hazard": [hazard_type]})
@@ -670,9 +670,20 @@ def resolve_tables_from_hazard_value(hazard_value, table_map):
     return tables
 
 
+# Every load is recorded in weatherdata.pipeline_run in the same transaction
+# as its rows, through weatherdata.record_pipeline_run (both created by
+# weather_FlaskAPI_latest/migrate.py, see pipeline_runs.py there); a
+# successful run becomes this source's latest run for each table in its
+# row_counts
+PIPELINE_SOURCE = "Hazard_data_insert"
+
+RECORD_RUN_SQL = "SELECT weatherdata.record_pipeline_run(%s, %s, %s, %s, p_loaded_at => %s, p_error => %s)"
+
+
 @log_execution
 def insert_hazards_forecast(hazard_records):
     engine = db_engine()
+    started_at = datetime.now()
 
     KEY_TABLE_MAP = {
         "fog": "hazard_fog",
@@ -726,12 +737,32 @@ def insert_hazards_forecast(hazard_records):
                 """
                 execute_values(cursor, insert_query, rows)
 
+            # Every mapped table, so a hazard without rows this run reads as clear from this source
+            row_counts = {
+                table: len(table_rows_map.get(table, [])) for table in KEY_TABLE_MAP.values()
+            }
+            loaded_at = min(
+                (row[-1] for rows in table_rows_map.values() for row in rows),
+                default=started_at,
+            )
+            cursor.execute(
+                RECORD_RUN_SQL,
+                (PIPELINE_SOURCE, "success", started_at, json.dumps(row_counts), loaded_at, None),
+            )
+
         print(
             "tables_inserted",
             {table: len(rows) for table, rows in table_rows_map.items()},
         )
 
     except Exception as e:
+        try:
+            with engine.begin() as connection:
+                connection.connection.cursor().execute(
+                    RECORD_RUN_SQL, (PIPELINE_SOURCE, "failed", started_at, "{}", None, str(e))
+                )
+        except Exception as record_error:
+            print(f"⚠️ pipeline_run not recorded: {record_error}")
         return {"msg": f"Internal Server error: {str(e)}"}, 500
 
 
@@ -0,0 +1,202 @@
+import csv
+import io
+from datetime import datetime, timezone
+
+
+# Dashboard clicks are stored as narrow append-only events,
+# (log_id, action_code, value, ts), instead of updating one of ~55 action
+# columns on the session's weather_user_activity_log row. Codes are the
+# position in ACTION_NAMES (append only, never reorder) and are mirrored in
+# weatherdata.activity_action so SQL can turn them back into names. Both
+# tables are created, and new codes added, by `python migrate.py`.
+ACTION_NAMES = [
+    "today_btn_clicked",
+    "tomorrow_btn_clicked",
+    "today_temp_clicked",
+    "today_rain_clicked",
+    "today_wind_clicked",
+    "today_humidity_clicked",
+    "today_visibility_clicked",
+    "tomorrow_temp_clicked",
+    "tomorrow_rain_clicked",
+    "tomorrow_wind_clicked",
+    "tomorrow_humidity_clicked",
+    "tomorrow_visibility_clicked",
+    "tower_clicked",
+    "lasso_tool_clicked",
+    "alert_send",
+    "alert_send_time",
+    "alert_send_user",
+    "search_term",
+    "search_time",
+    "hazard_type_selected",
+    "severity_selected",
+    "view_on_map_clicked",
+    "dashboard_clicked",
+    "circlelevel_clicked",
+    "pandindia_clicked",
+    "usage_clicked",
+    "thvscore_clicked",
+    "dashboard_hourly_weather_clicked",
+    "dashboard_seven_day_forecast_clicked",
+    "dashboard_hazard_alert_clicked",
+    "dashboard_hazard_type_clicked",
+    "dashboard_hazard_severity_clicked",
+    "dashboard_view_map_clicked",
+    "circle_pdf_download",
+    "circle_level_clicked",
+    "circle_weather_param_breakdown_view",
+    "circle_today_risk_weather_view",
+    "circle_today_risk_hazard_view",
+    "circle_weather_forecast_view",
+    "circle_hazard_forecast_view",
+    "cyclone_clicked",
+    "cyclone_map_layer_checked_unchecked",
+    "cyclone_severity_table_export",
+    "circle_weather_forecast_rainfall",
+    "circle_weather_forecast_accu_rainfall",
+    "circle_weather_forecast_wind",
+    "circle_weather_forecast_humidity",
+    "circle_weather_forecast_visibility",
+    "circle_weather_forecast_temperature",
+    "circle_weather_hazard_cyclone",
+    "circle_weather_hazard_lightning",
+    "circle_weather_hazard_flood",
+    "circle_weather_hazard_snowfall",
+    "circle_weather_hazard_avalanche",
+]
+ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES, start=1)}
+
+MAX_EVENTS_PER_CALL = 500
+
+ACTIVITY_EVENT_DDL = """
+CREATE TABLE IF NOT EXISTS weatherdata.activity_action (
+    code SMALLINT PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS weatherdata.weather_user_activity_event (
+    log_id BIGINT NOT NULL,
+    action_code SMALLINT NOT NULL,
+    value TEXT,
+    ts TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_weather_user_activity_event_log
+    ON weatherdata.weather_user_activity_event (log_id, action_code, ts);
+"""
+
+# Latest value of every action of log row `l` as "name" (clicks) or
+# "name:value". Events win over the legacy action columns, which still hold
+# the history recorded before events.
+ACTION_ARRAY_SQL = """
+        ARRAY(
+            SELECT CASE WHEN latest.value = 'true' THEN latest.name ELSE latest.name || ':' || latest.value END
+            FROM (
+                SELECT DISTINCT ON (s.name) s.name, s.value
+                FROM (
+                    SELECT a.name, e.value, e.ts
+                    FROM weatherdata.weather_user_activity_event e
+                    JOIN weatherdata.activity_action a ON a.code = e.action_code
+                    WHERE e.log_id = l.id
+                    UNION ALL
+                    SELECT j.key, j.value, '-infinity'::timestamptz
+                    FROM jsonb_each_text(to_jsonb(l)) j
+                    WHERE j.key = ANY(%(actions)s)
+                ) s
+                ORDER BY s.name, s.ts DESC
+            ) latest
+            WHERE latest.value IS NOT NULL AND latest.value <> ''
+            ORDER BY latest.name
+        )
+"""
+
+# One row per log entry: the log columns plus "action"
+DASHBOARD_USAGE_SQL = f"""
+    SELECT
+        l.*,
+        {ACTION_ARRAY_SQL} AS action
+    FROM weatherdata.weather_user_activity_log l
+    WHERE l.userid = %(userid)s
+    AND l.login_time >= %(log_date)s::date AND l.login_time < %(log_date)s::date + 1
+    ORDER BY l.login_time DESC;
+"""
+
+def migrate_activity_events(conn):
+    with conn.cursor() as cur:
+        cur.execute(ACTIVITY_EVENT_DDL)
+        cur.execute(
+            """
+            INSERT INTO weatherdata.activity_action (code, name)
+            SELECT * FROM unnest(%s::smallint[], %s::text[])
+            ON CONFLICT (code) DO NOTHING
+            """,
+            (list(ACTION_CODES.values()), list(ACTION_CODES.keys())),
+        )
+    conn.commit()
+
+
+def _value(value):
+    if value is None or value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return str(value)
+
+
+def _timestamp(ts):
+    """ts as an ISO time COPY will accept; a bad one would fail the whole batch."""
+    if ts is None or ts == "":
+        return None
+    try:
+        return datetime.fromisoformat(ts).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid event ts: {ts!r}")
+
+
+def events_from_columns(data):
+    """Split an old-style `type=update` body into action events and other columns."""
+    events, columns = [], {}
+    for key, value in data.items():
+        if key in ACTION_CODES:
+            events.append({"action": key, "value": value})
+        else:
+            columns[key] = value
+    return events, columns
+
+
+def copy_activity_events(cur, log_id, events):
+    """
+    Append events for log_id with COPY; returns the number of rows written.
+    Each event is {"action": name, "value": optional, "ts": optional ISO time,
+    defaulting to now}.
+    Raises ValueError for malformed events, unknown actions or oversized batches.
+    """
+    if not isinstance(events, list):
+        raise ValueError("events must be a list")
+    if len(events) > MAX_EVENTS_PER_CALL:
+        raise ValueError(f"At most {MAX_EVENTS_PER_CALL} events per call")
+
+    now = datetime.now(timezone.utc).isoformat()
+    buffer = io.StringIO()
+    # Strings are quoted, so an empty value stays '' rather than NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+    for event in events:
+        if not isinstance(event, dict):
+            raise ValueError(f"Event must be an object: {event!r}")
+        code = ACTION_CODES.get(event.get("action"))
+        if code is None:
+            raise ValueError(f"Unknown action: {event.get('action')}")
+        writer.writerow([int(log_id), code, _value(event.get("value")), _timestamp(event.get("ts")) or now])
+    if not events:
+        return 0
+
+    buffer.seek(0)
+    cur.copy_expert(
+        """
+        COPY weatherdata.weather_user_activity_event (log_id, action_code, value, ts)
+        FROM STDIN WITH (FORMAT csv)
+        """,
+        buffer,
+    )
+    return len(events)
@@ -4,13 +4,10 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 import traceback
 from urllib.parse import quote, urljoin
-import shutil
 import json
-from threading import Thread
 import geopandas as gpd
 import numpy as np
 import pandas as pd
-import yagmail
 from dotenv import load_dotenv
 from flask import Flask, jsonify, make_response, request, g
 from psycopg2.extras import execute_values
@@ -24,9 +21,6 @@ from flask_jwt_extended import (
     jwt_required,
     verify_jwt_in_request
 )
-from openpyxl import Workbook
-from openpyxl.styles import Font
-from openpyxl.utils import get_column_letter
 from psycopg2 import extras
 from psycopg2.extras import RealDictCursor
 from psycopg2.extras import DictCursor
@@ -34,8 +28,39 @@ from shapely import from_wkt, wkt
 from shapely.affinity import rotate, translate
 from shapely.geometry import MultiPolygon, Polygon, box
 from shapely.ops import split, unary_union
-from help_func import format_hazard_records, format_device_name, get_device_label
-from db import get_db_conn, release_db_conn
+from help_func import format_hazard_records, format_device_name, get_device_label, hazard_risk_labels, pivot_district_days
+from db import db_pool_stats, get_db_conn, release_db_conn
+from session_cache import get_session_jti, notify_session_change
+from hazard_facts import AFFECTED_DISTRICTS_SQL
+from pipeline_runs import record_pipeline_run
+from heartbeat import heartbeat_stats, record_heartbeat
+from data_version import HAZARD_TABLES
+from response_cache import cached_response, response_cache_stats
+from session_sweeper import sweep_expired_sessions
+from boundary_cache import get_boundary_entry
+from simplify_boundaries import resolution_level
+from severity_queries import circle_severity_report, district_names_severity_wise, refresh_stale_severity_summary
+from vector_tiles import get_tile, is_valid_tile, prune_tile_cache
+from query_catalog import execute_prepared, query_stats, read_prepared
+from usage_rollup import USAGE_MIN_MAX_SQL, USAGE_SUMMARY_SQL, usage_source
+from activity_events import (
+    ACTION_NAMES,
+    DASHBOARD_USAGE_SQL,
+    copy_activity_events,
+    events_from_columns,
+)
+from cyclone_ingest import (
+    CYCLONE_SNAPSHOT_SQL,
+    CYCLONE_UPLOAD_TIMES_SQL,
+    copy_cyclone_features,
+    cyclone_data_type,
+    empty_cyclone_geojson,
+)
+from batch import BATCH_MAX_REQUESTS, run_batch
+from job_outbox import enqueue_job, get_job, list_jobs, new_job_dir
+from json_provider import init_json_provider
+from jwt_settings import JWT_ACCESS_TOKEN_EXPIRES, JWT_SECRET_KEY
+from ndma_tags import TODAY_HAZARDS_SQL, TODAY_SEVERITIES_SQL, TODAY_TAG_FILTER_SQL
 import requests
 from apscheduler.schedulers.background import BackgroundScheduler
 load_dotenv()
@@ -48,11 +73,12 @@ RECIVERS = os.environ.get("CC_RECEIVERS")
 from flask_cors import CORS, cross_origin
 
 app = Flask(__name__)
+init_json_provider(app)
 CORS(app)
 
 # JWT Configuration
-app.config["JWT_SECRET_KEY"] = "t7knf74gjsjv6ckj3$go#Glw64"
-app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
+app.config["JWT_SECRET_KEY"] = JWT_SECRET_KEY
+app.config["JWT_ACCESS_TOKEN_EXPIRES"] = JWT_ACCESS_TOKEN_EXPIRES
 app.config["JWT_TOKEN_LOCATION"] = ["headers"]
 
 jwt = JWTManager(app)
@@ -60,34 +86,8 @@ jwt = JWTManager(app)
 # Scheduler
 scheduler = BackgroundScheduler(daemon=True)
 def run_every_minute():
-    # SAVE NEW SESSION
-    conn = get_db_conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE weatherdata.licensed_user_auth
-                SET online_status = 'offline'
-                WHERE userid in (SELECT user_id FROM weatherdata.user_sessions WHERE expires_at < NOW() OR last_request < NOW() - INTERVAL '10 minutes')
-                """
-            )
-
-            cur.execute(
-                """
-                UPDATE weatherdata.weather_user_activity_log
-                SET logout_time = NOW()
-                WHERE id in (SELECT log_id FROM weatherdata.user_sessions WHERE expires_at < NOW() OR last_request < NOW() - INTERVAL '10 minutes')
-                """
-            )
-
-            cur.execute(
-                """
-                DELETE FROM weatherdata.user_sessions WHERE expires_at < NOW() OR last_request < NOW() - INTERVAL '10 minutes'
-                """
-            )
-            conn.commit()
-    finally:
-        release_db_conn(conn) 
+    # Only the advisory-lock leader sweeps; other workers return immediately
+    sweep_expired_sessions()
 
 scheduler.add_job(
     run_every_minute,
@@ -96,6 +96,20 @@ scheduler.add_job(
     id="minute_job",
     replace_existing=True
 )
+scheduler.add_job(
+    prune_tile_cache,
+    trigger="interval",
+    minutes=10,
+    id="tile_cache_prune",
+    replace_existing=True
+)
+scheduler.add_job(
+    refresh_stale_severity_summary,
+    trigger="interval",
+    minutes=1,
+    id="severity_summary_refresh",
+    replace_existing=True
+)
 scheduler.start()
 
 @jwt.token_in_blocklist_loader
@@ -106,28 +120,14 @@ def check_if_token_revoked(jwt_header, jwt_payload):
     if not user_id or not jti:
         return True  # block invalid token
 
-    conn = get_db_conn()
-    try:
-        with conn.cursor(cursor_factory=DictCursor) as cur:
-            cur.execute(
-                """
-                SELECT jti
-                FROM weatherdata.user_sessions
-                WHERE user_id = %s
-                """,
-                (user_id,)
-            )
-            session = cur.fetchone()
-
-            # No active session → token revoked
-            if not session:
-                return True
+    session_jti = get_session_jti(user_id)
 
-            # If JTI does not match → logged in elsewhere
-            return session["jti"] != jti
+    # No active session → token revoked
+    if not session_jti:
+        return True
 
-    finally:
-        release_db_conn(conn)
+    # If JTI does not match → logged in elsewhere
+    return session_jti != jti
 
 # --- JWT error handlers ----
 @jwt.expired_token_loader
@@ -157,35 +157,8 @@ def before():
         g.user_id = None
     if not g.user_id:
         return
-    async_update(g.user_id)
-            
-def update_last_request_db(user_id):
-    conn = None
-    try:
-        conn = get_db_conn()
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE weatherdata.user_sessions
-                SET last_request = NOW()
-                WHERE user_id = %s
-                """,
-                (user_id,)
-            )
-        conn.commit()
-    except Exception as e:
-        print("Async DB error:", e)
-    finally:
-        if conn:
-            release_db_conn(conn)
-            
-def async_update(user_id):
-    Thread(
-        target=update_last_request_db,
-        args=(user_id,),
-        daemon=True  # auto-kill with app
-    ).start()
-    
+    record_heartbeat(g.user_id)
+
 # mark DB online/offline
 def mark_user_online_offline(userid: str, online: bool):
     conn = None
@@ -363,6 +336,7 @@ def user_login():
                 """,
                 (userid, access_jti),
             )
+            notify_session_change(cur, userid)
 
             cur.execute(
                 """
@@ -464,6 +438,7 @@ def force_logout_remote():
                     """,
                     (userid,)
                 )
+                notify_session_change(cur, userid)
 
                 # Update online status
                 cur.execute(
@@ -529,6 +504,7 @@ def user_logout():
                     """,
                     (identity, jti)
                 )
+                notify_session_change(cur, identity)
 
                 conn.commit()
         except Exception as db_err:
@@ -622,9 +598,24 @@ def protected():
         200,
     )
 
+@app.route("/service_metrics", methods=["GET"])
+@cross_origin()
+@jwt_required()
+def service_metrics():
+    return jsonify({
+        "status": "success",
+        "data": {
+            "heartbeat": heartbeat_stats(),
+            "response_cache": response_cache_stats(),
+            "db_pool": db_pool_stats(),
+            "queries": query_stats(),
+        },
+    }), 200
+
 @app.route("/get-current-weather", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(["weather_hourly_data_all_india"])
 def get_hourly_data():
     conn = get_db_conn()
     try:
@@ -636,13 +627,7 @@ def get_hourly_data():
         selected_date = data.get("params")["selectedDate"]
         
         with conn.cursor() as cursor:
-            query = f"""
-                SELECT temp_c, chance_of_rain, wind_kph, humidity, vis_km, latitude, longitude, city_name
-                    FROM weatherdata.weather_hourly_data_all_india
-                    WHERE time = '{selected_date}'
-                ORDER BY city_name ASC;
-            """
-            cursor.execute(query)
+            execute_prepared(cursor, "current_weather", (selected_date,))
             rows = cursor.fetchall()
             colnames = [desc[0] for desc in cursor.description]
             result = [dict(zip(colnames, row)) for row in rows]
@@ -657,6 +642,7 @@ def get_hourly_data():
 @app.route("/get_circle_weather_min_max", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(["district_wise_7dayfc_severity"])
 def get_circle_weather_min_max():
     conn = get_db_conn()
     try:
@@ -672,22 +658,7 @@ def get_circle_weather_min_max():
             )
             
         with conn.cursor() as cursor:
-            query = """
-                SELECT 
-                    MIN(temp_min) AS temp_min,
-                    MAX(temp_max) AS temp_max,
-                    MIN(wind) AS wind_min,
-                    MAX(wind) AS wind_max,
-                    MIN(rain_precip) AS rain_min,
-                    MAX(rain_precip) AS rain_max,
-                    MIN(humidity) AS humidity_min,
-                    MAX(humidity) AS humidity_max,
-                    MIN(visibility) AS visibility_min,
-                    MAX(visibility) AS visibility_max
-                FROM weatherdata.district_wise_7dayfc_severity
-                WHERE indus_circle = %s AND days = 'day1';
-            """
-            cursor.execute(query, (circle,))
+            execute_prepared(cursor, "circle_weather_min_max", (circle,))
             rows = cursor.fetchall()
             colnames = [desc[0] for desc in cursor.description]
             result = [dict(zip(colnames, row)) for row in rows]
@@ -701,12 +672,12 @@ def get_circle_weather_min_max():
 @app.route("/get-earthquake", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(["earthquakes"], max_age=300)
 def get_earthquake_data():
     conn = get_db_conn()
     try:
         with conn.cursor() as cursor:
-            query = """SELECT * FROM weatherdata.earthquakes WHERE "time" >= NOW() - INTERVAL '2 days';"""
-            cursor.execute(query)
+            execute_prepared(cursor, "earthquakes_recent")
             rows = cursor.fetchall()
             # Optional: Get column names
             colnames = [desc[0] for desc in cursor.description]
@@ -733,8 +704,8 @@ def get_today_disasters():
         with conn.cursor() as cursor:
             query = f"""SELECT sender, TO_CHAR(sent, 'DD-MM-YYYY HH24:MI') as sent, event, severity, certainty, TO_CHAR(effective, 'DD-MM-YYYY HH24:MI') as effective, TO_CHAR(onset, 'DD-MM-YYYY HH24:MI') as onset, TO_CHAR(expires, 'DD-MM-YYYY HH24:MI') as expires, headline, description,id,
                         "areaDesc", geocode_name_0 as state, st_asgeojson(geom) as geometry 
-                    FROM weatherdata.disaster_ndma WHERE sent::date = CURRENT_DATE AND ('{hazard_type}' = 'All' OR event LIKE '%{hazard_type}%') AND ('{severity_type}' = 'All' OR severity LIKE '%{severity_type}%') order by sent desc;"""
-            cursor.execute(query)
+                    FROM weatherdata.disaster_ndma WHERE sent::date = CURRENT_DATE AND {TODAY_TAG_FILTER_SQL} order by sent desc;"""
+            cursor.execute(query, {"hazard": hazard_type, "severity": severity_type})
             rows = cursor.fetchall()
             colnames = [desc[0] for desc in cursor.description]
             result = [dict(zip(colnames, row)) for row in rows]
@@ -780,13 +751,7 @@ def get_hazards_list():
     conn =  get_db_conn()
     try:
         with conn.cursor() as cursor:
-            query = """SELECT DISTINCT 
-                        TRIM(split_part(val, 'and', 1)) AS hazard_list
-                        FROM (
-                            SELECT sent, unnest(string_to_array(event, ',')) AS val
-                            FROM weatherdata.disaster_ndma WHERE sent::date = CURRENT_DATE 
-                        ) AS sub order by hazard_list asc ;"""
-            cursor.execute(query)
+            cursor.execute(TODAY_HAZARDS_SQL)
             rows = cursor.fetchall()
             colnames = [desc[0] for desc in cursor.description]
             result = [dict(zip(colnames, row)) for row in rows]
@@ -804,13 +769,7 @@ def get_severity_list():
     conn =  get_db_conn()
     try:
         with conn.cursor() as cursor:
-            query = """SELECT DISTINCT 
-                        TRIM(split_part(val, 'and', 1)) AS severity
-                    FROM (
-                        SELECT sent, unnest(string_to_array(severity, ',')) AS val
-                        FROM weatherdata.disaster_ndma WHERE sent::date = CURRENT_DATE 
-                    ) AS sub order by severity asc ;"""
-            cursor.execute(query)
+            cursor.execute(TODAY_SEVERITIES_SQL)
             rows = cursor.fetchall()
             colnames = [desc[0] for desc in cursor.description]
             result = [dict(zip(colnames, row)) for row in rows]
@@ -820,13 +779,14 @@ def get_severity_list():
     finally:
         release_db_conn(conn)
 
-# Sending Selected Tower Report to users
+# Sending Selected Tower Report to users (mailed by job_worker.py)
 @app.route("/api-send-report", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
 def send_report():
     file = request.files["file"]
-    save_path = os.path.join("output", file.filename)
+    job_dir = new_job_dir()
+    save_path = os.path.join(job_dir, os.path.basename(file.filename))
     file.save(save_path)
     user_mail = request.form.get("userMail")
     RECIVERS = user_mail.split(",")
@@ -834,23 +794,38 @@ def send_report():
     current_date = datetime.now().strftime("%d %b %Y")  # e.g. "22 Aug 2025"
     current_time = datetime.now().strftime("%H:00")  # e.g. "10:00"
 
-    yag = yagmail.SMTP(user="post@mlinfomap.com", password="tmisxyakmbllotlw")
-    yag.send(
-        to=RECIVERS,
-        # [
-        #     "subodh@mlinfomap.com",
-        #     "ravikumar7277rv@gmail.com",
-        #     "Aditya@mlinfomap.com",
-        #     "rizwansiddiqui5225@gmail.com",
-        # ],
-        subject=f"Bad Weather Alert – {current_date}, {current_time} Hrs",
-        contents=[
-            "Please find attached the tower weather alert.",
-            yagmail.inline(save_path),
-            save_path,
-        ],
+    job_id = enqueue_job(
+        "tower_report",
+        {
+            "dir": job_dir,
+            "file_path": save_path,
+            "recipients": RECIVERS,
+            "subject": f"Bad Weather Alert – {current_date}, {current_time} Hrs",
+        },
+        get_jwt_identity(),
     )
-    return {"status": "sent"}
+    return {"status": "queued", "job_id": job_id}, 202
+
+@app.route("/jobs", methods=["GET"])
+@cross_origin("*")
+@jwt_required()
+def get_jobs():
+    try:
+        return jsonify({"status": "success", "data": list_jobs(get_jwt_identity())})
+    except Exception as e:
+        return jsonify({"msg": f"Internal Server error: {str(e)}"}), 500
+
+@app.route("/jobs/<int:job_id>", methods=["GET"])
+@cross_origin("*")
+@jwt_required()
+def get_job_status(job_id):
+    try:
+        job = get_job(job_id, get_jwt_identity())
+        if job is None:
+            return jsonify({"status": "error", "message": "Job not found"}), 404
+        return jsonify({"status": "success", "data": job})
+    except Exception as e:
+        return jsonify({"msg": f"Internal Server error: {str(e)}"}), 500
 
 @app.route("/weather_user_activity", methods=["POST"])
 @cross_origin("*")
@@ -884,24 +859,40 @@ def user_activity():
                 }
             )
 
-        elif activity_type == "update":
+        elif activity_type in ("update", "events"):
             row_id = payload.get("id")
             if not row_id:
                 return (
-                    jsonify({"status": "error", "message": "Missing id for update"}),
+                    jsonify({"status": "error", "message": f"Missing id for {activity_type}"}),
                     400,
                 )
 
-            set_clause = ", ".join([f"{col} = %s" for col in data.keys()])
-            values = list(data.values()) + [row_id]
+            # Clicks are appended as events; only non-action columns still update the log row
+            if activity_type == "events":
+                events, columns = payload.get("events", []), {}
+            else:
+                events, columns = events_from_columns(data)
+            try:
+                count = copy_activity_events(cur, row_id, events)
+            except ValueError as e:
+                conn.rollback()
+                return jsonify({"status": "error", "message": str(e)}), 400
 
-            query = f"""
-                UPDATE weatherdata.weather_user_activity_log
-                SET {set_clause}
-                WHERE id = %s;
-            """
-            cur.execute(query, values)
+            if columns:
+                set_clause = ", ".join([f"{col} = %s" for col in columns.keys()])
+                values = list(columns.values()) + [row_id]
+
+                query = f"""
+                    UPDATE weatherdata.weather_user_activity_log
+                    SET {set_clause}
+                    WHERE id = %s;
+                """
+                cur.execute(query, values)
             conn.commit()
+            if activity_type == "events":
+                return jsonify(
+                    {"status": "success", "message": "Events recorded", "id": row_id, "count": count}
+                )
             return jsonify(
                 {"status": "success", "message": "Row updated", "id": row_id}
             )
@@ -1016,7 +1007,7 @@ def inserted_hazard_circle_list():
             query = f"""
                 SELECT DISTINCT indus_circle
                 FROM weatherdata.{table_name}
-                WHERE insert_at::date = CURRENT_DATE;
+                WHERE insert_at >= CURRENT_DATE;
             """
             cursor.execute(query)
             result = cursor.fetchall()
@@ -1056,6 +1047,7 @@ def insert_hazards_forecast():
             }
         table_name = table_map.get(hazard_type, None)
         expanded_items = format_hazard_records(items)
+        started_at = datetime.now()
         with conn.cursor() as cursor:
             insert_query = f"""
                 INSERT INTO weatherdata.{table_name} 
@@ -1075,6 +1067,15 @@ def insert_hazards_forecast():
                 for x in expanded_items
             ]
             execute_values(cursor, insert_query, rows_to_insert)
+            # Manual loads of one circle do not replace the latest pipeline run
+            record_pipeline_run(
+                cursor,
+                f"api:{get_jwt_identity()}",
+                "success",
+                started_at,
+                {table_name: len(rows_to_insert)},
+                partial=True,
+            )
             conn.commit()
             return jsonify({
                 "status": "success",
@@ -1154,6 +1155,7 @@ def insert_hazards_forecast():
 @app.route("/get-hazards", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(HAZARD_TABLES)
 def get_hazards_forecast():
     conn =  get_db_conn()
     try:
@@ -1170,8 +1172,7 @@ def get_hazards_forecast():
             }
         table_name = table_map.get(hazard_type, None)
         with conn.cursor() as cursor:
-            query = f"""SELECT * FROM weatherdata.{table_name} hf WHERE hf.date >= CURRENT_DATE;"""
-            cursor.execute(query)
+            execute_prepared(cursor, f"{table_name}_forecast")
             rows = cursor.fetchall()
             colnames = [desc[0] for desc in cursor.description]
             result = []
@@ -1192,6 +1193,7 @@ def get_hazards_forecast():
 @app.route("/get-district-wise-hazards", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(HAZARD_TABLES)
 def get_district_wise_hazards_forecast():
     conn =  get_db_conn()
     try:
@@ -1208,88 +1210,12 @@ def get_district_wise_hazards_forecast():
         "Landslide": "hazard_landslide"
         }
         table_name = table_map.get(hazard_type, None)
-        
-        sql = f""" 
-           WITH days AS (
-                SELECT 'Day1' AS day UNION ALL
-                SELECT 'Day2' UNION ALL
-                SELECT 'Day3' UNION ALL
-                SELECT 'Day4' UNION ALL
-                SELECT 'Day5' UNION ALL
-                SELECT 'Day6' UNION ALL
-                SELECT 'Day7'
-            ),
-
-            exploded AS (
-                SELECT
-                    hs.indus_circle,
-                    hs.days,
-                    hs.date,
-                    TRIM(district_item) AS district,
-                    hs.severity,
-                    CASE hs.severity
-                        WHEN 'Extreme'  THEN 1
-                        WHEN 'High'     THEN 2
-                        WHEN 'Moderate' THEN 3
-                        WHEN 'Low'      THEN 4
-                        ELSE 5
-                    END AS sev_rank
-                FROM weatherdata.{table_name} hs
-                CROSS JOIN LATERAL (
-                    SELECT unnest(string_to_array(hs.district, ',')) AS district_item
-                ) u
-                WHERE DATE(hs.insert_at) = CURRENT_DATE - 1
-                AND hs.indus_circle = '{circle}'
-                AND hs.district IS NOT NULL
-                AND hs.district <> ''
-            ),
-
-            best_per_district AS (
-                SELECT indus_circle, days, district, date, severity
-                FROM (
-                    SELECT
-                        indus_circle,
-                        days,
-                        district,
-                        date,
-                        severity,
-                        sev_rank,
-                        ROW_NUMBER() OVER (PARTITION BY indus_circle, days, district ORDER BY sev_rank) AS rn
-                    FROM exploded
-                ) t
-                WHERE rn = 1
-            )
-
-            SELECT
-                a.district,
-                a.indus_circle,
-                d.day AS days,
-                b.date,
-                COALESCE(b.severity, 'Other') AS severity
-            FROM weatherdata.district_geometry a
-            CROSS JOIN days d
-            LEFT JOIN best_per_district b
-                ON b.indus_circle = a.indus_circle
-            AND b.days = d.day
-            AND b.district = a.district
-            WHERE a.district <> 'Data Not Available'
-            AND a.indus_circle = '{circle}'
-            ORDER BY a.district, d.day;
-        """      
-        df = pd.read_sql_query(sql, conn)
-
-        result = []
-        for district, group in df.groupby("district"):
-            district_data = {"district": district}
-
-            for _, row in group.iterrows():
-                district_data[row["days"]] = {
-                    "date": row["date"],
-                    "severity": "No Risk" if row["severity"] == "Other" or row["severity"] == "Low" else f"{row['severity']} Risk",
-                    "for_color":row["severity"],
-                    "indus_circle": row["indus_circle"]
-                }
-            result.append(district_data)
+        df = read_prepared(conn, f"{table_name}_district_wise", (circle,))
+        df["risk"] = hazard_risk_labels(df["severity"])
+        result = pivot_district_days(
+            df,
+            {"date": "date", "severity": "risk", "for_color": "severity", "indus_circle": "indus_circle"},
+        )
 
         return jsonify({
             "status": "success",
@@ -1304,6 +1230,7 @@ def get_district_wise_hazards_forecast():
 @app.route("/get-hazard-affected-district", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(HAZARD_TABLES)
 def get_hazard_affected_districts():
     conn =  get_db_conn()
     try:
@@ -1311,64 +1238,31 @@ def get_hazard_affected_districts():
         # hazard_type = payload.get("hazardType")
         circle = payload.get("circle")
         table_map = {
-            "Flood": "hazard_flood",
-            "Cyclone": "hazard_cyclone",
-            "Snowfall": "hazard_snowfall",
             "Avalanche": "hazard_avalanche",
             "Cloudburst": "hazard_cloudburst",
+            "Cyclone": "hazard_cyclone",
+            "Flood": "hazard_flood",
             "Lightning": "hazard_lightning",
-            "Landslide": "hazard_landslide"
+            "Snowfall": "hazard_snowfall",
         }
+        hazard_names = {table: hazard for hazard, table in table_map.items()}
 
-        sql = f"""
-                select days, date, indus_circle, district, severity, 'Avalanche' as hazard from weatherdata.hazard_avalanche
-                where DATE(insert_at) = CURRENT_DATE - 1 and indus_circle = '{circle}' and days = 'Day1'
-                union 
-                select days, date, indus_circle, district, severity, 'Cloudburst' as hazard from weatherdata.hazard_cloudburst
-                where DATE(insert_at) = CURRENT_DATE - 1 and indus_circle = '{circle}' and days = 'Day1'
-                union
-                select days, date, indus_circle, district, severity, 'Cyclone' as hazard from weatherdata.hazard_cyclone
-                where DATE(insert_at) = CURRENT_DATE - 1 and indus_circle = '{circle}' and days = 'Day1'
-                union  
-                select days, date, indus_circle, district, severity, 'Flood' as hazard from weatherdata.hazard_flood
-                where DATE(insert_at) = CURRENT_DATE - 1 and indus_circle = '{circle}' and days = 'Day1'
-                union
-                select days, date, indus_circle, district, severity, 'Lightning' as hazard from weatherdata.hazard_lightning
-                where DATE(insert_at) = CURRENT_DATE - 1 and indus_circle = '{circle}' and days = 'Day1'
-                union
-                select days, date, indus_circle, district, severity, 'Snowfall' as hazard from weatherdata.hazard_snowfall
-                where DATE(insert_at) = CURRENT_DATE - 1 and indus_circle = '{circle}' and days = 'Day1';
-        """
+        with conn.cursor() as cursor:
+            cursor.execute(
+                AFFECTED_DISTRICTS_SQL,
+                {"circle": circle, "tables": list(table_map.values())},
+            )
+            rows = cursor.fetchall()
 
-        df = pd.read_sql_query(sql, conn)
         severity_levels = ["Extreme", "High", "Moderate", "Low"]
         # Initialize empty structure for all hazards
         hazard_dict = {
-            "Avalanche": {sev: [] for sev in severity_levels},
-            "Cloudburst": {sev: [] for sev in severity_levels},
-            "Cyclone": {sev: [] for sev in severity_levels},
-            "Flood": {sev: [] for sev in severity_levels},
-            "Lightning": {sev: [] for sev in severity_levels},
-            "Snowfall": {sev: [] for sev in severity_levels},
+            hazard: {sev: [] for sev in severity_levels} for hazard in table_map
         }
-        if df.empty:
+        if not rows:
             return jsonify({"status": "success", "data": hazard_dict})
-        for _, row in df.iterrows():
-            hazard = row.get("hazard")
-            sev = row.get("severity")
-
-            if hazard not in hazard_dict:
-                continue
-            if sev not in severity_levels:
-                continue
-
-            districts = (
-                row["district"].split(",")
-                if isinstance(row["district"], str) and row["district"].strip()
-                else []
-            )
-
-            hazard_dict[hazard][sev] = districts
+        for table, sev, districts in rows:
+            hazard_dict[hazard_names[table]][sev] = districts
         return jsonify({"status": "success", "data": [hazard_dict]})
     except Exception as e:
         return jsonify({"msg": f"Internal Server error: {str(e)}"}), 500
@@ -1754,10 +1648,7 @@ def get_log_min_max_date():
     conn =  get_db_conn()
     try:
         with conn.cursor() as cursor:
-            query = """ select min(DATE(login_time)) as min_date,  max(DATE(login_time)) as max_date 
-                   from weatherdata.weather_user_activity_log;                                  
-                    """
-            cursor.execute(query)
+            cursor.execute(USAGE_MIN_MAX_SQL.format(source=usage_source(cursor)))
             row = cursor.fetchone()
             columns = [desc[0] for desc in cursor.description]
             record = dict(zip(columns, row))
@@ -1776,26 +1667,11 @@ def get_log_summary_date_wise():
         data = request.get_json() 
         start_date = data.get("startDate")
         end_date = data.get("endDate")
-        condition = f"WHERE login_time >= '{start_date}' AND login_time < DATE '{end_date}' + INTERVAL '1 day' " if start_date != '' and end_date != '' else ''
+        # Read from the daily rollup instead of aggregating the whole activity log
+        if not (start_date and end_date):
+            start_date = end_date = None
         with conn.cursor() as cursor:
-            query = f""" SELECT
-                        DATE(login_time) AS login_date,
-                        name,
-                        userid,
-                        COUNT(*) AS login_count,
-                        (
-                        floor(extract(epoch FROM SUM(logout_time - login_time)) / 3600)::int
-                        || ':' ||
-                        lpad(floor(mod(extract(epoch FROM SUM(logout_time - login_time)), 3600) / 60)::int::text, 2, '0')
-                        || ':' ||
-                        lpad(floor(mod(extract(epoch FROM SUM(logout_time - login_time)), 60))::int::text, 2, '0')
-                        ) AS duration
-                    FROM weatherdata.weather_user_activity_log
-                    {condition}
-                    GROUP BY DATE(login_time), name, userid
-                    ORDER BY login_date DESC, name;                                  
-                    """
-            cursor.execute(query)
+            cursor.execute(USAGE_SUMMARY_SQL.format(source=usage_source(cursor)), {"start_date": start_date, "end_date": end_date})
             rows = cursor.fetchall()
             colnames = [desc[0] for desc in cursor.description]
             result = [dict(zip(colnames, row)) for row in rows]
@@ -1816,88 +1692,19 @@ def fetch_dashboard_usages():
         user_id = data.get("userid")
 
         with conn.cursor() as cursor:
-            query = f"""select * from weatherdata.weather_user_activity_log 
-                    where userid = '{user_id}' and DATE(login_time) = '{log_date}'
-                    order by login_time DESC;"""
-            cursor.execute(query)
+            # "action" is aggregated in SQL from the activity events and legacy columns
+            cursor.execute(
+                DASHBOARD_USAGE_SQL,
+                {"userid": user_id, "log_date": log_date, "actions": ACTION_NAMES},
+            )
             rows = cursor.fetchall()
             columns = [desc[0] for desc in cursor.description]
-            ACTION_COLUMNS = [
-            "today_btn_clicked",
-            "tomorrow_btn_clicked",
-            "today_temp_clicked",
-            "today_rain_clicked",
-            "today_wind_clicked",
-            "today_humidity_clicked",
-            "today_visibility_clicked",
-            "tomorrow_temp_clicked",
-            "tomorrow_rain_clicked",
-            "tomorrow_wind_clicked",
-            "tomorrow_humidity_clicked",
-            "tomorrow_visibility_clicked",
-            "tower_clicked",
-            "lasso_tool_clicked",
-            "alert_send",
-            "alert_send_time",
-            "alert_send_user",
-            "search_term",
-            "search_time",
-            "hazard_type_selected",
-            "severity_selected",
-            "view_on_map_clicked",
-            "dashboard_clicked",
-            "circlelevel_clicked",
-            "pandindia_clicked",
-            "usage_clicked",
-            "thvscore_clicked",
-            "dashboard_hourly_weather_clicked",
-            "dashboard_seven_day_forecast_clicked",
-            "dashboard_hazard_alert_clicked",
-            "dashboard_hazard_type_clicked",
-            "dashboard_hazard_severity_clicked",
-            "dashboard_view_map_clicked",
-            "circle_pdf_download",
-            "circle_level_clicked",
-            "circle_weather_param_breakdown_view",
-            "circle_today_risk_weather_view",
-            "circle_today_risk_hazard_view",
-            "circle_weather_forecast_view",
-            "circle_hazard_forecast_view",
-            "cyclone_clicked",
-            "cyclone_map_layer_checked_unchecked",
-            "cyclone_severity_table_export",
-            "circle_weather_forecast_rainfall",
-            "circle_weather_forecast_accu_rainfall",
-            "circle_weather_forecast_wind",
-            "circle_weather_forecast_humidity",
-            "circle_weather_forecast_visibility",
-            "circle_weather_forecast_temperature",
-            "circle_weather_hazard_cyclone",
-            "circle_weather_hazard_lightning",
-            "circle_weather_hazard_flood",
-            "circle_weather_hazard_snowfall",
-            "circle_weather_hazard_avalanche"
-            ]
-            ACTION_COLUMNS = set(ACTION_COLUMNS)
             final_result = []
             for row in rows:
                 record = dict(zip(columns, row))
 
-                actions = []
-
-                for col in ACTION_COLUMNS:
-                    val = record.get(col)
-
-                    if val == 'true':
-                        actions.append(col)
-                    elif val not in (False, None, ""):
-                        actions.append(f"{col}:{val}")
-
-                # attach action
-                record["action"] = actions
-
                 # remove action columns from top-level
-                for col in ACTION_COLUMNS:
+                for col in ACTION_NAMES:
                     record.pop(col, None)
 
                 final_result.append(record)
@@ -1924,68 +1731,23 @@ def circle_report_data():
     try:
         data = request.get_json()
         circle = data.get("circle")
-        with conn.cursor() as cursor:
-            sql = f""" 
-            SELECT 
-                days,
-                MIN(date) AS date,
-                severity_type,
-                STRING_AGG(DISTINCT district, ', ') AS districts,
-                SUM(CASE WHEN severity = 'Extreme' THEN 1 ELSE 0 END) AS extreme,
-                SUM(CASE WHEN severity = 'High' THEN 1 ELSE 0 END) AS high,
-                SUM(CASE WHEN severity = 'Moderate' THEN 1 ELSE 0 END) AS moderate,
-                SUM(CASE WHEN severity = 'Other' THEN 1 ELSE 0 END) AS other
-            FROM (
-                SELECT days, date, district, 'Temperature_Max' AS severity_type, temp_max_severity AS severity 
-                FROM weatherdata.district_wise_7dayfc_severity WHERE ('All Circle' = %s or indus_circle = %s)
-
-                UNION ALL
-
-                SELECT days, date, district, 'Temperature_Min' AS severity_type, temp_min_severity AS severity 
-                FROM weatherdata.district_wise_7dayfc_severity WHERE ('All Circle' = %s or indus_circle = %s)
-                
-                UNION ALL
-                
-                SELECT days, date, district, 'Rainfall', rain_severity 
-                FROM weatherdata.district_wise_7dayfc_severity WHERE ('All Circle' = %s or indus_circle = %s)
-                
-                UNION ALL
-                
-                SELECT days, date, district, 'Wind', wind_severity 
-                FROM weatherdata.district_wise_7dayfc_severity WHERE ('All Circle' = %s or indus_circle = %s)
-                
-                UNION ALL
-                
-                SELECT days, date, district, 'Humidity', humidity_severity 
-                FROM weatherdata.district_wise_7dayfc_severity WHERE ('All Circle' = %s or indus_circle = %s)
-                
-                UNION ALL
-                
-                SELECT days, date, district, 'Visibility', visibility_severity 
-                FROM weatherdata.district_wise_7dayfc_severity WHERE ('All Circle' = %s or indus_circle = %s)
-                
-            ) AS severity_data
-            GROUP BY days, severity_type
-            ORDER BY days, severity_type;
-            """
-
-            df = pd.read_sql_query(sql, conn, params=[circle] * 12)
-            merged = {}
-            for idx, row in df.iterrows():
-                day = row["days"]
-                severity = row["severity_type"]
-                if day not in merged:
-                    merged[day] = {}
-                merged[day][severity] = {
-                    "date": row["date"],
-                    "districts": row["districts"],
-                    "extreme": row["extreme"],
-                    "high": row["high"],
-                    "moderate": row["moderate"],
-                    "other": row["other"],
-                }
-            severity_color = fetch_severity_colors(circle)
-            return merged, severity_color[0]
+        df = circle_severity_report(conn, circle)
+        merged = {}
+        for idx, row in df.iterrows():
+            day = row["days"]
+            severity = row["severity_type"]
+            if day not in merged:
+                merged[day] = {}
+            merged[day][severity] = {
+                "date": row["date"],
+                "districts": row["districts"],
+                "extreme": row["extreme"],
+                "high": row["high"],
+                "moderate": row["moderate"],
+                "other": row["other"],
+            }
+        severity_color = fetch_severity_colors(circle)
+        return merged, severity_color[0]
     except Exception as e:
         return jsonify({"msg": f"Internal Server error: {str(e)}"}), 500
     finally:
@@ -1999,55 +1761,7 @@ def fetch_district_names_severity_wise_7days():
     try:
         data = request.get_json()  
         circle = data.get("circle")
-        sql = f""" 
-            SELECT 
-                    days,
-                    "date",
-                    severity_type,
-                    STRING_AGG(CASE WHEN severity = 'Extreme' THEN district END, ', ') AS extreme_districts,
-                    STRING_AGG(CASE WHEN severity = 'High' THEN district END, ', ') AS high_districts,
-                    STRING_AGG(CASE WHEN severity = 'Moderate' THEN district END, ', ') AS moderate_districts,
-                    STRING_AGG(CASE WHEN severity = 'Low' THEN district END, ', ') AS low_districts
-                FROM (
-                    SELECT days,"date", district, 'Temperature_Max' AS severity_type, temp_max_severity AS severity 
-                    FROM weatherdata.district_wise_7dayfc_severity 
-                    WHERE indus_circle = '{circle}'
-                    
-                    UNION ALL
-
-                    SELECT days,"date", district, 'Temperature_Min' AS severity_type, temp_min_severity AS severity 
-                    FROM weatherdata.district_wise_7dayfc_severity 
-                    WHERE indus_circle = '{circle}'
-                    
-                    UNION ALL
-                    
-                    SELECT days,"date", district, 'Rainfall', rain_severity 
-                    FROM weatherdata.district_wise_7dayfc_severity 
-                    WHERE indus_circle = '{circle}'
-                    
-                    UNION ALL
-                    
-                    SELECT days,"date", district, 'Wind', wind_severity 
-                    FROM weatherdata.district_wise_7dayfc_severity 
-                    WHERE indus_circle = '{circle}'
-                    
-                    UNION ALL
-                    
-                    SELECT days,"date", district, 'Visibility', visibility_severity 
-                    FROM weatherdata.district_wise_7dayfc_severity 
-                    WHERE indus_circle = '{circle}'
-                    
-                    UNION ALL
-                    
-                    SELECT days,"date", district, 'Humidity', humidity_severity 
-                    FROM weatherdata.district_wise_7dayfc_severity 
-                    WHERE indus_circle = '{circle}'
-                ) AS severity_data
-                GROUP BY days, severity_type,"date"
-                ORDER BY days, severity_type;
-            """
-
-        df = pd.read_sql_query(sql, conn)
+        df = district_names_severity_wise(conn, circle)
         data_dict = {}
         for _, row in df.iterrows():
             severity_type = row["severity_type"]
@@ -2074,40 +1788,35 @@ def fetch_district_names_severity_wise_7days():
     finally:
         release_db_conn(conn)
 
+KPI_VALUE_COLUMNS = [
+    "date",
+    "temp_min",
+    "temp_max",
+    "rain_percent",
+    "rain_precip",
+    "wind",
+    "visibility",
+    "humidity",
+    "temp_max_severity",
+    "temp_min_severity",
+    "rain_severity",
+    "wind_severity",
+    "visibility_severity",
+    "humidity_severity",
+    "indus_circle",
+]
+
 @app.route("/fetch_district_wise_KPI_values", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(["district_wise_7dayfc_severity"])
 def fetch_district_wise_KPI_values_7days():
     conn =  get_db_conn()
     try:
         data = request.get_json()  
         circle = data.get("circle")
-        sql = f""" 
-            select * from weatherdata.district_wise_7dayfc_severity dwds where indus_circle = '{circle}';
-            """
-        df = pd.read_sql_query(sql, conn)
-        result = []
-        for district, group in df.groupby("district"):
-            district_data = {"district": district}
-            for _, row in group.iterrows():
-                district_data[row["days"]] = {
-                    "date": row["date"],
-                    "temp_min": row["temp_min"],
-                    "temp_max": row["temp_max"],
-                    "rain_percent": row["rain_percent"],
-                    "rain_precip": row["rain_precip"],
-                    "wind": row["wind"],
-                    "visibility": row["visibility"],
-                    "humidity": row["humidity"],
-                    "temp_max_severity": row["temp_max_severity"],
-                    "temp_min_severity": row["temp_min_severity"],
-                    "rain_severity": row["rain_severity"],
-                    "wind_severity": row["wind_severity"],
-                    "visibility_severity": row["visibility_severity"],
-                    "humidity_severity": row["humidity_severity"],
-                    "indus_circle": row["indus_circle"],
-                }
-            result.append(district_data)
+        df = read_prepared(conn, "district_kpi_values", (circle,))
+        result = pivot_district_days(df, KPI_VALUE_COLUMNS)
         final_result = []
         final_result.append({"district_wise_kpi_values": result})
         return final_result
@@ -2166,10 +1875,7 @@ def fetch_severity_colors(circle):
 def fetch_kpi_severity_control(circle):
     conn =  get_db_conn()
     try:
-        sql = f"""select * from weatherdata.weather_kpi_controls wkc
-                where indus_circle = '{circle}'; """
-
-        df = pd.read_sql_query(sql, conn)
+        df = read_prepared(conn, "kpi_controls", (circle,))
         data = df.to_dict(orient="records")
         return data[0]
     except Exception as e:
@@ -2180,6 +1886,7 @@ def fetch_kpi_severity_control(circle):
 @app.route("/fetch_kpi_legend_with_color", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(["weather_kpi_controls"])
 def get_legend_with_color():
     try:
         payload = request.get_json()
@@ -2452,6 +2159,7 @@ def add_new_report_user():
 @app.route("/fetch_accumulated_rainfall", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
+@cached_response(["district_wise_accum_rainfall"])
 def fetch_accumulated_rainfall():
     conn = get_db_conn()
     try:
@@ -2462,14 +2170,7 @@ def fetch_accumulated_rainfall():
             return jsonify({"status": "error", "message": "Circle is required"}), 400
 
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        query = """
-            SELECT *
-            FROM weatherdata.district_wise_accum_rainfall
-            WHERE indus_circle = %s
-            ORDER BY district ASC
-        """
-
-        cur.execute(query, (circle,))
+        execute_prepared(cur, "accumulated_rainfall", (circle,))
         result = cur.fetchall()
 
         return (
@@ -2488,29 +2189,23 @@ def fetch_accumulated_rainfall():
     finally:
         release_db_conn(conn)
       
-@app.route("/get_indus_circle_boundary", methods=["POST"])
-@cross_origin("*")
-@jwt_required()
-def get_indus_circle_boundary():
-    conn =  get_db_conn()
+def boundary_response(layer, circle=None, payload=None):
     try:
-        payload = request.get_json()
-        indus_circle = payload.get("circle")   
-        
-        sql = f"""SELECT state_ut, indus_circle, indus_zone, indus_circle_name, ST_AsText(geometry) as geometry
-                    FROM weatherdata.indus_circle_geomerty where ( 'All Circle' = '{indus_circle}' or indus_circle = '{indus_circle}');"""
-                    
-        df = pd.read_sql(sql, conn)
-        df['geometry'] = df['geometry'].apply(wkt.loads)
-        gdf = gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326")
-        
-        geojson_dict = json.loads(gdf.to_json())
-        
-        return (
-            jsonify({"status": "success", "data": geojson_dict}),
-            200,
-        )
-        
+        payload = payload or {}
+        level = resolution_level(payload.get("resolution"), payload.get("zoom"))
+        entry = get_boundary_entry(layer, circle, level)
+        if entry.etag in request.if_none_match:
+            response = make_response("", 304)
+        elif "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = make_response(entry.gzip_body, 200)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = make_response(entry.body, 200)
+        response.headers["Content-Type"] = "application/json"
+        response.set_etag(entry.etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
     except Exception as e:
         return (
             jsonify(
@@ -2519,66 +2214,55 @@ def get_indus_circle_boundary():
             500,
         )
 
-    finally:
-        release_db_conn(conn)
+@app.route("/get_indus_circle_boundary", methods=["POST"])
+@cross_origin("*")
+@jwt_required()
+def get_indus_circle_boundary():
+    payload = request.get_json()
+    return boundary_response("indus_circle", payload.get("circle"), payload)
         
 @app.route("/get_district_boundary", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
 def get_district_boundary():
-    conn =  get_db_conn()
-    try:
-        payload = request.get_json()
-        indus_circle = payload.get("circle")   
-                    
-        sql = f"""SELECT district, state_ut, indus_circle, indus_zone, indus_circle_name, ST_AsText(geometry) as geometry
-                    FROM weatherdata.district_geometry where indus_circle is not null AND ('All Circle' = '{indus_circle}' or indus_circle = '{indus_circle}');"""
-                    
-        df = pd.read_sql(sql, conn)
-        df['geometry'] = df['geometry'].apply(wkt.loads)
-        gdf = gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326")
-        
-        geojson_dict = json.loads(gdf.to_json())
-        
-        return (
-            jsonify({"status": "success", "data": geojson_dict}),
-            200,
-        )
-        
-    except Exception as e:
-        return (
-            jsonify(
-                {"status": "error", "message": "Internal Server Error", "error": str(e)}
-            ),
-            500,
-        )
-
-    finally:
-        release_db_conn(conn)
+    payload = request.get_json()
+    return boundary_response("district", payload.get("circle"), payload)
         
 @app.route("/get_indus_boundary", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
 def get_indus_boundary():
-    conn =  get_db_conn()
+    return boundary_response("indus_boundary")
+   
+@app.route("/batch", methods=["POST"])
+@cross_origin("*")
+@jwt_required()
+def batch_requests():
+    payload = request.get_json(silent=True) or {}
+    items = payload.get("requests")
+    if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+        return jsonify({"status": "error", "message": "requests must be a list of {path, body} objects"}), 400
+    if len(items) > BATCH_MAX_REQUESTS:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_REQUESTS} requests per batch"}), 400
     try:
-        payload = request.get_json()
-        indus_circle = payload.get("circle")   
-                    
-        sql = f"""SELECT state_ut, indus_circle, indus_zone, ST_AsText(geometry) as geometry
-                    FROM weatherdata.indus_boundary_geomerty;"""
-                    
-        df = pd.read_sql(sql, conn)
-        df['geometry'] = df['geometry'].apply(wkt.loads)
-        gdf = gpd.GeoDataFrame(df, geometry='geometry', crs="EPSG:4326")
-        
-        geojson_dict = json.loads(gdf.to_json())
-        
-        return (
-            jsonify({"status": "success", "data": geojson_dict}),
-            200,
-        )
-        
+        return run_batch(items)
+    except Exception as e:
+        return jsonify({"msg": f"Internal Server error: {str(e)}"}), 500
+
+@app.route("/tiles/<layer>/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+@cross_origin("*")
+@jwt_required()
+def get_vector_tile(layer, z, x, y):
+    if not is_valid_tile(layer, z, x, y):
+        return jsonify({"status": "error", "message": "Unknown layer or tile"}), 404
+    try:
+        tile = get_tile(layer, z, x, y)
+        if not tile:
+            return make_response("", 204)
+        response = make_response(tile, 200)
+        response.headers["Content-Type"] = "application/vnd.mapbox-vector-tile"
+        response.headers["Cache-Control"] = "private, max-age=300"
+        return response
     except Exception as e:
         return (
             jsonify(
@@ -2587,9 +2271,6 @@ def get_indus_boundary():
             500,
         )
 
-    finally:
-        release_db_conn(conn)
-   
 @app.route("/send_usage_report", methods=["POST"])
 @cross_origin("*")
 @jwt_required()
@@ -2598,86 +2279,25 @@ def send_usage_report():
         payload = request.get_json()
         emails = payload.get("emails")
         users_data = payload.get("data") 
+        start_date = payload.get("start_date")
+        end_date = payload.get("end_date") or start_date
 
-        if not users_data or not emails:
+        # Either the rows themselves, or a date range exported straight from the activity log
+        if not (users_data or start_date) or not emails:
             return (
                 jsonify({"status": "error", "message": "Missing data or emails"}),
                 400,
             )
 
-        wb = Workbook()
-        wb.remove(wb.active)
-
-        for user_rows in users_data:
-            if not user_rows:
-                continue
-
-            user_name = user_rows[0].get("Name", "User")
-            sheet_name = user_name[:31]
-            ws = wb.create_sheet(title=sheet_name)
-
-            # Original headers
-            raw_headers = list(user_rows[0].keys())
-            formatted_headers = []
-
-            for h in raw_headers:
-                if h == "Login_Date_Time":
-                    formatted_headers.append("Login Date & Time")
-                elif h == "Logout_Date_Time":
-                    formatted_headers.append("Logout Date & Time")
-                else:
-                    formatted_headers.append(h.replace("_", " "))
-
-            ws.append(formatted_headers)
-            for col_num, header in enumerate(formatted_headers, 1):
-                cell = ws.cell(row=1, column=col_num)
-                cell.font = Font(bold=True)
-                
-            for row in user_rows:
-                row_values = []
-                for key in raw_headers:
-                    value = row.get(key, "")
-
-                    if isinstance(value, list):
-                        value = ", ".join(value)
-
-                    row_values.append(value)
-
-                ws.append(row_values)
-
-            # Auto column fit
-            for col_num, header in enumerate(formatted_headers, 1):
-                column_letter = get_column_letter(col_num)
-                max_length = len(str(header))
-
-                for cell in ws[column_letter]:
-                    value = str(cell.value) if cell.value is not None else ""
-                    max_length = max(max_length, len(value))
-
-                ws.column_dimensions[column_letter].width = max_length + 3
-
-        folder_path = os.path.join(os.getcwd(), "usage_report")
-        os.makedirs(folder_path, exist_ok=True)
-        temp_file = os.path.join(folder_path, "usage_report.xlsx")
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
-        wb.save(temp_file)
-
-        # -------- SEND EMAIL WITH ATTACHMENT --------
-        yag = yagmail.SMTP(user="post@mlinfomap.com", password="tmisxyakmbllotlw")
-        yag.send(
-            to=emails,
-            subject=f"Usages Report Data",
-            contents=[
-                "Please find attached excel sheet for the Usages Report Data",
-                yagmail.inline(temp_file),
-                temp_file,
-            ],
-        )
-
+        job = {"dir": new_job_dir(), "emails": emails}
+        if users_data:
+            job["data"] = users_data
+        else:
+            job.update(start_date=start_date, end_date=end_date, userids=payload.get("userids"))
+        job_id = enqueue_job("usage_report", job, get_jwt_identity())
         return jsonify(
-            {"status": "success", "message": "Usages report sent successfully."}
-        )
+            {"status": "success", "message": "Usages report queued.", "job_id": job_id}
+        ), 202
     except Exception as e:
         return jsonify({"msg": f"Internal Server error: {str(e)}"}), 500
 
@@ -2687,33 +2307,65 @@ def send_usage_report():
 def get_india_level_districts():
     conn = get_db_conn()
     try:
-        cur = conn.cursor(cursor_factory=DictCursor)
-        # Fetch rows from last 24 hours + convert geom to GeoJSON
+        # Whole response is assembled in Postgres and passed through as text
         query = """
-            SELECT 
-                *,
-                ST_AsGeoJSON(geom) AS geojson_geom
+            SELECT json_build_object(
+                'status', 'success',
+                'data', json_build_object(
+                    'type', 'FeatureCollection',
+                    'features', COALESCE(json_agg(
+                        json_build_object(
+                            'type', 'Feature',
+                            'geometry', ST_AsGeoJSON(geom)::json,
+                            'properties', json_build_object(
+                                'district', district,
+                                'shape_leng', shape_leng,
+                                'shape_area', shape_area,
+                                'state', state,
+                                'remarks', remarks,
+                                'state_lgd', state_lgd,
+                                'layer', layer,
+                                'id_val', id_val,
+                                'Date', "Date",
+                                'UTC', "UTC",
+                                'DISTRICT_1', "DISTRICT_1",
+                                'Day_1', "Day_1",
+                                'Day_2', "Day_2",
+                                'Day_3', "Day_3",
+                                'Day_4', "Day_4",
+                                'Day_5', "Day_5",
+                                'day1_color', day1_color,
+                                'day2_color', day2_color,
+                                'day3_color', day3_color,
+                                'day4_color', day4_color,
+                                'day5_color', day5_color,
+                                'Day1_text', "Day1_text",
+                                'Day2_text', "Day2_text",
+                                'Day3_text', "Day3_text",
+                                'Day4_text', "Day4_text",
+                                'Day5_text', "Day5_text",
+                                'indus_district', indus_district,
+                                'indus_circle', indus_circle,
+                                'insert_at', to_char(insert_at, 'Dy, DD Mon YYYY HH24:MI:SS "GMT"'),
+                                'day1_severity', day1_severity,
+                                'day2_severity', day2_severity,
+                                'day3_severity', day3_severity,
+                                'day4_severity', day4_severity,
+                                'day5_severity', day5_severity
+                            )
+                        )
+                    ), '[]'::json)
+                )
+            )::text
             FROM weatherdata.act_warning1
             WHERE insert_at >= NOW() - INTERVAL '24 HOURS'
         """
-        cur.execute(query)
-        rows = cur.fetchall()
-
-        features = []
-        for row in rows:
-            row_dict = dict(row)
-
-            # Convert geometry to JSON
-            geom_json = json.loads(row_dict.pop("geojson_geom"))
-
-            # Remove original geom field
-            if "geom" in row_dict:
-                row_dict.pop("geom")
-
-            feature = {"type": "Feature", "geometry": geom_json, "properties": row_dict}
-            features.append(feature)
-        geojson = {"type": "FeatureCollection", "features": features}
-        return jsonify({"status": "success", "data": geojson}), 200
+        with conn.cursor() as cur:
+            cur.execute(query)
+            body = cur.fetchone()[0]
+        response = make_response(body, 200)
+        response.headers["Content-Type"] = "application/json"
+        return response
     except Exception as e:
         return (
             jsonify(
@@ -2729,6 +2381,7 @@ def get_india_level_districts():
 @cross_origin("*")
 @jwt_required()
 def insert_cyclone_file():
+    conn = None
     try:
         uploaded_files = request.files
         upload_time = request.form.get("upload_time")
@@ -2739,53 +2392,35 @@ def insert_cyclone_file():
                 400,
             )
 
+        collections = []
+        for file_key, file in uploaded_files.items():
+            data = json.loads(file.read())
+            if "features" not in data:
+                continue
+            collections.append((cyclone_data_type(file_key), data))
+
         conn = get_db_conn()
         with conn.cursor() as cursor:
-            for file_key, file in uploaded_files.items():
-                data = json.loads(file.read())
-
-                if "features" not in data:
-                    continue
-
-                # Detect file source type
-                if "point" in file_key.lower():
-                    data_type = "point"
-                elif "cone" in file_key.lower():
-                    data_type = "cone"
-                elif "buffer" in file_key.lower():
-                    data_type = "buffer"
-                else:
-                    data_type = "unknown"
-
-                # Insert every feature row
-                for feature in data["features"]:
-                    insert_query = """
-                        INSERT INTO weatherdata.cyclone_data_from_uploaded_file 
-                        (data_type, properties, geometry, upload_time)
-                        VALUES (%s, %s, %s, %s)
-                    """
-                    cursor.execute(
-                        insert_query,
-                        (
-                            data_type,
-                            json.dumps(feature.get("properties")),
-                            json.dumps(feature.get("geometry")),
-                            upload_time,
-                        ),
-                    )
-
-            conn.commit
-            return (
-                jsonify(
-                    {
-                        "status": "success",
-                        "message": "Cyclone data successfully inserted into database",
-                    }
-                ),
-                200,
-            )
+            counts = copy_cyclone_features(cursor, upload_time, collections)
+        conn.commit()
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "message": "Cyclone data successfully inserted into database",
+                    "counts": counts,
+                }
+            ),
+            200,
+        )
 
+    except ValueError as e:
+        if conn:
+            conn.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
+        if conn:
+            conn.rollback()
         print("Error:", e)
         return jsonify({"msg": f"Internal Server error: {str(e)}"}), 500
     finally:
@@ -2795,6 +2430,7 @@ def insert_cyclone_file():
 @cross_origin("*")
 @jwt_required()
 def get_cyclone_geojson():
+    conn = None
     try:
         payload = request.get_json()
         selected_time = payload.get("upload_time")
@@ -2802,14 +2438,8 @@ def get_cyclone_geojson():
         conn = get_db_conn()
         with conn.cursor() as cursor:
 
-            # Fetch all available timestamps (for dropdown)
-            cursor.execute(
-                """
-                SELECT DISTINCT upload_time 
-                FROM weatherdata.cyclone_data_from_uploaded_file
-                ORDER BY upload_time DESC;
-            """
-            )
+            # All available timestamps (for dropdown), from the snapshot header table
+            cursor.execute(CYCLONE_UPLOAD_TIMES_SQL)
             all_times = [row[0] for row in cursor.fetchall()]
             
             if not selected_time:
@@ -2821,34 +2451,10 @@ def get_cyclone_geojson():
                     404,
                 )
 
-            # Fetch GeoJSON of selected timestamp
-            cursor.execute(
-                """
-                SELECT data_type, properties, geometry
-                FROM weatherdata.cyclone_data_from_uploaded_file
-                WHERE upload_time = %s;
-            """,
-                (selected_time,),
-            )
-            rows = cursor.fetchall()
-
-            # Prepare categorized GeoJSON skeleton
-            geojson = {
-                "point": {"type": "FeatureCollection", "features": []},
-                "cone": {"type": "FeatureCollection", "features": []},
-                "buffer": {"type": "FeatureCollection", "features": []},
-            }
-
-            for row in rows:
-                data_type, props, geom = row
-                feature = {
-                    "type": "Feature",
-                    "properties": props if props else {},
-                    "geometry": geom,
-                }
-                # Categorize into correct feature collection
-                if data_type in geojson:
-                    geojson[data_type]["features"].append(feature)
+            # GeoJSON of selected timestamp, assembled when it was uploaded
+            cursor.execute(CYCLONE_SNAPSHOT_SQL, (selected_time,))
+            row = cursor.fetchone()
+            geojson = row[0] if row else empty_cyclone_geojson()
 
             return (
                 jsonify(
@@ -2878,21 +2484,15 @@ def cyclone_report_send():
         if not img_file:
             return jsonify({"error": "Image file missing"}), 400
 
-        # Local API save folder
-        save_folder = "./cyclone_report"
-        os.makedirs(save_folder, exist_ok=True)
-
-        # Delete previous local files
-        for existing_file in os.listdir(save_folder):
-            existing_file_path = os.path.join(save_folder, existing_file)
-            if os.path.isfile(existing_file_path):
-                os.remove(existing_file_path)
-
-        img_path_local = os.path.join(save_folder, img_file.filename)
+        # Copied to ./cyclone_report and wwwroot by job_worker.py
+        job_dir = new_job_dir()
+        img_path_local = os.path.join(job_dir, os.path.basename(img_file.filename))
         img_file.save(img_path_local)
-
-        # Save both to wwwroot folder for public access
-        img_path_www = save_file_wwwroot(img_path_local, "IMAGE")
+        job_id = enqueue_job(
+            "cyclone_image",
+            {"dir": job_dir, "file_path": img_path_local},
+            get_jwt_identity(),
+        )
 
         # Public download URLs
         img_url = (
@@ -2905,32 +2505,15 @@ def cyclone_report_send():
                     "status": "success",
                     "message": "Cyclone report and image uploaded successfully",
                     "image_download_url": img_url,
+                    "job_id": job_id,
                 }
             ),
-            200,
+            202,
         )
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
-def save_file_wwwroot(file_path, file_type):
-    base_dir = r"C:\inetpub\wwwroot\Weather\reports"
-
-    # Separate folders for different file types
-    if file_type.upper() == "IMAGE":
-        report_dir = os.path.join(base_dir, "img_cyclone")
-
-    # Create folder if missing
-    os.makedirs(report_dir, exist_ok=True)
-
-    # Destination file
-    file_name = os.path.basename(file_path)
-    destination_path = os.path.join(report_dir, file_name)
-    # Copy file to destination
-    shutil.copyfile(file_path, destination_path)
-    return destination_path
-
-
 if __name__ == "__main__":
     port = int(os.environ.get("APP_PORT", 6633))
     app.run(host="0.0.0.0", port=port, debug=True)
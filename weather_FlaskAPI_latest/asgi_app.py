@@ -0,0 +1,260 @@
+"""
+ASGI read tier: the read-only map routes served from an asyncpg pool, so one
+process can keep hundreds of map clients in flight while Postgres works.
+Requests, tokens and response bodies are the same as in app.py. SQL comes
+from query_catalog; asyncpg prepares and caches statements per connection.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 6634
+"""
+import re
+from contextlib import asynccontextmanager
+from functools import wraps
+
+import jwt
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from async_db import close_async_pool, column_type, fetch, get_session_jti, init_async_pool
+from boundary_cache import get_boundary_entry
+from heartbeat import record_heartbeat
+from help_func import hazard_risk_labels, pivot_district_days
+from json_provider import dumps_bytes
+from jwt_settings import JWT_ALGORITHM, JWT_SECRET_KEY
+from query_catalog import QUERIES
+from simplify_boundaries import resolution_level
+
+HAZARD_TABLE_MAP = {
+    "Flood": "hazard_flood",
+    "Cyclone": "hazard_cyclone",
+    "Snowfall": "hazard_snowfall",
+    "Avalanche": "hazard_avalanche",
+    "Cloudburst": "hazard_cloudburst",
+    "Lightning": "hazard_lightning",
+    "Landslide": "hazard_landslide",
+}
+
+
+def json_response(obj, status=200):
+    return Response(dumps_bytes(obj, newline=True), status_code=status, media_type="application/json")
+
+
+async def get_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+# --- JWT: same checks and messages as flask_jwt_extended in app.py ----
+class AuthError(Exception):
+    def __init__(self, msg, status=401):
+        super().__init__(msg)
+        self.msg = msg
+        self.status = status
+
+
+def _token_from_header(request):
+    auth_header = request.headers.get("Authorization", "").strip().strip(",")
+    if not auth_header:
+        raise AuthError("Missing token: Missing Authorization Header")
+    tokens = [v for v in re.split(r",\s*", auth_header) if v.split() and v.split()[0] == "Bearer"]
+    if len(tokens) != 1:
+        raise AuthError("Missing token: Missing 'Bearer' type in 'Authorization' header. "
+                        "Expected 'Authorization: Bearer <JWT>'")
+    parts = tokens[0].split()
+    if len(parts) != 2:
+        raise AuthError("Bad Authorization header. Expected 'Authorization: Bearer <JWT>'", 422)
+    return parts[1]
+
+
+async def verify_access_token(request):
+    """Return the identity of a valid, current access token or raise AuthError."""
+    token = _token_from_header(request)
+    try:
+        claims = jwt.decode(
+            token,
+            JWT_SECRET_KEY,
+            algorithms=[JWT_ALGORITHM],
+            options={"verify_aud": False, "verify_sub": False},
+        )
+    except jwt.ExpiredSignatureError:
+        raise AuthError("Token has expired")
+    except jwt.InvalidTokenError as e:
+        raise AuthError(f"Invalid token: {e}")
+
+    user_id = claims.get("sub")
+    if user_id is None:
+        raise AuthError("Invalid token: Missing claim: sub")
+    if claims.get("type", "access") != "access":
+        raise AuthError("Only non-refresh tokens are allowed", 422)
+
+    # Same session rule as check_if_token_revoked in app.py
+    jti = claims.get("jti")
+    session_jti = await get_session_jti(user_id) if jti else None
+    if not session_jti or session_jti != jti:
+        raise AuthError("Token has been revoked")
+    return user_id
+
+
+def jwt_required(handler):
+    @wraps(handler)
+    async def wrapper(request):
+        try:
+            user_id = await verify_access_token(request)
+        except AuthError as e:
+            return json_response({"msg": e.msg}, e.status)
+        record_heartbeat(user_id)
+        return await handler(request)
+    return wrapper
+
+
+# --- Routes ----
+@jwt_required
+async def get_current_weather(request):
+    try:
+        data = await get_json(request)
+        if not data:
+            return json_response({"error": "No JSON data provided"}, 400)
+
+        selected_date = data.get("params")["selectedDate"]
+        time_type = await column_type("weatherdata.weather_hourly_data_all_india", "time")
+        result = await fetch(
+            f"""
+            SELECT temp_c, chance_of_rain, wind_kph, humidity, vis_km, latitude, longitude, city_name
+                FROM weatherdata.weather_hourly_data_all_india
+                WHERE time = $1::text::{time_type}
+            ORDER BY city_name ASC;
+            """,
+            selected_date,
+        )
+        return json_response({"status": "success", "data": result})
+    except Exception as e:
+        return json_response({"msg": f"Internal Server error: {str(e)}"}, 500)
+
+
+@jwt_required
+async def get_hazards(request):
+    try:
+        payload = await get_json(request)
+        table_name = HAZARD_TABLE_MAP.get(payload.get("hazard"), None)
+        result = await fetch(QUERIES[f"{table_name}_forecast"])
+        for item in result:
+            if "district" in item and isinstance(item["district"], str):
+                item["district"] = [d.strip() for d in item["district"].split(",")]
+        return json_response({"status": "success", "data": result})
+    except Exception as e:
+        return json_response({"msg": f"Internal Server error: {str(e)}"}, 500)
+
+
+@jwt_required
+async def get_district_wise_hazards(request):
+    try:
+        payload = await get_json(request)
+        table_name = HAZARD_TABLE_MAP.get(payload.get("hazardType"), None)
+        rows = await fetch(QUERIES[f"{table_name}_district_wise"], payload.get("circle"))
+        df = pd.DataFrame(rows, columns=["district", "indus_circle", "days", "date", "severity"])
+        df["risk"] = hazard_risk_labels(df["severity"])
+        result = pivot_district_days(
+            df,
+            {"date": "date", "severity": "risk", "for_color": "severity", "indus_circle": "indus_circle"},
+        )
+        return json_response({"status": "success", "data": result})
+    except Exception as e:
+        return json_response({"msg": f"Internal Server error: {str(e)}"}, 500)
+
+
+@jwt_required
+async def fetch_accumulated_rainfall(request):
+    try:
+        payload = await get_json(request)
+        circle = payload.get("circle")
+        if not circle:
+            return json_response({"status": "error", "message": "Circle is required"}, 400)
+
+        result = await fetch(QUERIES["accumulated_rainfall"], circle)
+        return json_response({"status": "success", "data": result, "count": len(result)})
+    except Exception as e:
+        return json_response(
+            {"status": "error", "message": "Internal Server Error", "error": str(e)}, 500
+        )
+
+
+@jwt_required
+async def get_earthquake(request):
+    try:
+        result = await fetch(QUERIES["earthquakes_recent"])
+        return json_response({"status": "success", "data": result})
+    except Exception as e:
+        return json_response({"msg": f"Internal Server error: {str(e)}"}, 500)
+
+
+def _if_none_match(request):
+    header = request.headers.get("If-None-Match", "")
+    return {tag.strip().removeprefix("W/").strip('"') for tag in header.split(",") if tag.strip()}
+
+
+async def boundary_response(request, layer, circle=None, payload=None):
+    try:
+        payload = payload or {}
+        level = resolution_level(payload.get("resolution"), payload.get("zoom"))
+        # Cached in memory; a rebuild runs the psycopg2/geopandas path off the event loop
+        entry = await run_in_threadpool(get_boundary_entry, layer, circle, level)
+        headers = {"ETag": f'"{entry.etag}"', "Vary": "Accept-Encoding"}
+        tags = _if_none_match(request)
+        if entry.etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(entry.gzip_body, media_type="application/json", headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+    except Exception as e:
+        return json_response(
+            {"status": "error", "message": "Internal Server Error", "error": str(e)}, 500
+        )
+
+
+@jwt_required
+async def get_indus_circle_boundary(request):
+    payload = await get_json(request)
+    return await boundary_response(request, "indus_circle", payload.get("circle"), payload)
+
+
+@jwt_required
+async def get_district_boundary(request):
+    payload = await get_json(request)
+    return await boundary_response(request, "district", payload.get("circle"), payload)
+
+
+@jwt_required
+async def get_indus_boundary(request):
+    return await boundary_response(request, "indus_boundary")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await init_async_pool()
+    yield
+    await close_async_pool()
+
+
+app = Starlette(
+    routes=[
+        Route("/get-current-weather", get_current_weather, methods=["POST"]),
+        Route("/get-hazards", get_hazards, methods=["POST"]),
+        Route("/get-district-wise-hazards", get_district_wise_hazards, methods=["POST"]),
+        Route("/fetch_accumulated_rainfall", fetch_accumulated_rainfall, methods=["POST"]),
+        Route("/get-earthquake", get_earthquake, methods=["POST"]),
+        Route("/get_indus_circle_boundary", get_indus_circle_boundary, methods=["POST"]),
+        Route("/get_district_boundary", get_district_boundary, methods=["POST"]),
+        Route("/get_indus_boundary", get_indus_boundary, methods=["POST"]),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import time
+
+import asyncpg
+from dotenv import load_dotenv
+
+from session_cache import SESSION_CACHE_TTL, SESSION_CHANNEL
+load_dotenv()
+
+# asyncpg pool and session lookup for the ASGI read tier (asgi_app.py).
+# Rows decode to the same Python values psycopg2 returns, so responses keep
+# their shape: json/jsonb are parsed and float4 goes through its text form.
+async_pool = None
+
+_sessions = {}  # user_id -> (jti, cached_until)
+_column_types = {}  # (table, column) -> declared type
+# Bumped on every invalidation, as in session_cache, so a lookup that awaited
+# across a logout/login NOTIFY does not cache the jti it read before it
+_generation = 0
+_user_generations = {}
+_listener_conn = None
+_listener_task = None
+
+
+def _dsn():
+    return dict(
+        host=os.environ.get("DB_HOST"),
+        database=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASS"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+    )
+
+
+async def _init_connection(conn):
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(typename, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    await conn.set_type_codec("float4", encoder=str, decoder=float, schema="pg_catalog", format="text")
+
+
+async def init_async_pool():
+    global async_pool, _listener_task
+    if async_pool is None:
+        statement_timeout = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 60000))
+        async_pool = await asyncpg.create_pool(
+            min_size=int(os.environ.get("ASYNC_DB_POOL_MIN", 2)),
+            max_size=int(os.environ.get("ASYNC_DB_POOL_MAX", 20)),
+            server_settings={"statement_timeout": str(statement_timeout)},
+            init=_init_connection,
+            **_dsn(),
+        )
+        _listener_task = asyncio.create_task(_listen_sessions())
+    return async_pool
+
+
+async def close_async_pool():
+    global async_pool, _listener_task
+    if _listener_task:
+        _listener_task.cancel()
+        _listener_task = None
+    if async_pool:
+        await async_pool.close()
+        async_pool = None
+
+
+async def fetch(sql, *args):
+    """Run a read query and return the rows as dicts."""
+    async with async_pool.acquire() as conn:
+        return [dict(row) for row in await conn.fetch(sql, *args)]
+
+
+async def column_type(table, column):
+    """
+    Declared type of table.column. asyncpg binds typed parameters, so text
+    parameters are cast to it ($1::text::<type>) rather than casting the
+    column, which would keep its index from being used.
+    """
+    key = (table, column)
+    if key not in _column_types:
+        async with async_pool.acquire() as conn:
+            _column_types[key] = await conn.fetchval(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute WHERE attrelid = to_regclass($1) AND attname = $2",
+                table,
+                column,
+            )
+    return _column_types[key]
+
+
+def _clear_sessions():
+    global _generation
+    _generation += 1
+    _sessions.clear()
+
+
+def _on_session_notify(conn, pid, channel, payload):
+    if payload:
+        _sessions.pop(payload, None)
+        _user_generations[payload] = _user_generations.get(payload, 0) + 1
+    else:
+        _clear_sessions()
+
+
+async def _listen_sessions():
+    global _listener_conn
+    while True:
+        try:
+            _listener_conn = await asyncpg.connect(**_dsn())
+            await _listener_conn.add_listener(SESSION_CHANNEL, _on_session_notify)
+            # Anything cached before LISTEN was active may have missed a notify
+            _clear_sessions()
+            while not _listener_conn.is_closed():
+                await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            if _listener_conn:
+                await _listener_conn.close()
+            raise
+        except Exception as e:
+            print("Async session listener error:", e)
+        finally:
+            _clear_sessions()
+        _listener_conn = None
+        await asyncio.sleep(5)
+
+
+async def get_session_jti(user_id):
+    """Async counterpart of session_cache.get_session_jti."""
+    key = str(user_id)
+    now = time.monotonic()
+    # Without a live listener the cache can go stale, so bypass it
+    listening = _listener_conn is not None and not _listener_conn.is_closed()
+
+    if listening:
+        cached = _sessions.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+
+    generation = (_generation, _user_generations.get(key, 0))
+    user_id_type = await column_type("weatherdata.user_sessions", "user_id")
+    async with async_pool.acquire() as conn:
+        jti = await conn.fetchval(f"SELECT jti FROM weatherdata.user_sessions WHERE user_id = $1::text::{user_id_type}", key)
+    # Listener resets and notifies both bump a generation
+    if listening and generation == (_generation, _user_generations.get(key, 0)):
+        _sessions[key] = (jti, now + SESSION_CACHE_TTL)
+    return jti
@@ -0,0 +1,85 @@
+import json
+import os
+import time
+
+from flask import Response, current_app, g, request
+
+from db import get_db_conn, release_db_conn
+
+# /batch: the read endpoints a dashboard view opens with, served in one round
+# trip. The token is checked once for the batch, and every sub-request runs
+# in turn on one pool connection (lent through g.batch_conn, see db.py), so
+# the prepared statements of query_catalog are reused across them. Each
+# sub-request still goes through its view's @cached_response.
+#
+# Every path here is registered as @app.route / @cross_origin / @jwt_required,
+# so the view without those two wrappers is view_functions[...].__wrapped__.__wrapped__.
+BATCH_PATHS = {
+    "/get_circle_list",
+    "/get_district_list",
+    "/fetch_kpi_legend_with_color",
+    "/fetch_district_wise_KPI_values",
+    "/fetch_accumulated_rainfall",
+    "/get-district-wise-hazards",
+    "/get-hazard-affected-district",
+    "/get_indus_circle_boundary",
+    "/get_district_boundary",
+    "/get_indus_boundary",
+}
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", 20))
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _run_sub_request(path, body):
+    headers = {"Authorization": request.headers.get("Authorization", "")}
+    # Shares the batch's app context, so g (token, batch_conn) carries over
+    with current_app.test_request_context(path, method="POST", json=body, headers=headers):
+        try:
+            view = current_app.view_functions[request.url_rule.endpoint].__wrapped__.__wrapped__
+            return current_app.make_response(view(**request.view_args))
+        except Exception as e:
+            return current_app.make_response(({"msg": f"Internal Server error: {str(e)}"}, 500))
+
+
+def _result_json(item_id, path, status, elapsed_ms, body):
+    meta = json.dumps({"id": item_id, "path": path, "status": status, "elapsed_ms": elapsed_ms})
+    # Response bodies are spliced in as they are rather than parsed and re-encoded
+    return f'{meta[:-1]}, "body": {body}}}'
+
+
+def run_batch(items):
+    """
+    Run items, a list of {"id", "path", "body"} sub-requests, and return the
+    combined JSON response with each sub-request's status, body and timing.
+    """
+    started = time.perf_counter()
+    results = []
+    g.batch_conn = get_db_conn()
+    try:
+        for index, item in enumerate(items):
+            item_started = time.perf_counter()
+            item_id = item.get("id", index)
+            path = item.get("path")
+            if not isinstance(path, str) or path not in BATCH_PATHS:
+                body = json.dumps({"msg": f"Path not allowed in batch: {path}"})
+                results.append(_result_json(item_id, path, 400, _elapsed_ms(item_started), body))
+                continue
+
+            response = _run_sub_request(path, item.get("body") or {})
+            # A failed sub-request must not leave the shared connection aborted
+            g.batch_conn.rollback()
+            body = response.get_data(as_text=True) if response.is_json else ""
+            results.append(
+                _result_json(item_id, path, response.status_code, _elapsed_ms(item_started), body or "null")
+            )
+    finally:
+        release_db_conn(g.pop("batch_conn", None))
+
+    body = '{"status": "success", "elapsed_ms": %s, "responses": [%s]}' % (
+        _elapsed_ms(started),
+        ", ".join(results),
+    )
+    return Response(body, mimetype="application/json")
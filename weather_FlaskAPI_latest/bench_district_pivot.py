@@ -0,0 +1,110 @@
+"""
+Benchmark: district x day nesting used by /get-district-wise-hazards and
+/fetch_district_wise_KPI_values, old groupby()/iterrows() loop vs
+help_func.pivot_district_days.
+
+    python bench_district_pivot.py [districts ...]
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from help_func import hazard_risk_labels, pivot_district_days
+
+DAYS = [f"Day{i}" for i in range(1, 8)]
+SEVERITIES = ["Extreme", "High", "Moderate", "Low", "Other"]
+KPI_COLUMNS = [
+    "date", "temp_min", "temp_max", "rain_percent", "rain_precip", "wind", "visibility",
+    "humidity", "temp_max_severity", "temp_min_severity", "rain_severity", "wind_severity",
+    "visibility_severity", "humidity_severity", "indus_circle",
+]
+
+
+def make_frame(districts, seed=7):
+    rng = np.random.default_rng(seed)
+    n = districts * len(DAYS)
+    today = date.today()
+    df = pd.DataFrame({
+        "district": np.repeat([f"District {i:05d}" for i in range(districts)], len(DAYS)),
+        "days": np.tile(DAYS, districts),
+        "date": np.tile([today + timedelta(days=i) for i in range(len(DAYS))], districts),
+        "indus_circle": "UP East",
+        "severity": rng.choice(SEVERITIES, n),
+        "temp_min": rng.uniform(5, 25, n).round(1),
+        "temp_max": rng.uniform(20, 45, n).round(1),
+        "rain_percent": rng.integers(0, 100, n),
+        "rain_precip": rng.uniform(0, 80, n).round(2),
+        "wind": rng.uniform(0, 60, n).round(1),
+        "visibility": rng.uniform(0, 10, n).round(1),
+        "humidity": rng.integers(10, 100, n),
+    })
+    for col in ["temp_max_severity", "temp_min_severity", "rain_severity", "wind_severity",
+                "visibility_severity", "humidity_severity"]:
+        df[col] = rng.choice(SEVERITIES, n)
+    # query output is not grouped by district
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def legacy_hazards(df):
+    result = []
+    for district, group in df.groupby("district"):
+        district_data = {"district": district}
+        for _, row in group.iterrows():
+            district_data[row["days"]] = {
+                "date": row["date"],
+                "severity": "No Risk" if row["severity"] == "Other" or row["severity"] == "Low" else f"{row['severity']} Risk",
+                "for_color": row["severity"],
+                "indus_circle": row["indus_circle"],
+            }
+        result.append(district_data)
+    return result
+
+
+def pivot_hazards(df):
+    df = df.copy()
+    df["risk"] = hazard_risk_labels(df["severity"])
+    return pivot_district_days(
+        df, {"date": "date", "severity": "risk", "for_color": "severity", "indus_circle": "indus_circle"}
+    )
+
+
+def legacy_kpi(df):
+    result = []
+    for district, group in df.groupby("district"):
+        district_data = {"district": district}
+        for _, row in group.iterrows():
+            district_data[row["days"]] = {col: row[col] for col in KPI_COLUMNS}
+        result.append(district_data)
+    return result
+
+
+def pivot_kpi(df):
+    return pivot_district_days(df, KPI_COLUMNS)
+
+
+def best_of(func, df, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main(sizes):
+    print(f"{'case':<10}{'districts':>10}{'legacy ms':>12}{'pivot ms':>12}{'speedup':>10}")
+    for districts in sizes:
+        df = make_frame(districts)
+        for name, legacy, fast in [("hazards", legacy_hazards, pivot_hazards), ("kpi", legacy_kpi, pivot_kpi)]:
+            old_t, old_out = best_of(legacy, df)
+            new_t, new_out = best_of(fast, df)
+            assert old_out == new_out, f"{name}: output differs"
+            print(f"{name:<10}{districts:>10}{old_t * 1000:>12.1f}{new_t * 1000:>12.1f}{old_t / new_t:>9.1f}x")
+
+
+if __name__ == "__main__":
+    # ~150 districts is a large circle today; the second size is 10x that
+    main([int(arg) for arg in sys.argv[1:]] or [150, 1500])
@@ -0,0 +1,118 @@
+"""
+Benchmark: response encoding with Flask's default JSON provider vs
+json_provider.OrjsonProvider, on payloads shaped like /get-current-weather,
+/get-hazards and the district boundary GeoJSON.
+
+    python bench_json_provider.py [scale]
+
+Reports best-of encode time and peak traced memory per payload.
+"""
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from flask import Flask
+
+from json_provider import OrjsonProvider, orjson
+
+
+def current_weather(rows, rng):
+    hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+    return {"status": "success", "data": [
+        {
+            "temp_c": Decimal(f"{rng.uniform(5, 45):.1f}"),
+            "chance_of_rain": int(rng.integers(0, 100)),
+            "wind_kph": float(rng.uniform(0, 60)),
+            "humidity": int(rng.integers(10, 100)),
+            "vis_km": Decimal(f"{rng.uniform(0, 10):.1f}"),
+            "latitude": float(rng.uniform(8, 37)),
+            "longitude": float(rng.uniform(68, 97)),
+            "city_name": f"City {i:05d}",
+            "time": hour,
+        }
+        for i in range(rows)
+    ]}
+
+
+def hazards(rows, rng):
+    today = date.today()
+    return {"status": "success", "data": [
+        {
+            "id": i,
+            "days": f"Day{i % 7 + 1}",
+            "date": today + timedelta(days=i % 7),
+            "indus_circle": f"Circle {i % 22}",
+            "district": [f"District {d}" for d in rng.integers(0, 700, 12)],
+            "severity": ["Extreme", "High", "Moderate", "Low"][i % 4],
+            "insert_at": datetime.now(),
+        }
+        for i in range(rows)
+    ]}
+
+
+def district_geojson(features, rng, vertices=400):
+    def ring():
+        angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+        cx, cy = rng.uniform(68, 97), rng.uniform(8, 37)
+        coords = [(cx + 0.3 * np.cos(a), cy + 0.3 * np.sin(a)) for a in angles.tolist()]
+        return tuple(coords + coords[:1])
+
+    return {"status": "success", "data": {"type": "FeatureCollection", "features": [
+        {
+            "id": str(i),
+            "type": "Feature",
+            "properties": {
+                "district": f"District {i}",
+                "state_ut": f"State {i % 36}",
+                "indus_circle": f"Circle {i % 22}",
+                "indus_zone": ["North", "South", "East", "West"][i % 4],
+                "indus_circle_name": f"Circle {i % 22}",
+            },
+            "geometry": {"type": "Polygon", "coordinates": (ring(),)},
+        }
+        for i in range(features)
+    ]}}
+
+
+def measure(app, payload, repeat=3):
+    best = float("inf")
+    with app.app_context():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = app.json.response(payload).get_data()
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        app.json.response(payload).get_data()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak, body
+
+
+def main(scale):
+    if orjson is None:
+        sys.exit("orjson is not installed")
+    rng = np.random.default_rng(7)
+    default_app = Flask("default")
+    fast_app = Flask("orjson")
+    fast_app.json = OrjsonProvider(fast_app)
+
+    payloads = [
+        ("current-weather", current_weather(6000 * scale, rng)),
+        ("hazards", hazards(5000 * scale, rng)),
+        ("districts-geojson", district_geojson(750 * scale, rng)),
+    ]
+    print(f"{'payload':<20}{'MB':>7}{'default ms':>12}{'orjson ms':>11}{'speedup':>9}"
+          f"{'default peak MB':>17}{'orjson peak MB':>16}")
+    for name, payload in payloads:
+        old_t, old_peak, old_body = measure(default_app, payload)
+        new_t, new_peak, new_body = measure(fast_app, payload)
+        assert orjson.loads(old_body) == orjson.loads(new_body), f"{name}: output differs"
+        print(f"{name:<20}{len(new_body) / 1e6:>7.1f}{old_t * 1000:>12.1f}{new_t * 1000:>11.1f}"
+              f"{old_t / new_t:>8.1f}x{old_peak / 1e6:>17.1f}{new_peak / 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+import os
+import time
+from threading import Lock
+
+import geopandas as gpd
+import pandas as pd
+from shapely import wkt
+
+from data_version import get_data_version
+from db import get_db_conn, release_db_conn
+from json_provider import dumps_bytes
+from simplify_boundaries import geometry_column, simplified_columns_available
+
+# Serialized boundary responses, built once per (layer, circle, level) and reused
+# until the source table's data_version changes. If versions are unavailable
+# an entry is rebuilt after BOUNDARY_CACHE_MAX_AGE seconds instead.
+#
+# circle comes from the request body, so it is checked against the circles of
+# the layer's source table first; any other value gets the shared empty
+# response and never adds a cache entry or build lock.
+BOUNDARY_CACHE_MAX_AGE = float(os.environ.get("BOUNDARY_CACHE_MAX_AGE", 3600))
+
+BOUNDARY_LAYERS = {
+    "indus_circle": {
+        "source": "indus_circle_geomerty",
+        "simplified": True,
+        "sql": """SELECT state_ut, indus_circle, indus_zone, indus_circle_name, ST_AsText({geometry}) as geometry
+                    FROM weatherdata.indus_circle_geomerty where ( 'All Circle' = %(circle)s or indus_circle = %(circle)s);""",
+    },
+    "district": {
+        "source": "district_geometry",
+        "simplified": True,
+        "sql": """SELECT district, state_ut, indus_circle, indus_zone, indus_circle_name, ST_AsText({geometry}) as geometry
+                    FROM weatherdata.district_geometry where indus_circle is not null AND ('All Circle' = %(circle)s or indus_circle = %(circle)s);""",
+    },
+    "indus_boundary": {
+        "source": "indus_boundary_geomerty",
+        "simplified": False,
+        "sql": """SELECT state_ut, indus_circle, indus_zone, ST_AsText(geometry) as geometry
+                    FROM weatherdata.indus_boundary_geomerty;""",
+    },
+}
+
+ALL_CIRCLES = "All Circle"
+
+CIRCLES_SQL = "SELECT DISTINCT indus_circle FROM weatherdata.{source} WHERE indus_circle IS NOT NULL;"
+
+_entries = {}  # (layer, circle, level) -> BoundaryEntry
+_lock = Lock()
+_build_locks = {}
+_circles = {}  # source -> _CircleSet
+_empty_entry = None
+
+
+class BoundaryEntry:
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6)
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.built_at = time.monotonic()
+
+
+class _CircleSet:
+    def __init__(self, version, circles):
+        self.version = version
+        self.circles = circles
+        self.built_at = time.monotonic()
+
+
+def _build_geojson(layer, circle, level):
+    if level and not simplified_columns_available():
+        level = 0
+    sql = BOUNDARY_LAYERS[layer]["sql"].format(geometry=geometry_column(level))
+    conn = get_db_conn()
+    try:
+        df = pd.read_sql(sql, conn, params={"circle": circle})
+    finally:
+        release_db_conn(conn)
+    df["geometry"] = df["geometry"].apply(wkt.loads)
+    gdf = gpd.GeoDataFrame(df, geometry="geometry", crs="EPSG:4326")
+    # Plain dict, no to_json()/json.loads round trip
+    return gdf.to_geo_dict()
+
+
+def _serialize(payload):
+    # Same encoding as jsonify responses
+    return dumps_bytes(payload)
+
+
+def _is_fresh(entry, version):
+    if entry is None:
+        return False
+    if version is None:
+        return time.monotonic() - entry.built_at < BOUNDARY_CACHE_MAX_AGE
+    return entry.version == version
+
+
+def _known_circles(source, version):
+    known = _circles.get(source)
+    if not _is_fresh(known, version):
+        conn = get_db_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(CIRCLES_SQL.format(source=source))
+                circles = frozenset(row[0] for row in cur.fetchall())
+        finally:
+            release_db_conn(conn)
+        known = _circles[source] = _CircleSet(version, circles)
+    return known.circles
+
+
+def _empty():
+    global _empty_entry
+    if _empty_entry is None:
+        empty = {"type": "FeatureCollection", "features": []}
+        _empty_entry = BoundaryEntry(None, _serialize({"status": "success", "data": empty}))
+    return _empty_entry
+
+
+def get_boundary_entry(layer, circle=None, level=0):
+    """Cached response body for a boundary layer, rebuilt when its source table changes."""
+    source = BOUNDARY_LAYERS[layer]["source"]
+    version = get_data_version(source)
+    if not BOUNDARY_LAYERS[layer]["simplified"]:
+        # Layers without a circle filter are cached once
+        circle, level = None, 0
+    elif not isinstance(circle, str) or (circle != ALL_CIRCLES and circle not in _known_circles(source, version)):
+        return _empty()
+    key = (layer, circle, level)
+    entry = _entries.get(key)
+    if _is_fresh(entry, version):
+        return entry
+
+    with _lock:
+        build_lock = _build_locks.setdefault(key, Lock())
+    # One build per key; concurrent callers wait and reuse the result
+    with build_lock:
+        entry = _entries.get(key)
+        if _is_fresh(entry, version):
+            return entry
+        geojson = _build_geojson(layer, circle, level)
+        entry = BoundaryEntry(version, _serialize({"status": "success", "data": geojson}))
+        _entries[key] = entry
+        return entry
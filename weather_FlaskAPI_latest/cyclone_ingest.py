@@ -0,0 +1,307 @@
+import csv
+import io
+import json
+
+from psycopg2 import errors
+
+from db import get_db_conn, release_db_conn
+
+# Bulk load of the uploaded cyclone track files (point / cone / buffer
+# FeatureCollections). Every feature of every file goes through one COPY into
+# a temp staging table, and a single INSERT ... SELECT stores each geometry
+# both as the JSON readers such as API_ORG still select and as PostGIS geom,
+# all in one transaction. Geometries are checked while the COPY buffer is
+# written, so a malformed feature is rejected (ValueError, a 400) before
+# anything reaches the database.
+#
+# weatherdata.cyclone_upload_snapshot has one row per upload_time with the
+# feature counts and the response GeoJSON ({point, cone, buffer}
+# FeatureCollections) assembled once, in the upload's transaction, so
+# /get_cyclone_geojson reads a primary-key index instead of the feature table.
+# The columns, the snapshot table and the geom backfill come from
+# `python migrate.py`.
+CYCLONE_DATA_TYPES = ("point", "cone", "buffer")
+
+CYCLONE_UPLOAD_DDL = """
+ALTER TABLE weatherdata.cyclone_data_from_uploaded_file
+    ADD COLUMN IF NOT EXISTS geom geometry(Geometry, 4326);
+
+DROP FUNCTION IF EXISTS weatherdata.cyclone_geom_from_geojson(TEXT);
+
+CREATE INDEX IF NOT EXISTS idx_cyclone_data_from_uploaded_file_upload_time
+    ON weatherdata.cyclone_data_from_uploaded_file (upload_time);
+"""
+
+# Rows stored before the geom column, and rows written without it (API_ORG)
+BACKFILL_GEOM_SQL = """
+UPDATE weatherdata.cyclone_data_from_uploaded_file
+SET geom = ST_SetSRID(ST_GeomFromGeoJSON(geometry::text), 4326)
+WHERE geom IS NULL AND geometry IS NOT NULL AND geometry::text <> 'null';
+"""
+
+# Row by row, only when the single UPDATE hit stored JSON PostGIS rejects
+# (it raises internal_error, malformed JSON a data_exception); those rows keep
+# geom NULL and are served from their JSON
+BACKFILL_GEOM_ROWS_SQL = """
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT ctid AS row_ctid, geometry::text AS g FROM weatherdata.cyclone_data_from_uploaded_file
+        WHERE geom IS NULL AND geometry IS NOT NULL AND geometry::text <> 'null'
+    LOOP
+        BEGIN
+            UPDATE weatherdata.cyclone_data_from_uploaded_file
+            SET geom = ST_SetSRID(ST_GeomFromGeoJSON(r.g), 4326)
+            WHERE ctid = r.row_ctid;
+        EXCEPTION WHEN internal_error OR data_exception THEN
+            RAISE NOTICE 'cyclone geometry not converted: %', SQLERRM;
+        END;
+    END LOOP;
+END
+$$;
+"""
+
+STAGE_DDL = """
+CREATE TEMP TABLE cyclone_upload_stage (
+    data_type TEXT NOT NULL,
+    properties TEXT,
+    geometry TEXT
+) ON COMMIT DROP;
+"""
+
+INSERT_FROM_STAGE_SQL = """
+    WITH inserted AS (
+        INSERT INTO weatherdata.cyclone_data_from_uploaded_file
+            (data_type, properties, geometry, geom, upload_time)
+        SELECT
+            data_type,
+            properties::json,
+            COALESCE(geometry, 'null')::json,
+            ST_SetSRID(ST_GeomFromGeoJSON(geometry), 4326),
+            %s
+        FROM cyclone_upload_stage
+        RETURNING data_type
+    )
+    SELECT data_type, COUNT(*) FROM inserted GROUP BY data_type;
+"""
+
+# Geometry goes back out as GeoJSON, falling back to the stored JSON for rows
+# the backfill could not convert
+CYCLONE_GEOMETRY_SQL = "COALESCE(ST_AsGeoJSON(geom)::json, geometry::json)"
+
+# upload_time keeps the feature table's column type
+SNAPSHOT_TABLE_DDL = """
+CREATE TABLE weatherdata.cyclone_upload_snapshot AS
+SELECT
+    upload_time,
+    0 AS point_count,
+    0 AS cone_count,
+    0 AS buffer_count,
+    0 AS feature_count,
+    NULL::json AS geojson,
+    NOW() AS refreshed_at
+FROM weatherdata.cyclone_data_from_uploaded_file
+WITH NO DATA;
+
+ALTER TABLE weatherdata.cyclone_upload_snapshot ADD PRIMARY KEY (upload_time);
+"""
+
+# Rebuilds the snapshot of one upload_time, or of all of them when it is NULL
+REFRESH_SNAPSHOT_SQL = f"""
+    INSERT INTO weatherdata.cyclone_upload_snapshot AS s
+        (upload_time, point_count, cone_count, buffer_count, feature_count, geojson, refreshed_at)
+    SELECT
+        upload_time,
+        COUNT(*) FILTER (WHERE data_type = 'point'),
+        COUNT(*) FILTER (WHERE data_type = 'cone'),
+        COUNT(*) FILTER (WHERE data_type = 'buffer'),
+        COUNT(*),
+        json_build_object(
+            'point', json_build_object('type', 'FeatureCollection', 'features',
+                COALESCE(json_agg(feature) FILTER (WHERE data_type = 'point'), '[]'::json)),
+            'cone', json_build_object('type', 'FeatureCollection', 'features',
+                COALESCE(json_agg(feature) FILTER (WHERE data_type = 'cone'), '[]'::json)),
+            'buffer', json_build_object('type', 'FeatureCollection', 'features',
+                COALESCE(json_agg(feature) FILTER (WHERE data_type = 'buffer'), '[]'::json))
+        ),
+        NOW()
+    FROM (
+        SELECT
+            upload_time,
+            data_type,
+            json_build_object(
+                'type', 'Feature',
+                'properties', COALESCE(NULLIF(properties::text, 'null'), '{{}}')::json,
+                'geometry', {CYCLONE_GEOMETRY_SQL}
+            ) AS feature
+        FROM weatherdata.cyclone_data_from_uploaded_file
+        WHERE %(upload_time)s IS NULL OR upload_time = %(upload_time)s
+    ) f
+    GROUP BY upload_time
+    ON CONFLICT (upload_time) DO UPDATE SET
+        point_count = EXCLUDED.point_count,
+        cone_count = EXCLUDED.cone_count,
+        buffer_count = EXCLUDED.buffer_count,
+        feature_count = EXCLUDED.feature_count,
+        geojson = EXCLUDED.geojson,
+        refreshed_at = EXCLUDED.refreshed_at;
+"""
+
+CYCLONE_UPLOAD_TIMES_SQL = """
+    SELECT upload_time FROM weatherdata.cyclone_upload_snapshot ORDER BY upload_time DESC;
+"""
+
+CYCLONE_SNAPSHOT_SQL = """
+    SELECT geojson FROM weatherdata.cyclone_upload_snapshot WHERE upload_time = %s;
+"""
+
+def migrate_cyclone_upload(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('cyclone_data_from_uploaded_file'))")
+        cur.execute(CYCLONE_UPLOAD_DDL)
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT backfill_geom")
+        try:
+            cur.execute(BACKFILL_GEOM_SQL)
+        except (errors.InternalError_, errors.DataError):
+            cur.execute("ROLLBACK TO SAVEPOINT backfill_geom")
+            cur.execute(BACKFILL_GEOM_ROWS_SQL)
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('cyclone_upload_snapshot'))")
+        cur.execute("SELECT to_regclass('weatherdata.cyclone_upload_snapshot')")
+        if cur.fetchone()[0] is None:
+            cur.execute(SNAPSHOT_TABLE_DDL)
+            refresh_cyclone_snapshot(cur)
+    conn.commit()
+
+
+def cyclone_data_type(file_key):
+    # Detect file source type from the form field name
+    key = file_key.lower()
+    for data_type in CYCLONE_DATA_TYPES:
+        if data_type in key:
+            return data_type
+    return "unknown"
+
+
+# Nesting depth of "coordinates" per GeoJSON geometry type
+GEOMETRY_DEPTHS = {
+    "Point": 1,
+    "MultiPoint": 2,
+    "LineString": 2,
+    "MultiLineString": 3,
+    "Polygon": 3,
+    "MultiPolygon": 4,
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _valid_coordinates(coordinates, depth):
+    if not isinstance(coordinates, list):
+        return False
+    if depth == 1:
+        return len(coordinates) >= 2 and all(_is_number(c) for c in coordinates)
+    return all(_valid_coordinates(c, depth - 1) for c in coordinates)
+
+
+def check_geometry(geometry):
+    """Raise ValueError for a GeoJSON geometry ST_GeomFromGeoJSON would fail on (None is allowed)."""
+    if geometry is None:
+        return
+    kind = geometry.get("type") if isinstance(geometry, dict) else None
+    if kind == "GeometryCollection":
+        members = geometry.get("geometries")
+        if not isinstance(members, list) or None in members:
+            raise ValueError("Invalid GeometryCollection")
+        for member in members:
+            check_geometry(member)
+    elif kind not in GEOMETRY_DEPTHS:
+        raise ValueError(f"Invalid geometry type: {kind!r}")
+    elif not _valid_coordinates(geometry.get("coordinates"), GEOMETRY_DEPTHS[kind]):
+        raise ValueError(f"Invalid {kind} coordinates")
+
+
+def copy_cyclone_features(cur, upload_time, collections):
+    """
+    Load (data_type, FeatureCollection dict) pairs for one upload_time.
+    Returns {data_type: rows inserted}; the caller commits.
+    Raises ValueError for a malformed feature, before anything is written.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+    for data_type, collection in collections:
+        if not isinstance(collection["features"], list):
+            raise ValueError(f"{data_type}: features must be a list")
+        for index, feature in enumerate(collection["features"]):
+            if not isinstance(feature, dict):
+                raise ValueError(f"{data_type} feature {index}: not an object")
+            geometry = feature.get("geometry")
+            try:
+                check_geometry(geometry)
+            except ValueError as e:
+                raise ValueError(f"{data_type} feature {index}: {e}")
+            writer.writerow([
+                data_type,
+                json.dumps(feature.get("properties")),
+                "" if geometry is None else json.dumps(geometry),
+            ])
+
+    counts = {data_type: 0 for data_type, _ in collections}
+    if not buffer.tell():
+        return counts
+
+    buffer.seek(0)
+    cur.execute(STAGE_DDL)
+    cur.copy_expert(
+        """
+        COPY cyclone_upload_stage (data_type, properties, geometry)
+        FROM STDIN WITH (FORMAT csv, FORCE_NULL (geometry))
+        """,
+        buffer,
+    )
+    cur.execute(INSERT_FROM_STAGE_SQL, (upload_time,))
+    counts.update(dict(cur.fetchall()))
+    refresh_cyclone_snapshot(cur, upload_time)
+    return counts
+
+
+def refresh_cyclone_snapshot(cur, upload_time=None):
+    """Rebuild the snapshot row of upload_time (all rows when None) on the caller's cursor."""
+    if upload_time is not None:
+        # Concurrent uploads of one upload_time each rebuild after the other commits
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"cyclone_upload_snapshot:{upload_time}",))
+    cur.execute(REFRESH_SNAPSHOT_SQL, {"upload_time": upload_time})
+
+
+def empty_cyclone_geojson():
+    return {
+        data_type: {"type": "FeatureCollection", "features": []}
+        for data_type in CYCLONE_DATA_TYPES
+    }
+
+
+def rebuild_cyclone_snapshots():
+    """Recompute every snapshot row from the feature table."""
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            refresh_cyclone_snapshot(cur)
+            rows = cur.rowcount
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_conn(conn)
+
+
+if __name__ == "__main__":
+    print(f"cyclone_upload_snapshot: {rebuild_cyclone_snapshots()} rows rebuilt")
@@ -0,0 +1,161 @@
+import os
+import time
+from threading import Lock
+
+import pg_listener
+from db import get_db_conn, release_db_conn
+
+# weatherdata.data_version holds one counter per source table. Statement
+# triggers bump it whenever the table changes and NOTIFY the table name on
+# DATA_VERSION_CHANNEL, so caches built from a table only need to compare
+# this number to know whether they are stale. The ingestion pipelines need
+# no changes: their writes fire the triggers. The table and the triggers are
+# installed by `python migrate.py`; a table without its trigger has no
+# version and its readers fall back to their own max age.
+#
+# While the listener is up versions are cached until the next notify;
+# otherwise they are re-read at most every DATA_VERSION_TTL seconds.
+DATA_VERSION_CHANNEL = "data_version_changed"
+DATA_VERSION_TTL = float(os.environ.get("DATA_VERSION_TTL", 15))
+
+HAZARD_TABLES = [
+    "hazard_flood",
+    "hazard_cyclone",
+    "hazard_snowfall",
+    "hazard_avalanche",
+    "hazard_cloudburst",
+    "hazard_lightning",
+    "hazard_landslide",
+]
+
+VERSIONED_TABLES = [
+    "district_geometry",
+    "indus_circle_geomerty",
+    "indus_boundary_geomerty",
+    "act_warning1",
+    "realtime_hazard_district",
+    "district_wise_7dayfc_severity",
+    "district_wise_accum_rainfall",
+    "weather_hourly_data_all_india",
+    "weather_kpi_controls",
+    "earthquakes",
+    *HAZARD_TABLES,
+]
+
+DATA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS weatherdata.data_version (
+    source TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION weatherdata.bump_data_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO weatherdata.data_version (source, version, updated_at)
+    VALUES (TG_TABLE_NAME, 1, NOW())
+    ON CONFLICT (source)
+    DO UPDATE SET version = weatherdata.data_version.version + 1, updated_at = NOW();
+    -- Delivered when the writing transaction commits
+    PERFORM pg_notify('data_version_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER_DDL = """
+CREATE OR REPLACE TRIGGER trg_{table}_data_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON weatherdata.{table}
+FOR EACH STATEMENT EXECUTE FUNCTION weatherdata.bump_data_version();
+INSERT INTO weatherdata.data_version (source) VALUES ('{table}') ON CONFLICT (source) DO NOTHING;
+"""
+
+_lock = Lock()
+_subscribed = False
+_versions = {}
+_loaded_at = 0.0
+_generation = 0  # bumped on every notify so a reload racing one is not kept
+_listeners = []
+
+
+def add_version_listener(callback):
+    """Call callback(source) when a source changes, or callback(None) when any may have."""
+    _listeners.append(callback)
+
+
+def _on_notify(source):
+    global _generation
+    with _lock:
+        _generation += 1
+        _versions.pop(source, None)
+    for callback in _listeners:
+        callback(source)
+
+
+def _on_reset():
+    global _loaded_at, _generation
+    with _lock:
+        _generation += 1
+        _versions.clear()
+        _loaded_at = 0.0
+    for callback in _listeners:
+        callback(None)
+
+
+def _subscribe():
+    global _subscribed
+    with _lock:
+        if _subscribed:
+            return
+        _subscribed = True
+    pg_listener.subscribe(DATA_VERSION_CHANNEL, _on_notify, _on_reset)
+
+
+def notify_data_version(cur, source):
+    """Announce a data_version change made outside the triggers, on the caller's cursor."""
+    cur.execute("SELECT pg_notify(%s, %s)", (DATA_VERSION_CHANNEL, source))
+
+
+def migrate_data_version(conn):
+    """Create data_version, then install the trigger table by table so one missing table skips only itself."""
+    with conn.cursor() as cur:
+        cur.execute(DATA_VERSION_DDL)
+    conn.commit()
+    for table in VERSIONED_TABLES:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(TRIGGER_DDL.format(table=table))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"data_version: no trigger on {table}:", e)
+
+
+def get_data_version(source):
+    """Current version of a source table, or None when data_version is unavailable."""
+    global _loaded_at
+    _subscribe()
+    now = time.monotonic()
+    fresh_for = float("inf") if pg_listener.is_listening(DATA_VERSION_CHANNEL) else DATA_VERSION_TTL
+    with _lock:
+        if now - _loaded_at < fresh_for and source in _versions:
+            return _versions[source]
+        generation = _generation
+
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT source, version FROM weatherdata.data_version")
+            rows = dict(cur.fetchall())
+    except Exception as e:
+        conn.rollback()
+        print("Data version lookup error:", e)
+        rows = {}
+    finally:
+        release_db_conn(conn)
+
+    with _lock:
+        if generation == _generation:
+            _versions.clear()
+            _versions.update(rows)
+            _loaded_at = now
+        return rows.get(source)
@@ -5,6 +5,17 @@ module.exports = {
       script: "waitress-serve",
       args: "--host=0.0.0.0 --port=6633 app:app",
       interpreter: "C:/inetpub/PM2-APIs/weather_FlaskAPI/py-env/Scripts/pythonw.exe"
+    },
+    {
+      name: "indus-weather-async-api",
+      script: "uvicorn",
+      args: "--host=0.0.0.0 --port=6634 asgi_app:app",
+      interpreter: "C:/inetpub/PM2-APIs/weather_FlaskAPI/py-env/Scripts/pythonw.exe"
+    },
+    {
+      name: "indus-weather-jobs",
+      script: "job_worker.py",
+      interpreter: "C:/inetpub/PM2-APIs/weather_FlaskAPI/py-env/Scripts/pythonw.exe"
     }
   ]
 }
@@ -0,0 +1,281 @@
+from db import get_db_conn, release_db_conn
+from data_version import HAZARD_TABLES
+
+# weatherdata.hazard_district_fact: one row per (load, hazard, circle, day,
+# district) instead of the comma-separated district lists of the hazard_*
+# tables. Districts are integer keys into weatherdata.district_key.
+#
+# Statement triggers on the hazard tables fill it inside the writers' own
+# transaction, so the Hazard_data_insert, Hazard_data_insert_new_source and
+# Cyclone_data_insert loads populate it as they insert. run_id is the writing
+# transaction's id: every row of one pipeline run shares it and later runs
+# get larger ids; it is also the run_id of the pipeline_run row the writer
+# records (see pipeline_runs.py). The hazard tables are append-only; a DELETE drops the facts
+# of a load/circle/day once none of its source rows remain and TRUNCATE drops
+# the hazard's facts. The table, district_key and the triggers are created
+# (and backfilled) by `python migrate.py`, which the API, the pipelines and
+# the report generator rely on; run `python hazard_facts.py` to rebuild after
+# any other kind of edit.
+FACT_TABLE_NAME = "hazard_district_fact"
+
+# date and insert_at keep the hazard tables' column types
+FACT_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS weatherdata.district_key (
+    district_id SERIAL PRIMARY KEY,
+    indus_circle TEXT NOT NULL,
+    district TEXT NOT NULL,
+    UNIQUE (indus_circle, district)
+);
+
+CREATE TABLE weatherdata.hazard_district_fact AS
+SELECT
+    0::bigint AS run_id,
+    ''::text AS hazard_type,
+    ''::text AS indus_circle,
+    0::smallint AS day,
+    0 AS district_id,
+    0::smallint AS severity_rank,
+    date,
+    insert_at
+FROM weatherdata.hazard_flood
+WITH NO DATA;
+
+CREATE INDEX idx_hazard_district_fact_circle_run_day
+    ON weatherdata.hazard_district_fact (indus_circle, hazard_type, run_id, day);
+
+CREATE INDEX idx_hazard_district_fact_loads
+    ON weatherdata.hazard_district_fact (hazard_type, insert_at, run_id);
+"""
+
+# Every hazard of a circle and day in one range, for the multi-hazard lookup
+FACT_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS idx_hazard_district_fact_circle_day_load
+    ON weatherdata.hazard_district_fact (indus_circle, day, insert_at)
+    INCLUDE (hazard_type, severity_rank, district_id);
+"""
+
+FACT_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION weatherdata.hazard_severity_rank(p_severity TEXT) RETURNS SMALLINT AS $$
+    SELECT (CASE p_severity
+        WHEN 'Extreme' THEN 1
+        WHEN 'High' THEN 2
+        WHEN 'Moderate' THEN 3
+        WHEN 'Low' THEN 4
+        ELSE 5
+    END)::smallint
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION weatherdata.hazard_day_number(p_days TEXT) RETURNS SMALLINT AS $$
+    SELECT substring(p_days FROM '[0-9]+')::smallint
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION weatherdata.apply_hazard_district_fact() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM weatherdata.hazard_district_fact WHERE hazard_type = TG_TABLE_NAME;
+    ELSIF TG_OP = 'DELETE' THEN
+        EXECUTE format($sql$
+            DELETE FROM weatherdata.hazard_district_fact f
+            USING (SELECT DISTINCT indus_circle::text AS indus_circle, days::text AS days, insert_at FROM old_rows) o
+            WHERE f.hazard_type = %L
+            AND f.indus_circle = o.indus_circle
+            AND f.day IS NOT DISTINCT FROM weatherdata.hazard_day_number(o.days)
+            AND f.insert_at = o.insert_at
+            AND NOT EXISTS (
+                SELECT 1 FROM weatherdata.%I h
+                WHERE h.indus_circle::text = o.indus_circle
+                AND h.days::text IS NOT DISTINCT FROM o.days
+                AND h.insert_at = o.insert_at
+            )
+        $sql$, TG_TABLE_NAME, TG_TABLE_NAME);
+    ELSE
+        INSERT INTO weatherdata.district_key (indus_circle, district)
+        SELECT DISTINCT n.indus_circle::text, TRIM(item)
+        FROM new_rows n
+        CROSS JOIN LATERAL unnest(string_to_array(n.district::text, ',')) AS item
+        WHERE n.indus_circle IS NOT NULL AND TRIM(item) <> ''
+        ON CONFLICT DO NOTHING;
+
+        INSERT INTO weatherdata.hazard_district_fact
+            (run_id, hazard_type, indus_circle, day, district_id, severity_rank, date, insert_at)
+        SELECT
+            txid_current(),
+            TG_TABLE_NAME,
+            n.indus_circle::text,
+            weatherdata.hazard_day_number(n.days::text),
+            k.district_id,
+            weatherdata.hazard_severity_rank(n.severity::text),
+            n.date,
+            n.insert_at
+        FROM new_rows n
+        CROSS JOIN LATERAL unnest(string_to_array(n.district::text, ',')) AS item
+        JOIN weatherdata.district_key k
+            ON k.indus_circle = n.indus_circle::text AND k.district = TRIM(item);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+FACT_TRIGGER_DDL = """
+CREATE OR REPLACE TRIGGER trg_{table}_district_fact_insert
+AFTER INSERT ON weatherdata.{table}
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION weatherdata.apply_hazard_district_fact();
+
+CREATE OR REPLACE TRIGGER trg_{table}_district_fact_delete
+AFTER DELETE ON weatherdata.{table}
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION weatherdata.apply_hazard_district_fact();
+
+CREATE OR REPLACE TRIGGER trg_{table}_district_fact_truncate
+AFTER TRUNCATE ON weatherdata.{table}
+FOR EACH STATEMENT EXECUTE FUNCTION weatherdata.apply_hazard_district_fact();
+"""
+
+# Rows loaded before the fact table existed share the backfill's run_id, so
+# for them only insert_at tells one load from another
+BACKFILL_SQL = """
+DELETE FROM weatherdata.hazard_district_fact WHERE hazard_type = '{table}';
+
+INSERT INTO weatherdata.district_key (indus_circle, district)
+SELECT DISTINCT h.indus_circle::text, TRIM(item)
+FROM weatherdata.{table} h
+CROSS JOIN LATERAL unnest(string_to_array(h.district::text, ',')) AS item
+WHERE h.indus_circle IS NOT NULL AND TRIM(item) <> ''
+ON CONFLICT DO NOTHING;
+
+INSERT INTO weatherdata.hazard_district_fact
+    (run_id, hazard_type, indus_circle, day, district_id, severity_rank, date, insert_at)
+SELECT
+    txid_current(),
+    '{table}',
+    h.indus_circle::text,
+    weatherdata.hazard_day_number(h.days::text),
+    k.district_id,
+    weatherdata.hazard_severity_rank(h.severity::text),
+    h.date,
+    h.insert_at
+FROM weatherdata.{table} h
+CROSS JOIN LATERAL unnest(string_to_array(h.district::text, ',')) AS item
+JOIN weatherdata.district_key k
+    ON k.indus_circle = h.indus_circle::text AND k.district = TRIM(item);
+"""
+
+# Worst severity per district and day of a circle from the current runs of one
+# hazard (see hazard_current_fact in pipeline_runs.py), for every district of
+# the circle ('Other' when none). $1 is the circle; the facts are a range of
+# the (circle, hazard, run, day) index.
+DISTRICT_WISE_FACT_SQL = """
+    WITH days AS (
+        SELECT n, 'Day' || n AS day FROM generate_series(1, 7) AS n
+    ),
+
+    best_per_district AS (
+        SELECT DISTINCT ON (f.district_id, f.day) f.district_id, f.day, f.date, f.severity_rank
+        FROM weatherdata.hazard_current_fact f
+        WHERE f.indus_circle = $1
+        AND f.hazard_type = '{table}'
+        ORDER BY f.district_id, f.day, f.severity_rank
+    )
+
+    SELECT
+        a.district,
+        a.indus_circle,
+        d.day AS days,
+        b.date,
+        CASE b.severity_rank
+            WHEN 1 THEN 'Extreme'
+            WHEN 2 THEN 'High'
+            WHEN 3 THEN 'Moderate'
+            WHEN 4 THEN 'Low'
+            ELSE 'Other'
+        END AS severity
+    FROM weatherdata.district_geometry a
+    CROSS JOIN days d
+    LEFT JOIN weatherdata.district_key k
+        ON k.indus_circle = a.indus_circle AND k.district = a.district
+    LEFT JOIN best_per_district b
+        ON b.district_id = k.district_id AND b.day = d.n
+    WHERE a.district <> 'Data Not Available'
+    AND a.indus_circle = $1
+    ORDER BY a.district, d.day
+"""
+
+# Day1 districts per hazard table and severity for a circle, from the current
+# runs of %(tables)s; one (circle, day, insert_at) index range per hazard
+AFFECTED_DISTRICTS_SQL = """
+    SELECT
+        f.hazard_type,
+        CASE f.severity_rank
+            WHEN 1 THEN 'Extreme'
+            WHEN 2 THEN 'High'
+            WHEN 3 THEN 'Moderate'
+            WHEN 4 THEN 'Low'
+        END AS severity,
+        array_agg(DISTINCT k.district ORDER BY k.district) AS districts
+    FROM weatherdata.hazard_current_fact f
+    JOIN weatherdata.district_key k ON k.district_id = f.district_id
+    WHERE f.indus_circle = %(circle)s
+    AND f.day = 1
+    AND f.hazard_type = ANY(%(tables)s)
+    AND f.severity_rank <= 4
+    GROUP BY f.hazard_type, f.severity_rank;
+"""
+
+# A rebuild stamps every fact with the rebuild's run_id; the latest-run
+# pointers (see pipeline_runs.py) follow it and keep their loaded_at bound
+REPOINT_RUNS_SQL = """
+UPDATE weatherdata.hazard_latest_run SET run_id = txid_current();
+"""
+
+
+def _install(cur, rebuild):
+    # Blocks hazard writes until commit so the triggers and the backfill see the same rows
+    for table in HAZARD_TABLES:
+        cur.execute(f"LOCK TABLE weatherdata.{table} IN SHARE ROW EXCLUSIVE MODE")
+    if rebuild:
+        cur.execute(FACT_TABLE_DDL)
+    cur.execute(FACT_INDEX_DDL)
+    cur.execute(FACT_FUNCTION_DDL)
+    for table in HAZARD_TABLES:
+        cur.execute(FACT_TRIGGER_DDL.format(table=table))
+        if rebuild:
+            cur.execute(BACKFILL_SQL.format(table=table))
+
+
+def migrate_hazard_facts(conn):
+    """Create the fact table and its triggers, backfilling when first created."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (FACT_TABLE_NAME,))
+        cur.execute("SELECT to_regclass(%s)", (f"weatherdata.{FACT_TABLE_NAME}",))
+        _install(cur, rebuild=cur.fetchone()[0] is None)
+    conn.commit()
+
+
+def rebuild_hazard_facts():
+    """Recompute every fact from the hazard tables."""
+    conn = get_db_conn()
+    try:
+        migrate_hazard_facts(conn)
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (FACT_TABLE_NAME,))
+            _install(cur, rebuild=False)
+            for table in HAZARD_TABLES:
+                cur.execute(BACKFILL_SQL.format(table=table))
+            cur.execute("SELECT to_regclass('weatherdata.hazard_latest_run')")
+            if cur.fetchone()[0] is not None:
+                cur.execute(REPOINT_RUNS_SQL)
+            cur.execute("SELECT COUNT(*) FROM weatherdata.hazard_district_fact")
+            rows = cur.fetchone()[0]
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_conn(conn)
+
+
+if __name__ == "__main__":
+    print(f"{FACT_TABLE_NAME}: {rebuild_hazard_facts()} rows rebuilt")
@@ -0,0 +1,113 @@
+import atexit
+import os
+import time
+from threading import Event, Lock, Thread
+
+from psycopg2.extras import execute_values
+
+from db import get_db_conn, release_db_conn
+
+# Coalesces user_sessions.last_request updates: requests only record the
+# user_id in memory, one background thread writes them out in a single
+# batched UPDATE every HEARTBEAT_FLUSH_SECONDS.
+HEARTBEAT_FLUSH_SECONDS = float(os.environ.get("HEARTBEAT_FLUSH_SECONDS", 5))
+
+_pending = {}  # user_id -> (first_seen, last_seen) monotonic
+_lock = Lock()
+_stop = Event()
+_writer = None
+
+_stats = {
+    "flushes": 0,
+    "rows_flushed": 0,
+    "last_flush_size": 0,
+    "last_flush_lag_ms": 0.0,
+    "max_flush_lag_ms": 0.0,
+    "last_flush_duration_ms": 0.0,
+    "errors": 0,
+}
+
+
+def record_heartbeat(user_id):
+    now = time.monotonic()
+    with _lock:
+        first_seen = _pending.get(user_id, (now, now))[0]
+        _pending[user_id] = (first_seen, now)
+    _start_writer()
+
+
+def flush_heartbeats():
+    with _lock:
+        if not _pending:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+
+    now = time.monotonic()
+    # seconds since each user's latest request, so last_request keeps its real time
+    rows = [(user_id, now - last_seen) for user_id, (_, last_seen) in batch.items()]
+    lag_ms = (now - min(first_seen for first_seen, _ in batch.values())) * 1000
+
+    conn = None
+    try:
+        conn = get_db_conn()
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                UPDATE weatherdata.user_sessions s
+                SET last_request = NOW() - make_interval(secs => v.age)
+                FROM (VALUES %s) AS v(user_id, age)
+                WHERE s.user_id = v.user_id
+                """,
+                rows,
+                template="(%s, %s::float8)",
+            )
+        conn.commit()
+    except Exception as e:
+        print("Heartbeat flush error:", e)
+        if conn:
+            conn.rollback()
+        # keep the newest timestamps for the next attempt
+        with _lock:
+            for user_id, seen in batch.items():
+                _pending.setdefault(user_id, seen)
+        _stats["errors"] += 1
+        return 0
+    finally:
+        if conn:
+            release_db_conn(conn)
+
+    _stats["flushes"] += 1
+    _stats["rows_flushed"] += len(rows)
+    _stats["last_flush_size"] = len(rows)
+    _stats["last_flush_lag_ms"] = round(lag_ms, 2)
+    _stats["max_flush_lag_ms"] = round(max(_stats["max_flush_lag_ms"], lag_ms), 2)
+    _stats["last_flush_duration_ms"] = round((time.monotonic() - now) * 1000, 2)
+    return len(rows)
+
+
+def _writer_loop():
+    while not _stop.wait(HEARTBEAT_FLUSH_SECONDS):
+        flush_heartbeats()
+
+
+def _start_writer():
+    global _writer
+    if _writer is None:
+        with _lock:
+            if _writer is None:
+                _writer = Thread(target=_writer_loop, daemon=True)
+                _writer.start()
+                atexit.register(_shutdown)
+
+
+def _shutdown():
+    _stop.set()
+    flush_heartbeats()
+
+
+def heartbeat_stats():
+    with _lock:
+        pending = len(_pending)
+    return {**_stats, "pending": pending}
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from user_agents import parse
 import re
+import numpy as np
 
 def circle_name_cover_page(name):
     match = re.search(r'\((.*?)\)', name)
@@ -77,5 +78,33 @@ def get_device_label(user_agent_string: str) -> str:
     return f"{os_name} {device_type} | {browser_name} {browser_version}"
 
 
-
-
+def hazard_risk_labels(severity):
+    """Vectorized 'No Risk' / '<Severity> Risk' labels for a severity Series."""
+    severity = severity.fillna("Other").astype(str)
+    return np.where(severity.isin(["Other", "Low"]), "No Risk", severity + " Risk")
+
+
+def pivot_district_days(df, fields, district_col="district", day_col="days"):
+    """
+    Nest rows into [{"district": d, "<day>": {key: value, ...}, ...}] sorted by
+    district, the shape the old groupby()/iterrows() loops produced.
+    `fields` maps output keys to DataFrame columns (a list keeps the names).
+    """
+    if isinstance(fields, (list, tuple)):
+        fields = {col: col for col in fields}
+
+    df = df[df[district_col].notna()]
+    if df.empty:
+        return []
+    df = df.sort_values(district_col, kind="stable")
+
+    cells = df[list(fields.values())].set_axis(list(fields.keys()), axis=1).to_dict("records")
+    result = []
+    current = None
+    for district, day, cell in zip(df[district_col].tolist(), df[day_col].tolist(), cells):
+        if district != current:
+            current = district
+            district_data = {"district": district}
+            result.append(district_data)
+        district_data[day] = cell
+    return result
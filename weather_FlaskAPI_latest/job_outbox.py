@@ -0,0 +1,224 @@
+import os
+import shutil
+import uuid
+
+from psycopg2.extras import Json, RealDictCursor
+
+from db import get_db_conn, release_db_conn
+
+# Persistent outbox for slow side effects (mail, report files, file copies).
+# Routes insert a row and return at once; job_worker.py claims rows with
+# FOR UPDATE SKIP LOCKED, so any number of worker processes can share the
+# table (created by `python migrate.py`). The worker renews a running job's
+# lease; once it expires (worker died) the job is claimed again with
+# attempts + 1, so every later update checks (id, attempts, status) and one
+# from a stale worker matches nothing.
+JOB_CHANNEL = "job_outbox"
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", 600))
+JOB_RETENTION_DAYS = int(os.environ.get("JOB_RETENTION_DAYS", 30))
+JOB_FILES_DIR = os.path.join(os.getcwd(), "job_files")
+
+JOB_OUTBOX_DDL = """
+CREATE TABLE IF NOT EXISTS weatherdata.job_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMPTZ,
+    created_by TEXT,
+    error TEXT,
+    result JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_outbox_pending
+    ON weatherdata.job_outbox (id) WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_job_outbox_created_by
+    ON weatherdata.job_outbox (created_by, id);
+"""
+
+CLAIM_JOB_SQL = """
+    UPDATE weatherdata.job_outbox j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_until = NOW() + make_interval(secs => %(lease)s),
+        updated_at = NOW()
+    WHERE j.id = (
+        SELECT id FROM weatherdata.job_outbox
+        WHERE (status = 'queued' AND run_after <= NOW())
+        OR (status = 'running' AND locked_until < NOW())
+        ORDER BY id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.id, j.kind, j.payload, j.attempts;
+"""
+
+JOB_STATUS_COLUMNS = """
+    id, kind, status, attempts, error, result, created_at, updated_at, finished_at
+"""
+
+def migrate_job_outbox(conn):
+    with conn.cursor() as cur:
+        cur.execute(JOB_OUTBOX_DDL)
+    conn.commit()
+
+
+def new_job_dir():
+    """Private folder for a job's input and output files, removed when the job ends."""
+    path = os.path.join(JOB_FILES_DIR, uuid.uuid4().hex)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def remove_job_dir(path):
+    # Only ever delete folders handed out by new_job_dir
+    if path and os.path.dirname(os.path.abspath(path)) == JOB_FILES_DIR:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def enqueue_job(kind, payload, created_by=None):
+    """Insert a job and wake the workers; returns the job id."""
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO weatherdata.job_outbox (kind, payload, created_by)
+                VALUES (%s, %s, %s)
+                RETURNING id
+                """,
+                (kind, Json(payload), None if created_by is None else str(created_by)),
+            )
+            job_id = cur.fetchone()[0]
+            cur.execute("SELECT pg_notify(%s, %s)", (JOB_CHANNEL, str(job_id)))
+        conn.commit()
+        return job_id
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_conn(conn)
+
+
+def get_job(job_id, created_by=None):
+    """Status row of one job, or None; restricted to created_by when given."""
+    conn = get_db_conn()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                f"""
+                SELECT {JOB_STATUS_COLUMNS} FROM weatherdata.job_outbox
+                WHERE id = %s AND (%s::text IS NULL OR created_by = %s::text)
+                """,
+                (job_id, created_by, created_by),
+            )
+            return cur.fetchone()
+    finally:
+        release_db_conn(conn)
+
+
+def list_jobs(created_by, limit=50):
+    """Most recent jobs of one user, newest first."""
+    conn = get_db_conn()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                f"""
+                SELECT {JOB_STATUS_COLUMNS} FROM weatherdata.job_outbox
+                WHERE created_by = %s
+                ORDER BY id DESC
+                LIMIT %s
+                """,
+                (str(created_by), limit),
+            )
+            return cur.fetchall()
+    finally:
+        release_db_conn(conn)
+
+
+def claim_job(conn):
+    """Lease the next runnable job on conn; returns (id, kind, payload, attempts) or None."""
+    with conn.cursor() as cur:
+        cur.execute(CLAIM_JOB_SQL, {"lease": JOB_LEASE_SECONDS})
+        job = cur.fetchone()
+    conn.commit()
+    return job
+
+
+def renew_job_lease(conn, job_id, attempts):
+    """Extend the lease of a job this worker still holds; False once it has lost it."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE weatherdata.job_outbox
+            SET locked_until = NOW() + make_interval(secs => %s), updated_at = NOW()
+            WHERE id = %s AND attempts = %s AND status = 'running'
+            """,
+            (JOB_LEASE_SECONDS, job_id, attempts),
+        )
+        held = cur.rowcount == 1
+    conn.commit()
+    return held
+
+
+def complete_job(conn, job_id, attempts, result=None):
+    """Mark the job done; False when the lease was lost and the update skipped."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE weatherdata.job_outbox
+            SET status = 'done', result = %s, error = NULL, locked_until = NULL,
+                updated_at = NOW(), finished_at = NOW()
+            WHERE id = %s AND attempts = %s AND status = 'running'
+            """,
+            (Json(result), job_id, attempts),
+        )
+        held = cur.rowcount == 1
+    conn.commit()
+    return held
+
+
+def fail_job(conn, job_id, attempts, error):
+    """
+    Requeue with a growing delay, or mark failed after JOB_MAX_ATTEMPTS.
+    Returns True when final, False when requeued, None when the lease was lost.
+    """
+    final = attempts >= JOB_MAX_ATTEMPTS
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE weatherdata.job_outbox
+            SET status = CASE WHEN %(final)s THEN 'failed' ELSE 'queued' END,
+                run_after = NOW() + make_interval(secs => %(delay)s),
+                error = %(error)s,
+                locked_until = NULL,
+                updated_at = NOW(),
+                finished_at = CASE WHEN %(final)s THEN NOW() END
+            WHERE id = %(id)s AND attempts = %(attempts)s AND status = 'running'
+            """,
+            {"final": final, "delay": 60 * attempts, "error": str(error), "id": job_id, "attempts": attempts},
+        )
+        held = cur.rowcount == 1
+    conn.commit()
+    return final if held else None
+
+
+def prune_jobs(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM weatherdata.job_outbox
+            WHERE finished_at < NOW() - make_interval(days => %s)
+            """,
+            (JOB_RETENTION_DAYS,),
+        )
+        deleted = cur.rowcount
+    conn.commit()
+    return deleted
@@ -0,0 +1,264 @@
+"""
+Outbox worker: runs the jobs queued in weatherdata.job_outbox (mail, report
+files, file copies) outside the API process.
+
+    python job_worker.py
+
+Starts JOB_WORKERS processes. Each one keeps its own database connections and
+one logged-in SMTP session that is reused across jobs, renews the lease of
+the job it is running, and sleeps on LISTEN job_outbox between jobs.
+"""
+import multiprocessing
+import os
+import select
+import shutil
+import threading
+import time
+import traceback
+
+import yagmail
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from db import get_dedicated_conn
+from job_outbox import (
+    JOB_CHANNEL,
+    JOB_LEASE_SECONDS,
+    claim_job,
+    complete_job,
+    fail_job,
+    prune_jobs,
+    remove_job_dir,
+    renew_job_lease,
+)
+from pipeline_runs import RUN_TABLE_NAME, prune_pipeline_runs
+from usage_export import activity_log_sheets, json_sheets, write_usage_workbook
+
+SMTP_USER = os.environ.get("SMTP_USER", "post@mlinfomap.com")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "tmisxyakmbllotlw")
+# Mail servers drop idle sessions after a few minutes; reconnect before that
+SMTP_MAX_IDLE_SECONDS = int(os.environ.get("SMTP_MAX_IDLE_SECONDS", 120))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+WWWROOT_REPORTS_DIR = r"C:\inetpub\wwwroot\Weather\reports"
+
+_smtp = None
+_smtp_used_at = 0.0
+
+
+# --- SMTP session reused across jobs ----
+def _close_smtp():
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.close()
+        except Exception:
+            pass
+    _smtp = None
+
+
+def send_mail(to, subject, contents):
+    global _smtp, _smtp_used_at
+    if _smtp is not None and time.monotonic() - _smtp_used_at > SMTP_MAX_IDLE_SECONDS:
+        _close_smtp()
+    if _smtp is None:
+        _smtp = yagmail.SMTP(user=SMTP_USER, password=SMTP_PASSWORD)
+    try:
+        sent = _smtp.send(to=to, subject=subject, contents=contents)
+    except Exception:
+        # Next attempt logs in again
+        _close_smtp()
+        raise
+    _smtp_used_at = time.monotonic()
+    if sent is False:
+        _close_smtp()
+        raise RuntimeError("Mail server disconnected, message not sent")
+
+
+# --- Job handlers: kind -> handler(payload) returning the job result ----
+def send_tower_report(payload):
+    file_path = payload["file_path"]
+    send_mail(
+        to=payload["recipients"],
+        subject=payload["subject"],
+        contents=[
+            "Please find attached the tower weather alert.",
+            yagmail.inline(file_path),
+            file_path,
+        ],
+    )
+    return {"recipients": len(payload["recipients"])}
+
+
+def send_usage_report(payload):
+    file_path = os.path.join(payload["dir"], "usage_report.xlsx")
+    if payload.get("data") is not None:
+        rows = write_usage_workbook(file_path, json_sheets(payload["data"]))
+    else:
+        conn = get_dedicated_conn()
+        try:
+            rows = write_usage_workbook(
+                file_path,
+                activity_log_sheets(conn, payload["start_date"], payload["end_date"], payload.get("userids")),
+            )
+        finally:
+            conn.close()
+    send_mail(
+        to=payload["emails"],
+        subject="Usages Report Data",
+        contents=[
+            "Please find attached excel sheet for the Usages Report Data",
+            yagmail.inline(file_path),
+            file_path,
+        ],
+    )
+    return {"recipients": len(payload["emails"]), "rows": rows}
+
+
+def save_file_wwwroot(file_path, file_type):
+    # Separate folders for different file types
+    if file_type.upper() == "IMAGE":
+        report_dir = os.path.join(WWWROOT_REPORTS_DIR, "img_cyclone")
+
+    # Create folder if missing
+    os.makedirs(report_dir, exist_ok=True)
+
+    # Destination file
+    file_name = os.path.basename(file_path)
+    destination_path = os.path.join(report_dir, file_name)
+    # Copy file to destination
+    shutil.copyfile(file_path, destination_path)
+    return destination_path
+
+
+def publish_cyclone_image(payload):
+    file_path = payload["file_path"]
+
+    # Local API folder keeps only the latest image
+    save_folder = "./cyclone_report"
+    os.makedirs(save_folder, exist_ok=True)
+    for existing_file in os.listdir(save_folder):
+        existing_file_path = os.path.join(save_folder, existing_file)
+        if os.path.isfile(existing_file_path):
+            os.remove(existing_file_path)
+    shutil.copyfile(file_path, os.path.join(save_folder, os.path.basename(file_path)))
+
+    return {"path": save_file_wwwroot(file_path, "IMAGE")}
+
+
+JOB_HANDLERS = {
+    "tower_report": send_tower_report,
+    "usage_report": send_usage_report,
+    "cyclone_image": publish_cyclone_image,
+}
+
+
+# --- Worker loop ----
+def keep_lease(conn, job_id, attempts, stop):
+    # Renew well before expiry; stops when the job ends or another worker took it over
+    while not stop.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            if not renew_job_lease(conn, job_id, attempts):
+                print(f"Job {job_id} lease lost")
+                return
+        except Exception as e:
+            conn.rollback()
+            print(f"Job {job_id} lease renewal error:", e)
+
+
+def run_job(conn, lease_conn, job):
+    job_id, kind, payload, attempts = job
+    stop = threading.Event()
+    lease = threading.Thread(target=keep_lease, args=(lease_conn, job_id, attempts, stop), daemon=True)
+    lease.start()
+    try:
+        handler = JOB_HANDLERS.get(kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        result, error = handler(payload), None
+    except Exception as e:
+        result, error = None, e
+    finally:
+        stop.set()
+        lease.join()
+
+    if error is None:
+        held = final = complete_job(conn, job_id, attempts, result)
+    else:
+        print(f"Job {job_id} ({kind}) attempt {attempts} failed:", error)
+        traceback.print_exception(error)
+        final = fail_job(conn, job_id, attempts, error)
+        held = final is not None
+    if not held:
+        # Another worker has claimed the job again and owns its files now
+        print(f"Job {job_id} attempt {attempts} ended after its lease was lost")
+    elif final:
+        remove_job_dir(payload.get("dir"))
+
+
+def worker_loop():
+    while True:
+        conn = lease_conn = listen_conn = None
+        try:
+            conn = get_dedicated_conn()
+            lease_conn = get_dedicated_conn()
+            listen_conn = get_dedicated_conn()
+            listen_conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with listen_conn.cursor() as cur:
+                cur.execute(f"LISTEN {JOB_CHANNEL};")
+
+            while True:
+                job = claim_job(conn)
+                if job:
+                    run_job(conn, lease_conn, job)
+                    continue
+                # Idle: wait for an enqueue, or time out to pick up retries and expired leases
+                if select.select([listen_conn], [], [], 30) != ([], [], []):
+                    listen_conn.poll()
+                    listen_conn.notifies.clear()
+        except Exception as e:
+            print("Job worker error:", e)
+        finally:
+            for c in (conn, lease_conn, listen_conn):
+                if c:
+                    try:
+                        c.close()
+                    except Exception:
+                        pass
+        time.sleep(5)
+
+
+def prune_finished_jobs():
+    conn = get_dedicated_conn()
+    try:
+        print(f"{JOB_CHANNEL}: {prune_jobs(conn)} finished jobs pruned")
+    except Exception as e:
+        conn.rollback()
+        print("Job prune error:", e)
+    try:
+        # Hazard pipeline runs past retention go on the same schedule
+        print(f"{RUN_TABLE_NAME}: {prune_pipeline_runs(conn)} runs pruned")
+    except Exception as e:
+        conn.rollback()
+        print("Pipeline run prune error:", e)
+    finally:
+        conn.close()
+
+
+def main():
+    workers = {}
+    pruned_at = 0.0
+    while True:
+        if time.monotonic() - pruned_at > 3600:
+            prune_finished_jobs()
+            pruned_at = time.monotonic()
+        # Start missing workers and replace any that died
+        for slot in range(JOB_WORKERS):
+            process = workers.get(slot)
+            if process is None or not process.is_alive():
+                process = multiprocessing.Process(target=worker_loop, name=f"job-worker-{slot}", daemon=True)
+                process.start()
+                workers[slot] = process
+        time.sleep(10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import dataclasses
+import decimal
+import json
+import os
+import uuid
+from datetime import date, datetime, timezone
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+# JSON encoding for the API. With orjson installed responses are encoded
+# straight to bytes; output matches Flask's default provider (sorted keys,
+# dates as HTTP dates, Decimal as string) and NumPy scalars/arrays are
+# encoded natively. NaN/Infinity become null instead of invalid JSON.
+# Set JSON_PROVIDER=default to use Flask's encoder.
+JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "orjson")
+
+if orjson:
+    ORJSON_OPTIONS = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _http_date(d):
+    # werkzeug.http.http_date without the email.utils round trip; naive values are UTC
+    if isinstance(d, datetime):
+        if d.tzinfo is not None:
+            d = d.astimezone(timezone.utc)
+        clock = f"{d.hour:02d}:{d.minute:02d}:{d.second:02d}"
+    else:
+        clock = "00:00:00"
+    return f"{_WEEKDAYS[d.weekday()]}, {d.day:02d} {_MONTHS[d.month - 1]} {d.year:04d} {clock} GMT"
+
+
+def _default(o):
+    if isinstance(o, date):
+        return _http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj, indent=False, newline=False):
+    """Encode obj the way API responses are encoded."""
+    if orjson and JSON_PROVIDER == "orjson":
+        option = ORJSON_OPTIONS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, default=_default, option=option)
+    if indent:
+        body = json.dumps(obj, default=_default, sort_keys=True, indent=2)
+    else:
+        body = json.dumps(obj, default=_default, sort_keys=True, separators=(",", ":"))
+    return (body + "\n" if newline else body).encode("utf-8")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    def _indent(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj, indent=self._indent()).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps_bytes(obj, indent=self._indent(), newline=True), mimetype=self.mimetype
+        )
+
+
+def init_json_provider(app):
+    if orjson and JSON_PROVIDER == "orjson":
+        app.json = OrjsonProvider(app)
+    return app.json
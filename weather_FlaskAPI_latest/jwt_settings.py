@@ -0,0 +1,7 @@
+import os
+from datetime import timedelta
+
+# Shared by the Flask app and the ASGI read tier so both accept the same tokens
+JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "t7knf74gjsjv6ckj3$go#Glw64")
+JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+JWT_ALGORITHM = "HS256"
@@ -0,0 +1,68 @@
+"""
+Schema migrations for the weatherdata objects the API, the job worker, the
+hazard pipelines and the report generator rely on.
+
+    python migrate.py                  # every step
+    python migrate.py data_version     # only the named steps
+
+Run once per deploy, before (re)starting any of them; request handlers only
+read these objects. Every step is idempotent and commits its own work, so a
+failing step (missing table, missing privilege) is reported and the others
+still run. Exits non-zero when a step failed.
+"""
+import sys
+
+from activity_events import migrate_activity_events
+from cyclone_ingest import migrate_cyclone_upload
+from data_version import migrate_data_version
+from db import get_dedicated_conn
+from hazard_facts import migrate_hazard_facts
+from job_outbox import migrate_job_outbox
+from ndma_tags import migrate_ndma_tags
+from pipeline_runs import migrate_pipeline_runs
+from severity_queries import migrate_circle_severity_summary
+from simplify_boundaries import migrate_simplified_columns
+from usage_rollup import migrate_usage_rollup
+
+# (name, migrate(conn)) in dependency order
+MIGRATIONS = [
+    ("data_version", migrate_data_version),
+    ("simplified_boundaries", migrate_simplified_columns),
+    ("circle_severity_summary", migrate_circle_severity_summary),
+    ("activity_events", migrate_activity_events),
+    ("usage_rollup", migrate_usage_rollup),
+    ("job_outbox", migrate_job_outbox),
+    ("cyclone_upload", migrate_cyclone_upload),
+    ("ndma_tags", migrate_ndma_tags),
+    ("hazard_facts", migrate_hazard_facts),
+    # Seeds the latest-run pointers from the facts
+    ("pipeline_runs", migrate_pipeline_runs),
+]
+
+
+def run_migrations(names=None):
+    """Run the named steps (all when empty); returns the names of the ones that failed."""
+    unknown = set(names or ()) - {name for name, _ in MIGRATIONS}
+    if unknown:
+        raise SystemExit(f"Unknown migration: {', '.join(sorted(unknown))}")
+    failed = []
+    conn = get_dedicated_conn()
+    try:
+        for name, migrate in MIGRATIONS:
+            if names and name not in names:
+                continue
+            try:
+                migrate(conn)
+                conn.commit()
+                print(f"{name}: ok")
+            except Exception as e:
+                conn.rollback()
+                failed.append(name)
+                print(f"{name}: failed:", e)
+    finally:
+        conn.close()
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run_migrations(sys.argv[1:]) else 0)
@@ -0,0 +1,162 @@
+from db import get_db_conn, release_db_conn
+
+# weatherdata.disaster_ndma_tag: one row per hazard ("event") or severity
+# named in the comma-separated event/severity fields of a disaster_ndma
+# alert. Every item is split again on the word "and", so "Heavy Rain and
+# Thunderstorm" tags both parts; first_part marks the part before the first
+# "and", which is what the dropdowns have always listed. A row trigger keeps
+# it in step with whatever loads disaster_ndma, so the dropdowns read a small
+# indexed table and the alert filter is an indexed lookup instead of
+# LIKE '%...%'. `python migrate.py` creates and backfills it.
+TAG_TABLE_NAME = "disaster_ndma_tag"
+
+# ndma_id and sent_date keep the types of disaster_ndma's columns
+TAG_TABLE_DDL = """
+CREATE TABLE weatherdata.disaster_ndma_tag AS
+SELECT id AS ndma_id, ''::text AS kind, ''::text AS tag, sent::date AS sent_date, FALSE AS first_part
+FROM weatherdata.disaster_ndma
+WITH NO DATA;
+
+ALTER TABLE weatherdata.disaster_ndma_tag ADD PRIMARY KEY (ndma_id, kind, tag);
+
+CREATE INDEX IF NOT EXISTS idx_disaster_ndma_tag_lookup
+    ON weatherdata.disaster_ndma_tag (kind, sent_date, tag);
+"""
+
+# The split only matches "and" as a whole word, so "Landslide" stays whole
+TAG_TRIGGER_DDL = """
+DROP FUNCTION IF EXISTS weatherdata.disaster_ndma_tags(TEXT, TEXT);
+
+CREATE FUNCTION weatherdata.disaster_ndma_tags(p_event TEXT, p_severity TEXT)
+RETURNS TABLE (kind TEXT, tag TEXT, first_part BOOLEAN) AS $$
+    SELECT v.kind, TRIM(p.part), bool_or(p.n = 1)
+    FROM (
+        SELECT 'event' AS kind, val FROM unnest(string_to_array(p_event, ',')) AS val
+        UNION ALL
+        SELECT 'severity', val FROM unnest(string_to_array(p_severity, ',')) AS val
+    ) v
+    CROSS JOIN LATERAL regexp_split_to_table(v.val, '\\s+and\\s+') WITH ORDINALITY AS p(part, n)
+    WHERE TRIM(p.part) <> ''
+    GROUP BY v.kind, TRIM(p.part)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION weatherdata.apply_disaster_ndma_tag() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM weatherdata.disaster_ndma_tag WHERE ndma_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.id IS NOT NULL THEN
+        INSERT INTO weatherdata.disaster_ndma_tag AS d (ndma_id, kind, tag, sent_date, first_part)
+        SELECT NEW.id, t.kind, t.tag, NEW.sent::date, t.first_part
+        FROM weatherdata.disaster_ndma_tags(NEW.event::text, NEW.severity::text) t
+        ON CONFLICT (ndma_id, kind, tag) DO UPDATE SET first_part = d.first_part OR EXCLUDED.first_part;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION weatherdata.truncate_disaster_ndma_tag() RETURNS trigger AS $$
+BEGIN
+    TRUNCATE weatherdata.disaster_ndma_tag;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_disaster_ndma_tag
+AFTER INSERT OR DELETE OR UPDATE OF id, event, severity, sent
+ON weatherdata.disaster_ndma
+FOR EACH ROW EXECUTE FUNCTION weatherdata.apply_disaster_ndma_tag();
+
+CREATE OR REPLACE TRIGGER trg_disaster_ndma_tag_truncate
+AFTER TRUNCATE ON weatherdata.disaster_ndma
+FOR EACH STATEMENT EXECUTE FUNCTION weatherdata.truncate_disaster_ndma_tag();
+"""
+
+BACKFILL_SQL = """
+DELETE FROM weatherdata.disaster_ndma_tag;
+
+INSERT INTO weatherdata.disaster_ndma_tag AS g (ndma_id, kind, tag, sent_date, first_part)
+SELECT d.id, t.kind, t.tag, d.sent::date, t.first_part
+FROM weatherdata.disaster_ndma d
+CROSS JOIN LATERAL weatherdata.disaster_ndma_tags(d.event::text, d.severity::text) t
+WHERE d.id IS NOT NULL
+ON CONFLICT (ndma_id, kind, tag) DO UPDATE SET first_part = g.first_part OR EXCLUDED.first_part;
+"""
+
+TODAY_HAZARDS_SQL = """
+    SELECT DISTINCT tag AS hazard_list
+    FROM weatherdata.disaster_ndma_tag
+    WHERE kind = 'event' AND sent_date = CURRENT_DATE AND first_part
+    ORDER BY hazard_list ASC;
+"""
+
+TODAY_SEVERITIES_SQL = """
+    SELECT DISTINCT tag AS severity
+    FROM weatherdata.disaster_ndma_tag
+    WHERE kind = 'severity' AND sent_date = CURRENT_DATE AND first_part
+    ORDER BY severity ASC;
+"""
+
+# Ids of today's alerts with %(hazard)s / %(severity)s as any part of an
+# item; 'All' disables a filter
+TODAY_TAG_FILTER_SQL = """
+    (%(hazard)s = 'All' OR id IN (
+        SELECT ndma_id FROM weatherdata.disaster_ndma_tag
+        WHERE kind = 'event' AND sent_date = CURRENT_DATE AND tag = %(hazard)s
+    ))
+    AND (%(severity)s = 'All' OR id IN (
+        SELECT ndma_id FROM weatherdata.disaster_ndma_tag
+        WHERE kind = 'severity' AND sent_date = CURRENT_DATE AND tag = %(severity)s
+    ))
+"""
+
+def _install(cur, rebuild):
+    # Blocks alert writes until commit so the trigger and the backfill see the same rows
+    cur.execute("LOCK TABLE weatherdata.disaster_ndma IN SHARE ROW EXCLUSIVE MODE")
+    if rebuild:
+        cur.execute(TAG_TABLE_DDL)
+    cur.execute(TAG_TRIGGER_DDL)
+    if rebuild:
+        cur.execute(BACKFILL_SQL)
+
+
+def migrate_ndma_tags(conn):
+    """Create the tag table and its triggers, rebuilding it when missing or from before first_part."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (TAG_TABLE_NAME,))
+        cur.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = 'weatherdata' AND table_name = %s AND column_name = 'first_part'
+            """,
+            (TAG_TABLE_NAME,),
+        )
+        rebuild = cur.fetchone()[0] == 0
+        if rebuild:
+            cur.execute(f"DROP TABLE IF EXISTS weatherdata.{TAG_TABLE_NAME}")
+        _install(cur, rebuild)
+    conn.commit()
+
+
+def rebuild_ndma_tags():
+    """Recompute every tag from disaster_ndma."""
+    conn = get_db_conn()
+    try:
+        migrate_ndma_tags(conn)
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (TAG_TABLE_NAME,))
+            cur.execute("LOCK TABLE weatherdata.disaster_ndma IN SHARE ROW EXCLUSIVE MODE")
+            cur.execute(BACKFILL_SQL)
+            cur.execute("SELECT COUNT(*) FROM weatherdata.disaster_ndma_tag")
+            rows = cur.fetchone()[0]
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_conn(conn)
+
+
+if __name__ == "__main__":
+    print(f"{TAG_TABLE_NAME}: {rebuild_ndma_tags()} rows rebuilt")
@@ -0,0 +1,73 @@
+import select
+import time
+from threading import Lock, Thread
+
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from db import get_dedicated_conn
+
+# One LISTEN connection per worker shared by every in-process cache.
+# subscribe() registers a channel with a callback for each notify payload and
+# an on_reset callback that runs whenever notifies may have been missed
+# (before the first LISTEN, and after the connection drops).
+_channels = {}  # channel -> list of (on_notify, on_reset)
+_lock = Lock()
+_thread = None
+_listened = set()
+
+
+def subscribe(channel, on_notify, on_reset):
+    global _thread
+    with _lock:
+        _channels.setdefault(channel, []).append((on_notify, on_reset))
+        if _thread is None:
+            _thread = Thread(target=_listen_loop, daemon=True)
+            _thread.start()
+
+
+def is_listening(channel):
+    """True while notifies on `channel` are being received."""
+    return channel in _listened
+
+
+def _reset(channel):
+    for _, on_reset in _channels.get(channel, []):
+        on_reset()
+
+
+def _listen_loop():
+    while True:
+        conn = None
+        try:
+            conn = get_dedicated_conn()
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+
+            while True:
+                # channels can be subscribed after the loop started
+                for channel in set(_channels) - _listened:
+                    with conn.cursor() as cur:
+                        cur.execute(f"LISTEN {channel};")
+                    _listened.add(channel)
+                    # anything cached before LISTEN may have missed a notify
+                    _reset(channel)
+
+                if select.select([conn], [], [], 1) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    for on_notify, _ in _channels.get(notify.channel, []):
+                        on_notify(notify.payload)
+        except Exception as e:
+            print("Postgres listener error:", e)
+        finally:
+            channels = set(_listened)
+            _listened.clear()
+            for channel in channels:
+                _reset(channel)
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(5)
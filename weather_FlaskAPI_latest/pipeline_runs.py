@@ -0,0 +1,233 @@
+import json
+import os
+
+from db import get_db_conn, release_db_conn
+
+# weatherdata.pipeline_run: one row per load of the hazard tables, written by
+# insert_hazards_forecast (Hazard_data_insert, Hazard_data_insert_new_source,
+# Cyclone_data_insert and /insert-hazards) in the same transaction as the
+# rows. run_id defaults to the writing transaction's id, the same run_id the
+# hazard_district_fact triggers stamp on its facts. row_counts maps every
+# hazard table the load covers to the rows it wrote (0 included).
+#
+# weatherdata.hazard_latest_run points each (hazard table, source) at that
+# source's latest successful full run. Several sources load the same hazard
+# tables (Hazard_data_insert from the geoserver feed, Hazard_data_insert_new_source
+# from aff.india-water.gov.in), so one source's run must not hide another's.
+# Readers use the weatherdata.hazard_current_fact view: for every hazard, the
+# facts of each source's latest run from the hazard's latest load day (a
+# source that stopped loading drops out), plus partial loads newer than all of
+# those. A late or repeated run just moves its source's pointer. Partial loads
+# (/insert-hazards for one circle) are recorded but do not move it.
+RUN_TABLE_NAME = "pipeline_run"
+POINTER_TABLE_NAME = "hazard_latest_run"
+RUN_RETENTION_DAYS = int(os.environ.get("HAZARD_RUN_RETENTION_DAYS", 30))
+
+# Created by migrate.py only; the pipelines just INSERT with RECORD_RUN_SQL's columns
+RUN_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS weatherdata.pipeline_run (
+    run_id BIGINT PRIMARY KEY DEFAULT txid_current(),
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    partial BOOLEAN NOT NULL DEFAULT FALSE,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP NOT NULL DEFAULT clock_timestamp()::timestamp,
+    loaded_at TIMESTAMP,
+    row_counts JSONB NOT NULL DEFAULT '{}',
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_run_finished_at
+    ON weatherdata.pipeline_run (finished_at);
+"""
+
+POINTER_TABLE_DDL = """
+CREATE TABLE weatherdata.hazard_latest_run (
+    hazard_type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    run_id BIGINT NOT NULL,
+    loaded_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (hazard_type, source)
+);
+"""
+
+# Facts match a run by run_id (the writing transaction's id); insert_at also
+# has to match, since backfilled facts share one run_id across all their loads
+CURRENT_FACT_VIEW_DDL = """
+CREATE OR REPLACE VIEW weatherdata.hazard_current_run AS
+SELECT p.hazard_type, p.source, p.run_id, p.loaded_at
+FROM weatherdata.hazard_latest_run p
+WHERE p.loaded_at >= (
+    SELECT date_trunc('day', MAX(q.loaded_at)) FROM weatherdata.hazard_latest_run q
+    WHERE q.hazard_type = p.hazard_type
+);
+
+CREATE OR REPLACE VIEW weatherdata.hazard_current_fact AS
+SELECT f.*
+FROM weatherdata.hazard_district_fact f
+WHERE EXISTS (
+    SELECT 1 FROM weatherdata.hazard_current_run c
+    WHERE c.hazard_type = f.hazard_type AND c.run_id = f.run_id AND f.insert_at >= c.loaded_at
+)
+OR EXISTS (
+    SELECT 1 FROM weatherdata.pipeline_run r
+    WHERE r.run_id = f.run_id AND r.partial AND r.status = 'success'
+    AND r.run_id > (
+        SELECT MAX(c.run_id) FROM weatherdata.hazard_current_run c WHERE c.hazard_type = f.hazard_type
+    )
+);
+"""
+
+POINTER_TRIGGER_DDL = """
+CREATE OR REPLACE FUNCTION weatherdata.apply_hazard_latest_run() RETURNS trigger AS $$
+BEGIN
+    IF NEW.status = 'success' AND NOT NEW.partial THEN
+        INSERT INTO weatherdata.hazard_latest_run AS p
+            (hazard_type, source, run_id, loaded_at, finished_at)
+        SELECT t, NEW.source, NEW.run_id, COALESCE(NEW.loaded_at, NEW.started_at), NEW.finished_at
+        FROM jsonb_object_keys(NEW.row_counts) AS t
+        ON CONFLICT (hazard_type, source) DO UPDATE SET
+            run_id = EXCLUDED.run_id,
+            loaded_at = EXCLUDED.loaded_at,
+            finished_at = EXCLUDED.finished_at
+        WHERE p.run_id < EXCLUDED.run_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_pipeline_run_latest
+AFTER INSERT ON weatherdata.pipeline_run
+FOR EACH ROW EXECUTE FUNCTION weatherdata.apply_hazard_latest_run();
+"""
+
+# Each source's latest recorded run, then, for hazards loaded before any run
+# was recorded, the facts of their last load day (the backfill's run_id plus
+# the day's start as loaded_at)
+SEED_POINTER_SQL = """
+INSERT INTO weatherdata.hazard_latest_run (hazard_type, source, run_id, loaded_at, finished_at)
+SELECT DISTINCT ON (t, r.source) t, r.source, r.run_id, COALESCE(r.loaded_at, r.started_at), r.finished_at
+FROM weatherdata.pipeline_run r
+CROSS JOIN LATERAL jsonb_object_keys(r.row_counts) AS t
+WHERE r.status = 'success' AND NOT r.partial
+ORDER BY t, r.source, r.run_id DESC
+ON CONFLICT DO NOTHING;
+
+INSERT INTO weatherdata.hazard_latest_run (hazard_type, source, run_id, loaded_at, finished_at)
+SELECT DISTINCT ON (f.hazard_type)
+    f.hazard_type, 'backfill', f.run_id, date_trunc('day', f.insert_at)::timestamp, f.insert_at::timestamp
+FROM weatherdata.hazard_district_fact f
+WHERE NOT EXISTS (SELECT 1 FROM weatherdata.hazard_latest_run p WHERE p.hazard_type = f.hazard_type)
+ORDER BY f.hazard_type, f.insert_at DESC, f.run_id DESC;
+"""
+
+# The one way runs are recorded, here and by the pipelines (Hazard_data_insert,
+# Hazard_data_insert_new_source, Cyclone_data_insert), which share no code
+# with this app
+RECORD_RUN_FUNCTION_DDL = """
+CREATE OR REPLACE FUNCTION weatherdata.record_pipeline_run(
+    p_source TEXT,
+    p_status TEXT,
+    p_started_at TIMESTAMP,
+    p_row_counts JSONB,
+    p_partial BOOLEAN DEFAULT FALSE,
+    p_loaded_at TIMESTAMP DEFAULT NULL,
+    p_error TEXT DEFAULT NULL
+) RETURNS BIGINT AS $$
+    INSERT INTO weatherdata.pipeline_run
+        (source, status, partial, started_at, loaded_at, row_counts, error)
+    VALUES (p_source, p_status, p_partial, p_started_at, p_loaded_at, COALESCE(p_row_counts, '{}'), p_error)
+    RETURNING run_id;
+$$ LANGUAGE sql;
+"""
+
+RECORD_RUN_SQL = "SELECT weatherdata.record_pipeline_run(%s, %s, %s, %s, %s, %s, %s)"
+
+# Facts past retention that the pointers no longer reach; the hazard_* tables
+# themselves are left alone
+PRUNE_FACTS_SQL = """
+    DELETE FROM weatherdata.hazard_district_fact f
+    WHERE f.insert_at < NOW() - make_interval(days => %(days)s)
+    AND NOT EXISTS (
+        SELECT 1 FROM weatherdata.hazard_latest_run p
+        WHERE p.hazard_type = f.hazard_type AND p.run_id = f.run_id
+    );
+"""
+
+PRUNE_RUNS_SQL = """
+    DELETE FROM weatherdata.pipeline_run r
+    WHERE r.finished_at < NOW() - make_interval(days => %(days)s)
+    AND r.run_id NOT IN (SELECT run_id FROM weatherdata.hazard_latest_run);
+"""
+
+LATEST_RUNS_SQL = """
+    SELECT p.hazard_type, p.source, p.run_id, p.loaded_at, p.finished_at, r.row_counts -> p.hazard_type
+    FROM weatherdata.hazard_latest_run p
+    LEFT JOIN weatherdata.pipeline_run r ON r.run_id = p.run_id
+    ORDER BY p.hazard_type, p.source;
+"""
+
+def migrate_pipeline_runs(conn):
+    """
+    Create the run table and its record function, the per-source latest-run
+    pointer and the current fact view, seeding the pointer (from the runs and
+    facts) when it is first created or still keyed by hazard alone.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (RUN_TABLE_NAME,))
+        cur.execute(RUN_TABLE_DDL)
+        cur.execute(RECORD_RUN_FUNCTION_DDL)
+        # Blocks run commits until the trigger and the seed are in place
+        cur.execute("LOCK TABLE weatherdata.pipeline_run IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.key_column_usage
+            WHERE table_schema = 'weatherdata' AND table_name = %s AND column_name = 'source'
+            """,
+            (POINTER_TABLE_NAME,),
+        )
+        rebuild = cur.fetchone()[0] == 0
+        if rebuild:
+            # Derived from the runs and facts; drops the views built on it too
+            cur.execute(f"DROP TABLE IF EXISTS weatherdata.{POINTER_TABLE_NAME} CASCADE")
+            cur.execute(POINTER_TABLE_DDL)
+        cur.execute(POINTER_TRIGGER_DDL)
+        if rebuild:
+            cur.execute(SEED_POINTER_SQL)
+        cur.execute(CURRENT_FACT_VIEW_DDL)
+    conn.commit()
+
+
+def record_pipeline_run(cur, source, status, started_at, row_counts, partial=False, loaded_at=None, error=None):
+    """Record a run on the caller's cursor, inside the transaction that wrote its rows."""
+    cur.execute(
+        RECORD_RUN_SQL,
+        (source, status, started_at, json.dumps(row_counts), partial, loaded_at, error),
+    )
+    return cur.fetchone()[0]
+
+
+def prune_pipeline_runs(conn, days=RUN_RETENTION_DAYS):
+    """Drop runs older than the retention window and the facts only they reached; returns runs deleted."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s)", (f"weatherdata.{POINTER_TABLE_NAME}",))
+        if cur.fetchone()[0] is None:
+            return 0
+        cur.execute(PRUNE_FACTS_SQL, {"days": days})
+        cur.execute(PRUNE_RUNS_SQL, {"days": days})
+        deleted = cur.rowcount
+    conn.commit()
+    return deleted
+
+
+if __name__ == "__main__":
+    conn = get_db_conn()
+    try:
+        print(f"{RUN_TABLE_NAME}: {prune_pipeline_runs(conn)} runs pruned")
+        with conn.cursor() as cur:
+            cur.execute(LATEST_RUNS_SQL)
+            for row in cur.fetchall():
+                print(*row)
+    finally:
+        release_db_conn(conn)
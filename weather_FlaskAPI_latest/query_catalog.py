@@ -0,0 +1,151 @@
+import time
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+import pandas as pd
+from psycopg2 import errors, extensions
+
+from data_version import HAZARD_TABLES
+from hazard_facts import DISTRICT_WISE_FACT_SQL
+
+# Parameterized statements for the hot read paths. Each pooled connection
+# PREPAREs a statement the first time it runs it and afterwards only sends
+# EXECUTE, so Postgres parses once per connection and can reuse plans.
+QUERIES = {
+    "session_jti": """
+        SELECT jti FROM weatherdata.user_sessions WHERE user_id = $1
+    """,
+    "current_weather": """
+        SELECT temp_c, chance_of_rain, wind_kph, humidity, vis_km, latitude, longitude, city_name
+            FROM weatherdata.weather_hourly_data_all_india
+            WHERE time = $1
+        ORDER BY city_name ASC
+    """,
+    "circle_weather_min_max": """
+        SELECT
+            MIN(temp_min) AS temp_min,
+            MAX(temp_max) AS temp_max,
+            MIN(wind) AS wind_min,
+            MAX(wind) AS wind_max,
+            MIN(rain_precip) AS rain_min,
+            MAX(rain_precip) AS rain_max,
+            MIN(humidity) AS humidity_min,
+            MAX(humidity) AS humidity_max,
+            MIN(visibility) AS visibility_min,
+            MAX(visibility) AS visibility_max
+        FROM weatherdata.district_wise_7dayfc_severity
+        WHERE indus_circle = $1 AND days = 'day1'
+    """,
+    "earthquakes_recent": """
+        SELECT * FROM weatherdata.earthquakes WHERE "time" >= NOW() - INTERVAL '2 days'
+    """,
+    "district_kpi_values": """
+        SELECT * FROM weatherdata.district_wise_7dayfc_severity dwds WHERE indus_circle = $1
+    """,
+    "kpi_controls": """
+        SELECT * FROM weatherdata.weather_kpi_controls wkc WHERE indus_circle = $1
+    """,
+    "accumulated_rainfall": """
+        SELECT *
+        FROM weatherdata.district_wise_accum_rainfall
+        WHERE indus_circle = $1
+        ORDER BY district ASC
+    """,
+}
+
+# One statement per hazard table: a prepared statement cannot take a table name
+HAZARD_FORECAST_SQL = """
+    SELECT * FROM weatherdata.{table} hf WHERE hf.date >= CURRENT_DATE
+"""
+
+for _table in HAZARD_TABLES:
+    QUERIES[f"{_table}_forecast"] = HAZARD_FORECAST_SQL.format(table=_table)
+    QUERIES[f"{_table}_district_wise"] = DISTRICT_WISE_FACT_SQL.format(table=_table)
+
+_prepared = WeakKeyDictionary()  # connection -> names prepared on it
+_lock = Lock()
+_stats = {}
+
+
+def _record(name, elapsed_ms, prepared):
+    with _lock:
+        stats = _stats.setdefault(name, {"calls": 0, "prepares": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["calls"] += 1
+        stats["prepares"] += prepared
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+
+def _execute_sql(conn, name, params):
+    """Prepare `name` on conn if needed and return the matching EXECUTE statement."""
+    with _lock:
+        names = _prepared.setdefault(conn, set())
+    prepared = name not in names
+    if prepared:
+        with conn.cursor() as cur:
+            cur.execute(f"PREPARE {name} AS {QUERIES[name]}")
+        names.add(name)
+    placeholders = ", ".join(["%s"] * len(params))
+    return (f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}"), prepared
+
+
+def _run(conn, name, params, run):
+    start = time.perf_counter()
+    # Inside the caller's transaction the retry may only undo this statement
+    savepoint = conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE
+    sql, prepared = _execute_sql(conn, name, params)
+    if savepoint:
+        with conn.cursor() as cur:
+            cur.execute("SAVEPOINT query_catalog")
+    try:
+        result = run(sql)
+    except Exception as e:
+        # pandas wraps driver errors, the original is the cause
+        cause = e.__cause__ or e
+        if not isinstance(cause, (errors.FeatureNotSupported, errors.InvalidSqlStatementName)):
+            raise
+        # The table was replaced with a different row type ("cached plan must not
+        # change result type") or the session lost its statements; undo the
+        # failed EXECUTE, prepare again and retry once.
+        if savepoint:
+            with conn.cursor() as cur:
+                cur.execute("ROLLBACK TO SAVEPOINT query_catalog")
+        else:
+            conn.rollback()
+        with _lock:
+            _prepared.pop(conn, None)
+        with conn.cursor() as cur:
+            cur.execute("DEALLOCATE ALL")
+        sql, prepared = _execute_sql(conn, name, params)
+        result = run(sql)
+    if savepoint:
+        with conn.cursor() as cur:
+            cur.execute("RELEASE SAVEPOINT query_catalog")
+    _record(name, (time.perf_counter() - start) * 1000, prepared)
+    return result
+
+
+def execute_prepared(cur, name, params=()):
+    """Run catalog statement `name` on cur; fetch the rows from cur as usual."""
+    return _run(cur.connection, name, params, lambda sql: cur.execute(sql, params))
+
+
+def read_prepared(conn, name, params=()):
+    """pd.read_sql_query for a catalog statement."""
+    return _run(conn, name, params, lambda sql: pd.read_sql_query(sql, conn, params=params))
+
+
+def query_stats():
+    """Per-statement timing, slowest total first."""
+    with _lock:
+        report = {
+            name: {
+                "calls": s["calls"],
+                "prepares": s["prepares"],
+                "total_ms": round(s["total_ms"], 2),
+                "avg_ms": round(s["total_ms"] / s["calls"], 2),
+                "max_ms": round(s["max_ms"], 2),
+            }
+            for name, s in _stats.items()
+        }
+    return dict(sorted(report.items(), key=lambda item: -item[1]["total_ms"]))
@@ -0,0 +1,94 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from threading import Lock
+
+from flask import Response, current_app, request
+
+from data_version import add_version_listener, get_data_version
+
+# Per-worker cache of read endpoint responses keyed by
+# (route, normalized JSON payload, data versions of the source tables, day).
+# An ingest bumps the data version of the tables it writes, so the next
+# request builds a new key; the NOTIFY from the same trigger also purges the
+# old entries right away. The day is part of the key because most of these
+# queries filter on CURRENT_DATE.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 512))
+
+_entries = OrderedDict()  # key -> (sources, body, mimetype, expires_at)
+_lock = Lock()
+_stats = {}
+
+
+def _route_stats(route):
+    return _stats.setdefault(route, {"hits": 0, "misses": 0, "bypassed": 0})
+
+
+def _purge(source):
+    with _lock:
+        if source is None:
+            _entries.clear()
+            return
+        for key in [k for k, entry in _entries.items() if source in entry[0]]:
+            del _entries[key]
+
+
+add_version_listener(_purge)
+
+
+def cached_response(sources, max_age=None):
+    """
+    Cache successful responses of a read endpoint.
+    `sources` is the list of tables the response is built from, or a
+    function of the request payload returning it. `max_age` (seconds) bounds
+    entries whose queries also depend on the time of day.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            route = request.path
+            payload = request.get_json(silent=True) or {}
+            tables = sources(payload) if callable(sources) else sources
+            versions = tuple(get_data_version(table) for table in tables)
+
+            # No version for a table means no safe key
+            if not tables or None in versions:
+                with _lock:
+                    _route_stats(route)["bypassed"] += 1
+                return view(*args, **kwargs)
+
+            key = (
+                route,
+                json.dumps(payload, sort_keys=True, default=str),
+                versions,
+                date.today().isoformat(),
+            )
+            now = time.monotonic()
+            with _lock:
+                entry = _entries.get(key)
+                if entry and entry[3] > now:
+                    _entries.move_to_end(key)
+                    _route_stats(route)["hits"] += 1
+                    return Response(entry[1], mimetype=entry[2])
+                _route_stats(route)["misses"] += 1
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                expires_at = now + max_age if max_age else float("inf")
+                with _lock:
+                    _entries[key] = (set(tables), response.get_data(), response.mimetype, expires_at)
+                    _entries.move_to_end(key)
+                    while len(_entries) > RESPONSE_CACHE_MAX_ENTRIES:
+                        _entries.popitem(last=False)
+            return response
+        return wrapper
+    return decorator
+
+
+def response_cache_stats():
+    with _lock:
+        routes = {route: dict(stats) for route, stats in _stats.items()}
+        return {"entries": len(_entries), "routes": routes}
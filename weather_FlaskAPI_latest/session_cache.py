@@ -0,0 +1,100 @@
+import os
+import time
+from threading import Lock
+
+from psycopg2.extras import DictCursor
+
+import pg_listener
+from db import get_db_conn, release_db_conn
+from query_catalog import execute_prepared
+
+# Per-worker cache of weatherdata.user_sessions: user_id -> (jti, cached_until)
+# Entries live for a short TTL and are dropped as soon as another worker (or
+# this one) announces a session change on the NOTIFY channel below.
+SESSION_CHANNEL = "user_session_changed"
+SESSION_CACHE_TTL = int(os.environ.get("SESSION_CACHE_TTL", 30))
+
+_sessions = {}
+_lock = Lock()
+_subscribed = False
+# Bumped on every invalidation, so a load racing a logout/login is not kept
+_generation = 0
+_user_generations = {}
+
+
+def _on_notify(payload):
+    if payload:
+        _drop(payload)
+    else:
+        clear_sessions()
+
+
+def start_session_listener():
+    global _subscribed
+    with _lock:
+        if _subscribed:
+            return
+        _subscribed = True
+    pg_listener.subscribe(SESSION_CHANNEL, _on_notify, clear_sessions)
+
+
+def _drop(user_id):
+    key = str(user_id)
+    with _lock:
+        _sessions.pop(key, None)
+        _user_generations[key] = _user_generations.get(key, 0) + 1
+
+
+def clear_sessions():
+    global _generation
+    with _lock:
+        _generation += 1
+        _sessions.clear()
+
+
+def _session_generation(key):
+    # Caller holds _lock
+    return _generation, _user_generations.get(key, 0)
+
+
+def _load_session_jti(user_id):
+    conn = get_db_conn()
+    try:
+        with conn.cursor(cursor_factory=DictCursor) as cur:
+            execute_prepared(cur, "session_jti", (user_id,))
+            session = cur.fetchone()
+            return session["jti"] if session else None
+    finally:
+        release_db_conn(conn)
+
+
+def get_session_jti(user_id):
+    """Return the active session jti for user_id (None when logged out)."""
+    start_session_listener()
+    key = str(user_id)
+    now = time.monotonic()
+    # Without a live listener the cache can go stale, so bypass it
+    listening = pg_listener.is_listening(SESSION_CHANNEL)
+
+    with _lock:
+        cached = _sessions.get(key) if listening else None
+        generation = _session_generation(key)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    jti = _load_session_jti(user_id)
+    if listening:
+        with _lock:
+            if _session_generation(key) == generation:
+                _sessions[key] = (jti, now + SESSION_CACHE_TTL)
+    return jti
+
+
+def notify_session_change(cur, user_id):
+    """
+    Invalidate the cached session of user_id in every worker.
+    Runs on the caller's cursor so the notify is delivered only when the
+    session change itself commits.
+    """
+    _drop(user_id)
+    cur.execute("SELECT pg_notify(%s, %s)", (SESSION_CHANNEL, str(user_id)))
@@ -0,0 +1,180 @@
+import pandas as pd
+
+from data_version import get_data_version, notify_data_version
+from db import get_db_conn, release_db_conn
+
+# Per-circle severity summary of the 7-day forecast.
+#
+# district_wise_7dayfc_severity keeps one column per weather parameter; the
+# summary unpivots them in a single scan (CROSS JOIN LATERAL VALUES) and
+# stores one row per (circle, day, date, parameter, severity) with the
+# matching districts. migrate.py creates it; the API scheduler refreshes it
+# CONCURRENTLY (readers are not blocked) when the forecast table's
+# data_version moves, or run `python severity_queries.py` right after the
+# 7-day load. Until the refresh has caught up, requests read the base table.
+SEVERITY_SOURCE_TABLE = "district_wise_7dayfc_severity"
+SUMMARY_NAME = "circle_severity_summary"
+
+SEVERITY_SUMMARY_SELECT = """
+    SELECT
+        f.indus_circle,
+        f.days,
+        f."date",
+        p.severity_type,
+        p.severity,
+        COUNT(*)::int AS district_count,
+        ARRAY_AGG(f.district ORDER BY f.district) AS districts
+    FROM weatherdata.district_wise_7dayfc_severity f
+    CROSS JOIN LATERAL (
+        VALUES
+            ('Temperature_Max', f.temp_max_severity),
+            ('Temperature_Min', f.temp_min_severity),
+            ('Rainfall', f.rain_severity),
+            ('Wind', f.wind_severity),
+            ('Humidity', f.humidity_severity),
+            ('Visibility', f.visibility_severity)
+    ) AS p(severity_type, severity)
+    GROUP BY f.indus_circle, f.days, f."date", p.severity_type, p.severity
+"""
+
+SUMMARY_DDL = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS weatherdata.{SUMMARY_NAME} AS
+{SEVERITY_SUMMARY_SELECT}
+WITH DATA;
+
+CREATE INDEX IF NOT EXISTS idx_{SUMMARY_NAME}_circle
+    ON weatherdata.{SUMMARY_NAME} (indus_circle, days, severity_type);
+
+-- The GROUP BY key; REFRESH ... CONCURRENTLY needs a unique index
+CREATE UNIQUE INDEX IF NOT EXISTS idx_{SUMMARY_NAME}_key
+    ON weatherdata.{SUMMARY_NAME} (indus_circle, days, "date", severity_type, severity);
+"""
+
+CIRCLE_REPORT_SQL = """
+    WITH s AS (
+        SELECT days, "date", severity_type, severity, district_count, districts
+        FROM {source}
+        WHERE ('All Circle' = %(circle)s or indus_circle = %(circle)s)
+    )
+    SELECT
+        days,
+        MIN("date") AS date,
+        severity_type,
+        (
+            SELECT STRING_AGG(DISTINCT d, ', ')
+            FROM s s2, unnest(s2.districts) AS d
+            WHERE s2.days = s.days AND s2.severity_type = s.severity_type
+        ) AS districts,
+        COALESCE(SUM(district_count) FILTER (WHERE severity = 'Extreme'), 0) AS extreme,
+        COALESCE(SUM(district_count) FILTER (WHERE severity = 'High'), 0) AS high,
+        COALESCE(SUM(district_count) FILTER (WHERE severity = 'Moderate'), 0) AS moderate,
+        COALESCE(SUM(district_count) FILTER (WHERE severity = 'Other'), 0) AS other
+    FROM s
+    GROUP BY days, severity_type
+    ORDER BY days, severity_type;
+"""
+
+DISTRICT_NAMES_SQL = """
+    SELECT
+        days,
+        "date",
+        severity_type,
+        STRING_AGG(array_to_string(districts, ', '), ', ') FILTER (WHERE severity = 'Extreme') AS extreme_districts,
+        STRING_AGG(array_to_string(districts, ', '), ', ') FILTER (WHERE severity = 'High') AS high_districts,
+        STRING_AGG(array_to_string(districts, ', '), ', ') FILTER (WHERE severity = 'Moderate') AS moderate_districts,
+        STRING_AGG(array_to_string(districts, ', '), ', ') FILTER (WHERE severity = 'Low') AS low_districts
+    FROM {source}
+    WHERE indus_circle = %(circle)s
+    GROUP BY days, severity_type, "date"
+    ORDER BY days, severity_type;
+"""
+
+_summary_version = None
+
+
+def _source(available):
+    if available:
+        return f"weatherdata.{SUMMARY_NAME}"
+    return f"({SEVERITY_SUMMARY_SELECT}) AS summary"
+
+
+def migrate_circle_severity_summary(conn):
+    with conn.cursor() as cur:
+        cur.execute(SUMMARY_DDL)
+    conn.commit()
+
+
+def refresh_circle_severity_summary(version=None):
+    """Refresh the summary without blocking readers; only one worker refreshes at a time."""
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", (SUMMARY_NAME,))
+            if not cur.fetchone()[0]:
+                conn.rollback()
+                return False
+            cur.execute("SELECT to_regclass(%s)", (f"weatherdata.{SUMMARY_NAME}",))
+            if cur.fetchone()[0] is None:
+                conn.rollback()
+                print(f"Severity summary missing; run `python migrate.py {SUMMARY_NAME}`")
+                return False
+            cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY weatherdata.{SUMMARY_NAME};")
+            if version is not None:
+                cur.execute(
+                    """
+                    INSERT INTO weatherdata.data_version (source, version, updated_at)
+                    VALUES (%s, %s, NOW())
+                    ON CONFLICT (source) DO UPDATE SET version = EXCLUDED.version, updated_at = NOW()
+                    """,
+                    (SUMMARY_NAME, version),
+                )
+                notify_data_version(cur, SUMMARY_NAME)
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_conn(conn)
+
+
+def refresh_stale_severity_summary():
+    """Scheduler job: refresh the summary once the forecast table's data_version has moved."""
+    try:
+        version = get_data_version(SEVERITY_SOURCE_TABLE)
+        if version is not None and get_data_version(SUMMARY_NAME) != version:
+            refresh_circle_severity_summary(version)
+    except Exception as e:
+        print("Severity summary refresh error:", e)
+
+
+def _summary_available():
+    """True when the summary matches the current forecast load; never refreshes it."""
+    global _summary_version
+    try:
+        version = get_data_version(SEVERITY_SOURCE_TABLE)
+        if version is None:
+            return False
+        if _summary_version == version:
+            return True
+        if get_data_version(SUMMARY_NAME) != version:
+            return False
+        _summary_version = version
+        return True
+    except Exception as e:
+        print("Severity summary error:", e)
+        return False
+
+
+def circle_severity_report(conn, circle):
+    sql = CIRCLE_REPORT_SQL.format(source=_source(_summary_available()))
+    return pd.read_sql_query(sql, conn, params={"circle": circle})
+
+
+def district_names_severity_wise(conn, circle):
+    sql = DISTRICT_NAMES_SQL.format(source=_source(_summary_available()))
+    return pd.read_sql_query(sql, conn, params={"circle": circle})
+
+
+if __name__ == "__main__":
+    refresh_circle_severity_summary(get_data_version(SEVERITY_SOURCE_TABLE))
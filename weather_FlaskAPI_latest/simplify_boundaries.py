@@ -0,0 +1,131 @@
+from db import get_db_conn, release_db_conn
+
+# Simplified copies of the boundary polygons, stored next to the original
+# geometry as geometry_s1..geometry_s3 (tolerance in degrees, EPSG:4326).
+# Level 0 is the full-resolution geometry. The columns and their reset
+# trigger are added by `python migrate.py`; until then readers use level 0.
+SIMPLIFY_LEVELS = {
+    1: 0.001,  # ~100 m, street level
+    2: 0.005,  # ~500 m, circle view
+    3: 0.02,  # ~2 km, all India
+}
+
+SIMPLIFIED_TABLES = ["district_geometry", "indus_circle_geomerty"]
+
+RESOLUTION_LEVELS = {"full": 0, "high": 1, "medium": 2, "low": 3}
+
+SIMPLIFIED_COLUMNS_DDL = """
+ALTER TABLE weatherdata.{table}
+    ADD COLUMN IF NOT EXISTS geometry_s1 geometry,
+    ADD COLUMN IF NOT EXISTS geometry_s2 geometry,
+    ADD COLUMN IF NOT EXISTS geometry_s3 geometry;
+
+CREATE OR REPLACE FUNCTION weatherdata.reset_simplified_geometry() RETURNS trigger AS $$
+BEGIN
+    -- Stale variants are dropped; readers fall back to the full geometry until the next rebuild
+    NEW.geometry_s1 := NULL;
+    NEW.geometry_s2 := NULL;
+    NEW.geometry_s3 := NULL;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_{table}_reset_simplified
+BEFORE INSERT OR UPDATE OF geometry ON weatherdata.{table}
+FOR EACH ROW EXECUTE FUNCTION weatherdata.reset_simplified_geometry();
+"""
+
+# ST_CoverageSimplify (PostGIS 3.4+) keeps shared district edges gap-free
+COVERAGE_SIMPLIFY_SQL = """
+UPDATE weatherdata.{table} t
+SET {column} = s.geom
+FROM (
+    SELECT ctid, ST_CoverageSimplify(geometry, %(tolerance)s) OVER () AS geom
+    FROM weatherdata.{table}
+) s
+WHERE t.ctid = s.ctid;
+"""
+
+SIMPLIFY_SQL = """
+UPDATE weatherdata.{table}
+SET {column} = ST_SimplifyPreserveTopology(geometry, %(tolerance)s);
+"""
+
+SIMPLIFIED_COLUMNS_SQL = """
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = 'weatherdata' AND table_name = ANY(%s) AND column_name = 'geometry_s3';
+"""
+
+_columns_available = False
+
+
+def migrate_simplified_columns(conn):
+    with conn.cursor() as cur:
+        for table in SIMPLIFIED_TABLES:
+            cur.execute(SIMPLIFIED_COLUMNS_DDL.format(table=table))
+    conn.commit()
+
+
+def simplified_columns_available():
+    """True once the migration has added the columns; checked again until it has."""
+    global _columns_available
+    if not _columns_available:
+        conn = get_db_conn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(SIMPLIFIED_COLUMNS_SQL, (SIMPLIFIED_TABLES,))
+                _columns_available = cur.fetchone()[0] == len(SIMPLIFIED_TABLES)
+        finally:
+            release_db_conn(conn)
+    return _columns_available
+
+
+def resolution_level(resolution=None, zoom=None):
+    """Map a `resolution` name or map `zoom` to a simplification level (0 = full)."""
+    if resolution in RESOLUTION_LEVELS:
+        return RESOLUTION_LEVELS[resolution]
+    try:
+        zoom = float(zoom)
+    except (TypeError, ValueError):
+        return 0
+    if zoom >= 10:
+        return 0
+    if zoom >= 8:
+        return 1
+    if zoom >= 6:
+        return 2
+    return 3
+
+
+def geometry_column(level):
+    if level == 0:
+        return "geometry"
+    return f"COALESCE(geometry_s{level}, geometry)"
+
+
+def build_simplified_geometries():
+    """Rebuild every simplified variant; run after the boundary tables are reloaded."""
+    conn = get_db_conn()
+    try:
+        migrate_simplified_columns(conn)
+        with conn.cursor() as cur:
+            cur.execute("SELECT (string_to_array(postgis_lib_version(), '.'))[1:2]::int[] >= ARRAY[3, 4]")
+            use_coverage = cur.fetchone()[0]
+            for table in SIMPLIFIED_TABLES:
+                for level, tolerance in SIMPLIFY_LEVELS.items():
+                    sql = COVERAGE_SIMPLIFY_SQL if use_coverage else SIMPLIFY_SQL
+                    cur.execute(
+                        sql.format(table=table, column=f"geometry_s{level}"),
+                        {"tolerance": tolerance},
+                    )
+                    print(f"{table}: geometry_s{level} rebuilt ({cur.rowcount} rows, tolerance {tolerance})")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_conn(conn)
+
+
+if __name__ == "__main__":
+    build_simplified_geometries()
@@ -0,0 +1,137 @@
+import re
+from datetime import date, datetime
+from itertools import groupby
+
+import xlsxwriter
+
+from activity_events import ACTION_ARRAY_SQL, ACTION_NAMES
+
+# Streaming Excel export for usage reports. xlsxwriter's constant_memory mode
+# flushes each row to disk as soon as the next one starts, so memory stays
+# flat however many rows go through, and column widths are tracked while the
+# rows stream and applied when the sheet is done.
+EXPORT_ITERSIZE = 2000
+
+# One row per log entry, grouped by user; same fields the dashboard sends in `data`
+USAGE_EXPORT_SQL = f"""
+    SELECT
+        l.name AS "Name",
+        l.userid AS "User_ID",
+        l.login_time AS "Login_Date_Time",
+        l.logout_time AS "Logout_Date_Time",
+        to_char(l.logout_time::timestamp - l.login_time::timestamp, 'HH24:MI:SS') AS "Duration",
+        l.loggedin_device AS "Device",
+        {ACTION_ARRAY_SQL} AS "Actions"
+    FROM weatherdata.weather_user_activity_log l
+    WHERE l.login_time >= %(start_date)s::date AND l.login_time < %(end_date)s::date + 1
+    AND (%(userids)s::text[] IS NULL OR l.userid::text = ANY(%(userids)s::text[]))
+    ORDER BY l.userid, l.login_time
+"""
+
+_INVALID_TITLE_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def format_header(header):
+    if header == "Login_Date_Time":
+        return "Login Date & Time"
+    if header == "Logout_Date_Time":
+        return "Logout Date & Time"
+    return header.replace("_", " ")
+
+
+def _sheet_title(name, used):
+    base = _INVALID_TITLE_CHARS.sub("", str(name or "User"))[:31] or "User"
+    title, n = base, 1
+    while title.lower() in used:
+        suffix = str(n)
+        title = base[: 31 - len(suffix)] + suffix
+        n += 1
+    used.add(title.lower())
+    return title
+
+
+def write_usage_workbook(file_path, sheets):
+    """
+    Write sheets, an iterable of (title, headers, rows), to file_path.
+    rows may be any iterator of value lists (e.g. a server-side cursor); it is
+    consumed once. Returns the number of data rows written.
+    """
+    workbook = xlsxwriter.Workbook(file_path, {"constant_memory": True, "remove_timezone": True})
+    bold = workbook.add_format({"bold": True})
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    used_titles = set()
+    total = 0
+    try:
+        for title, headers, rows in sheets:
+            ws = workbook.add_worksheet(_sheet_title(title, used_titles))
+            headers = [format_header(h) for h in headers]
+            widths = [len(h) for h in headers]
+            ws.write_row(0, 0, headers, bold)
+
+            for row_num, row in enumerate(rows, 1):
+                for col_num, value in enumerate(row):
+                    if isinstance(value, list):
+                        value = ", ".join(str(v) for v in value)
+                    if isinstance(value, (datetime, date)):
+                        ws.write_datetime(row_num, col_num, value, date_format)
+                        width = 19
+                    elif value is None:
+                        continue
+                    else:
+                        ws.write(row_num, col_num, value)
+                        width = len(str(value))
+                    if col_num < len(widths):
+                        widths[col_num] = max(widths[col_num], width)
+                    else:
+                        widths.append(width)
+                total += 1
+
+            # Auto column fit
+            for col_num, width in enumerate(widths):
+                ws.set_column(col_num, col_num, width + 3)
+    finally:
+        workbook.close()
+    return total
+
+
+def json_sheets(users_data):
+    """Sheets from the dashboard's `data`: a list of row-dict lists, one per user."""
+    for user_rows in users_data:
+        if not user_rows:
+            continue
+        headers = list(user_rows[0].keys())
+        yield (
+            user_rows[0].get("Name", "User"),
+            headers,
+            ([row.get(key, "") for key in headers] for row in user_rows),
+        )
+
+
+def activity_log_sheets(conn, start_date, end_date, userids=None):
+    """Sheets straight from the activity log through a server-side cursor, one per user."""
+    with conn.cursor(name="usage_export") as cur:
+        cur.itersize = EXPORT_ITERSIZE
+        cur.execute(
+            USAGE_EXPORT_SQL,
+            {
+                "start_date": start_date,
+                "end_date": end_date,
+                "userids": [str(u) for u in userids] if userids else None,
+                "actions": ACTION_NAMES,
+            },
+        )
+        # Column names are only known once the first batch has arrived
+        first = cur.fetchone()
+        if first is None:
+            return
+        headers = [desc[0] for desc in cur.description]
+        user_col = headers.index("User_ID")
+
+        rows = (row for batch in ([first], cur) for row in batch)
+        for _, user_rows in groupby(rows, key=lambda row: row[user_col]):
+            first_row = next(user_rows)
+            yield (
+                first_row[0] or "User",
+                headers,
+                (row for batch in ([first_row], user_rows) for row in batch),
+            )
@@ -0,0 +1,167 @@
+from db import get_db_conn, release_db_conn
+
+# Daily per-user usage rollup of weatherdata.weather_user_activity_log.
+# A row trigger keeps it current: logins (insert_activity_log), the logout
+# path (update_activity_logout) and the session sweeper all write
+# login_time/logout_time, and every such write moves the affected day's
+# counts by the difference between the old and new row. Rows with a NULL
+# login_time are not counted. `python migrate.py` creates and backfills it;
+# until then the usage endpoints aggregate the activity log directly.
+ROLLUP_NAME = "user_usage_daily"
+
+ROLLUP_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS weatherdata.user_usage_daily (
+    login_date DATE NOT NULL,
+    userid TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    login_count INTEGER NOT NULL DEFAULT 0,
+    closed_count INTEGER NOT NULL DEFAULT 0,
+    duration_seconds NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (login_date, userid, name)
+);
+"""
+
+ROLLUP_TRIGGER_DDL = """
+CREATE OR REPLACE FUNCTION weatherdata.add_user_usage_daily(
+    p_login_time TIMESTAMP, p_logout_time TIMESTAMP, p_userid TEXT, p_name TEXT, p_sign INTEGER
+) RETURNS void AS $$
+BEGIN
+    IF p_login_time IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO weatherdata.user_usage_daily AS t
+        (login_date, userid, name, login_count, closed_count, duration_seconds)
+    VALUES (
+        p_login_time::date,
+        COALESCE(p_userid, ''),
+        COALESCE(p_name, ''),
+        p_sign,
+        CASE WHEN p_logout_time IS NULL THEN 0 ELSE p_sign END,
+        COALESCE(extract(epoch FROM p_logout_time - p_login_time), 0) * p_sign
+    )
+    ON CONFLICT (login_date, userid, name) DO UPDATE SET
+        login_count = t.login_count + EXCLUDED.login_count,
+        closed_count = t.closed_count + EXCLUDED.closed_count,
+        duration_seconds = t.duration_seconds + EXCLUDED.duration_seconds;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION weatherdata.apply_user_usage_daily() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM weatherdata.add_user_usage_daily(
+            OLD.login_time::timestamp, OLD.logout_time::timestamp, OLD.userid::text, OLD.name::text, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM weatherdata.add_user_usage_daily(
+            NEW.login_time::timestamp, NEW.logout_time::timestamp, NEW.userid::text, NEW.name::text, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_weather_user_activity_log_usage_daily
+AFTER INSERT OR DELETE OR UPDATE OF login_time, logout_time, userid, name
+ON weatherdata.weather_user_activity_log
+FOR EACH ROW EXECUTE FUNCTION weatherdata.apply_user_usage_daily();
+"""
+
+ROLLUP_SELECT = """
+SELECT
+    DATE(login_time) AS login_date,
+    COALESCE(userid::text, '') AS userid,
+    COALESCE(name::text, '') AS name,
+    COUNT(*) AS login_count,
+    COUNT(logout_time) AS closed_count,
+    COALESCE(SUM(extract(epoch FROM logout_time::timestamp - login_time::timestamp)), 0) AS duration_seconds
+FROM weatherdata.weather_user_activity_log
+WHERE login_time IS NOT NULL
+GROUP BY 1, 2, 3
+"""
+
+BACKFILL_SQL = f"""
+DELETE FROM weatherdata.user_usage_daily;
+
+INSERT INTO weatherdata.user_usage_daily
+    (login_date, userid, name, login_count, closed_count, duration_seconds)
+{ROLLUP_SELECT};
+"""
+
+# Same columns and H:MM:SS duration as the old full-table aggregate
+USAGE_SUMMARY_SQL = """
+    SELECT
+        login_date,
+        NULLIF(name, '') AS name,
+        userid,
+        login_count,
+        CASE WHEN closed_count > 0 THEN
+            floor(duration_seconds / 3600)::int
+            || ':' ||
+            lpad(floor(mod(duration_seconds, 3600) / 60)::int::text, 2, '0')
+            || ':' ||
+            lpad(floor(mod(duration_seconds, 60))::int::text, 2, '0')
+        END AS duration
+    FROM {source}
+    WHERE login_count > 0
+    AND (%(start_date)s IS NULL OR login_date BETWEEN %(start_date)s::date AND %(end_date)s::date)
+    ORDER BY login_date DESC, name;
+"""
+
+USAGE_MIN_MAX_SQL = """
+    SELECT MIN(login_date) AS min_date, MAX(login_date) AS max_date
+    FROM {source}
+    WHERE login_count > 0;
+"""
+
+_rollup_available = False
+
+
+def _install(cur, rebuild):
+    # Blocks log writes until commit so the trigger and the backfill see the same rows
+    cur.execute("LOCK TABLE weatherdata.weather_user_activity_log IN SHARE ROW EXCLUSIVE MODE")
+    cur.execute(ROLLUP_TABLE_DDL)
+    cur.execute(ROLLUP_TRIGGER_DDL)
+    if rebuild:
+        cur.execute(BACKFILL_SQL)
+
+
+def migrate_usage_rollup(conn):
+    """Create the rollup and its trigger, backfilling when first created."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (ROLLUP_NAME,))
+        cur.execute("SELECT to_regclass(%s)", (f"weatherdata.{ROLLUP_NAME}",))
+        _install(cur, rebuild=cur.fetchone()[0] is None)
+    conn.commit()
+
+
+def usage_source(cur):
+    """FROM target for the usage queries: the rollup once it exists, else the same aggregate of the log."""
+    global _rollup_available
+    if not _rollup_available:
+        cur.execute("SELECT to_regclass(%s)", (f"weatherdata.{ROLLUP_NAME}",))
+        _rollup_available = cur.fetchone()[0] is not None
+    if _rollup_available:
+        return f"weatherdata.{ROLLUP_NAME}"
+    return f"({ROLLUP_SELECT}) AS usage_daily"
+
+
+def rebuild_usage_rollup():
+    """Recompute the whole rollup from the activity log."""
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (ROLLUP_NAME,))
+            _install(cur, rebuild=True)
+            cur.execute("SELECT COUNT(*) FROM weatherdata.user_usage_daily")
+            rows = cur.fetchone()[0]
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release_db_conn(conn)
+
+
+if __name__ == "__main__":
+    print(f"{ROLLUP_NAME}: {rebuild_usage_rollup()} rows rebuilt")
@@ -0,0 +1,159 @@
+import os
+import shutil
+import threading
+from datetime import datetime
+
+from data_version import get_data_version
+from db import get_db_conn, release_db_conn
+
+# Mapbox Vector Tiles rendered by PostGIS and cached on disk under
+# TILE_CACHE_DIR/<layer>/<data version>/<z>/<x>/<y>.mvt. A new data version
+# (or time bucket, see TILE_LAYERS) starts a fresh directory. Workers can
+# briefly disagree on the current version, so superseded directories are
+# removed by prune_tile_cache() from the scheduler, never on the request path.
+TILE_CACHE_DIR = os.environ.get("TILE_CACHE_DIR", os.path.join(os.getcwd(), "tile_cache"))
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_ZOOM = 22
+
+# srid is the layer's stored SRID: the tile bounds are transformed to it once
+# per query, so the && test is a plain GiST index probe on the layer's geometry.
+# Layers whose filter moves with the clock (no write bumps their version) add
+# a time bucket to the cache key: a strftime format, hourly for the rolling
+# 24-hour window and daily for CURRENT_DATE.
+TILE_LAYERS = {
+    "district": {
+        "table": "district_geometry",
+        "geom": "geometry",
+        "srid": 4326,
+        "columns": "district, state_ut, indus_circle, indus_zone, indus_circle_name",
+        "filter": "indus_circle IS NOT NULL",
+    },
+    "indus_circle": {
+        "table": "indus_circle_geomerty",
+        "geom": "geometry",
+        "srid": 4326,
+        "columns": "state_ut, indus_circle, indus_zone, indus_circle_name",
+        "filter": "TRUE",
+    },
+    "act_warning": {
+        "table": "act_warning1",
+        "geom": "geom",
+        "srid": 4326,
+        "columns": """district, state, indus_district, indus_circle, "Date"::text AS "Date",
+                      day1_severity, day2_severity, day3_severity, day4_severity, day5_severity,
+                      day1_color, day2_color, day3_color, day4_color, day5_color,
+                      "Day1_text", "Day2_text", "Day3_text", "Day4_text", "Day5_text"
+        """,
+        "filter": "insert_at >= NOW() - INTERVAL '24 HOURS'",
+        "bucket": "%Y%m%d%H",
+    },
+    "realtime_hazard": {
+        "table": "realtime_hazard_district",
+        "geom": "geom",
+        "srid": 4326,
+        "columns": "fid, date::text AS date, message, toi, vupto, color, update_time::text AS update_time, district, indus_circle",
+        "filter": "update_time >= CURRENT_DATE",
+        "bucket": "%Y%m%d",
+    },
+}
+
+TILE_SQL = """
+    WITH bounds AS (
+        SELECT
+            ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom,
+            ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), {srid}) AS native
+    ),
+    mvtgeom AS (
+        SELECT
+            ST_AsMVTGeom(ST_Transform(t.{geom}, 3857), bounds.geom, {extent}, {buffer}, true) AS mvt_geom,
+            {columns}
+        FROM weatherdata.{table} t, bounds
+        WHERE t.{geom} && bounds.native
+        AND {filter}
+    )
+    SELECT ST_AsMVT(mvtgeom.*, %(layer)s, {extent}, 'mvt_geom') FROM mvtgeom;
+"""
+
+
+def is_valid_tile(layer, z, x, y):
+    if layer not in TILE_LAYERS or not 0 <= z <= MAX_ZOOM:
+        return False
+    size = 2 ** z
+    return 0 <= x < size and 0 <= y < size
+
+
+def _render_tile(layer, z, x, y):
+    config = TILE_LAYERS[layer]
+    sql = TILE_SQL.format(extent=TILE_EXTENT, buffer=TILE_BUFFER, **config)
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, {"z": z, "x": x, "y": y, "layer": layer})
+            tile = cur.fetchone()[0]
+        return bytes(tile) if tile else b""
+    finally:
+        release_db_conn(conn)
+
+
+def _version_dir_name(layer, version):
+    bucket = TILE_LAYERS[layer].get("bucket")
+    if bucket:
+        return f"v{version}-{datetime.now().strftime(bucket)}"
+    return f"v{version}"
+
+
+_superseded = set()
+
+
+def prune_tile_cache():
+    """
+    Remove version directories that were already superseded on the previous
+    run, so a worker still on the old version (up to DATA_VERSION_TTL) can
+    finish its writes. Call at an interval well above that TTL.
+    """
+    global _superseded
+    superseded = set()
+    for layer, config in TILE_LAYERS.items():
+        layer_dir = os.path.join(TILE_CACHE_DIR, layer)
+        version = get_data_version(config["table"])
+        if version is None or not os.path.isdir(layer_dir):
+            continue
+        current = _version_dir_name(layer, version)
+        for name in os.listdir(layer_dir):
+            if name == current:
+                continue
+            path = os.path.join(layer_dir, name)
+            if path in _superseded:
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                superseded.add(path)
+    _superseded = superseded
+
+
+def get_tile(layer, z, x, y):
+    """Return the MVT bytes for a tile (b"" when empty), served from disk when possible."""
+    version = get_data_version(TILE_LAYERS[layer]["table"])
+    # Without a data version there is no safe cache key
+    if version is None:
+        return _render_tile(layer, z, x, y)
+
+    version_dir = os.path.join(TILE_CACHE_DIR, layer, _version_dir_name(layer, version))
+    tile_path = os.path.join(version_dir, str(z), str(x), f"{y}.mvt")
+    try:
+        with open(tile_path, "rb") as f:
+            return f.read()
+    except OSError:
+        pass
+
+    tile = _render_tile(layer, z, x, y)
+    tmp_path = f"{tile_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(tile)
+        os.replace(tmp_path, tile_path)
+    except OSError as e:
+        # The directory was pruned under us; the tile is still good to serve
+        print("Tile cache write error:", e)
+    return tile